@@ -0,0 +1,196 @@
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional, Tuple
+
+# Route classes, highest priority first. Each class may only occupy its share
+# of the global in-flight budget, so under load reads are shed first and
+# turn-advancing actions last. Spectator streams are long-lived and are
+# counted separately against ``max_streams`` for as long as they stay open.
+PRIORITIES = ("turn", "action", "read", "spectator")
+
+_TURN_ACTIONS = (
+    "roll-dice", "end-turn", "plant-crop", "harvest-crop", "next-stage",
+    "minigame/resolve", "minigame/mining/finish",
+)
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def _env_shares(name: str, default: Dict[str, float]) -> Dict[str, float]:
+    """``"turn=1,action=0.9,read=0.75"``: per-class shares of the in-flight budget; unknown or bad entries are ignored."""
+    shares = dict(default)
+    for item in os.environ.get(name, "").split(","):
+        key, _, value = item.partition("=")
+        key = key.strip()
+        if key in shares:
+            try:
+                shares[key] = min(1.0, max(0.0, float(value)))
+            except ValueError:
+                pass
+    return shares
+
+
+def _default_shares() -> Dict[str, float]:
+    return {"turn": 1.0, "action": 0.9, "read": 0.75, "spectator": 0.5}
+
+
+@dataclass
+class AdmissionSettings:
+    enabled: bool = True
+    client_rate: float = 20.0     # requests/second per client
+    client_burst: float = 40.0
+    game_rate: float = 30.0       # requests/second per game
+    game_burst: float = 60.0
+    max_in_flight: int = 256
+    shares: Dict[str, float] = field(default_factory=_default_shares)
+    # open spectator streams (WebSocket and SSE) at once
+    max_streams: int = 512
+
+    @classmethod
+    def from_env(cls) -> "AdmissionSettings":
+        return cls(
+            enabled=os.environ.get("SUGOROKU_ADMISSION", "1") not in ("0", "false", "off", ""),
+            client_rate=_env_float("SUGOROKU_CLIENT_RATE", 20.0),
+            client_burst=_env_float("SUGOROKU_CLIENT_BURST", 40.0),
+            game_rate=_env_float("SUGOROKU_GAME_RATE", 30.0),
+            game_burst=_env_float("SUGOROKU_GAME_BURST", 60.0),
+            max_in_flight=int(_env_float("SUGOROKU_MAX_IN_FLIGHT", 256)),
+            shares=_env_shares("SUGOROKU_ADMISSION_SHARES", _default_shares()),
+            max_streams=int(_env_float("SUGOROKU_MAX_STREAMS", 512)),
+        )
+
+
+class TokenBucket:
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def take(self, now: float) -> bool:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
+    def retry_after(self) -> float:
+        return max(0.0, (1.0 - self.tokens) / self.rate) if self.rate > 0 else 1.0
+
+    def idle(self, now: float) -> bool:
+        return self.tokens + (now - self.updated) * self.rate >= self.burst
+
+
+def classify(method: str, path: str) -> Optional[str]:
+    """Priority class of a request, or None for routes exempt from admission control."""
+    if path in ("/healthz", "/metrics"):
+        return None
+    if "/spectate" in path:
+        return "spectator"
+    if method == "GET":
+        return "read"
+    if path == "/game/create" or path.endswith(_TURN_ACTIONS):
+        return "turn"
+    return "action"
+
+
+class AdmissionController:
+    """Per-client and per-game token buckets plus a prioritized in-flight cap."""
+
+    # drop idle buckets once a table grows past this many entries
+    PRUNE_THRESHOLD = 10000
+
+    def __init__(self, settings: Optional[AdmissionSettings] = None, clock: Callable[[], float] = time.monotonic):
+        self.settings = settings or AdmissionSettings()
+        self._clock = clock
+        self._clients: Dict[str, TokenBucket] = {}
+        self._games: Dict[str, TokenBucket] = {}
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.streams = 0
+        self.admitted = {p: 0 for p in PRIORITIES}
+        self.shed = {p: 0 for p in PRIORITIES}
+        self.rate_limited = {"client": 0, "game": 0}
+
+    def _bucket(self, table: Dict[str, TokenBucket], key: str, rate: float, burst: float, now: float) -> TokenBucket:
+        bucket = table.get(key)
+        if bucket is None:
+            if len(table) >= self.PRUNE_THRESHOLD:
+                for k in [k for k, b in table.items() if b.idle(now)]:
+                    del table[k]
+            bucket = table[key] = TokenBucket(rate, burst, now)
+        return bucket
+
+    def admit(self, priority: str, client: str, game_id: Optional[str] = None) -> Optional[Tuple[int, float]]:
+        """Reserve an in-flight slot.
+
+        Returns None when admitted (the caller must call ``release``), or a
+        ``(status_code, retry_after_seconds)`` rejection.
+        """
+        s = self.settings
+        limit = s.max_in_flight * s.shares.get(priority, 1.0)
+        if self.in_flight >= limit:
+            self.shed[priority] += 1
+            return 503, 1.0
+        now = self._clock()
+        bucket = self._bucket(self._clients, client, s.client_rate, s.client_burst, now)
+        if not bucket.take(now):
+            self.rate_limited["client"] += 1
+            return 429, bucket.retry_after()
+        if game_id is not None:
+            bucket = self._bucket(self._games, game_id, s.game_rate, s.game_burst, now)
+            if not bucket.take(now):
+                self.rate_limited["game"] += 1
+                return 429, bucket.retry_after()
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        self.admitted[priority] += 1
+        return None
+
+    def release(self):
+        self.in_flight -= 1
+
+    def admit_stream(self, client: str) -> Optional[Tuple[int, float]]:
+        """Reserve a stream slot for the lifetime of a spectator connection.
+
+        Same contract as ``admit``; the caller must call ``release_stream``
+        when the stream ends. The client's rate limit applies to opening it.
+        """
+        if self.streams >= self.settings.max_streams:
+            self.shed["spectator"] += 1
+            return 503, 1.0
+        now = self._clock()
+        bucket = self._bucket(self._clients, client, self.settings.client_rate, self.settings.client_burst, now)
+        if not bucket.take(now):
+            self.rate_limited["client"] += 1
+            return 429, bucket.retry_after()
+        self.streams += 1
+        self.admitted["spectator"] += 1
+        return None
+
+    def release_stream(self):
+        self.streams -= 1
+
+    def metrics(self) -> Dict[str, object]:
+        return {
+            "enabled": self.settings.enabled,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "max_in_flight": self.settings.max_in_flight,
+            "streams": self.streams,
+            "max_streams": self.settings.max_streams,
+            "admitted": dict(self.admitted),
+            "shed": dict(self.shed),
+            "rate_limited": dict(self.rate_limited),
+            "tracked_clients": len(self._clients),
+            "tracked_games": len(self._games),
+        }
@@ -0,0 +1,285 @@
+import json
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from .leaderboard import WINDOWS, week_start, window_period
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY,
+    game_id TEXT NOT NULL,
+    finished_at REAL NOT NULL,
+    turns INTEGER NOT NULL,
+    board_size INTEGER NOT NULL,
+    stock_price INTEGER NOT NULL,
+    winner TEXT,
+    is_draw INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS game_players (
+    game_row INTEGER NOT NULL REFERENCES games(id),
+    player_id TEXT NOT NULL,
+    player_name TEXT NOT NULL,
+    is_winner INTEGER NOT NULL,
+    total_assets INTEGER NOT NULL,
+    coins INTEGER NOT NULL,
+    stocks_shares INTEGER NOT NULL,
+    inventory_units INTEGER NOT NULL,
+    inventory TEXT NOT NULL,
+    buildings INTEGER NOT NULL,
+    crops_harvested INTEGER NOT NULL,
+    turns_played INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_games_finished_at ON games(finished_at);
+CREATE INDEX IF NOT EXISTS idx_game_players_game ON game_players(game_row);
+CREATE INDEX IF NOT EXISTS idx_game_players_name ON game_players(player_name, total_assets);
+-- running aggregates, maintained on insert so stats never scan the history
+CREATE TABLE IF NOT EXISTS totals (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    games INTEGER NOT NULL,
+    draws INTEGER NOT NULL,
+    stock_price_sum INTEGER NOT NULL,
+    turns_sum INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS player_stats (
+    kind TEXT NOT NULL,          -- 'name' or 'seat' (player id)
+    key TEXT NOT NULL,
+    games INTEGER NOT NULL,
+    wins INTEGER NOT NULL,
+    assets_sum INTEGER NOT NULL,
+    coins_sum INTEGER NOT NULL,
+    shares_sum INTEGER NOT NULL,
+    buildings_sum INTEGER NOT NULL,
+    PRIMARY KEY (kind, key)
+);
+-- each player's best result on every leaderboard board, so a restart reads the boards back
+CREATE TABLE IF NOT EXISTS leaderboard_best (
+    board TEXT NOT NULL,         -- 'all', 'daily' or 'weekly'
+    period TEXT NOT NULL,        -- '' for all-time, else the UTC day or ISO week
+    key TEXT NOT NULL,           -- casefolded player name
+    name TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    at REAL NOT NULL,
+    game_id TEXT NOT NULL,
+    PRIMARY KEY (board, period, key)
+);
+INSERT OR IGNORE INTO totals VALUES (0, 0, 0, 0, 0);
+"""
+
+# an equal score keeps the earlier result, as on the in-memory boards
+_UPSERT_BEST = """
+INSERT INTO leaderboard_best VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(board, period, key) DO UPDATE SET
+    name = excluded.name, score = excluded.score, at = excluded.at, game_id = excluded.game_id
+WHERE excluded.score > leaderboard_best.score
+"""
+
+_UPSERT_STATS = """
+INSERT INTO player_stats VALUES (?, ?, 1, ?, ?, ?, ?, ?)
+ON CONFLICT(kind, key) DO UPDATE SET
+    games = games + 1,
+    wins = wins + excluded.wins,
+    assets_sum = assets_sum + excluded.assets_sum,
+    coins_sum = coins_sum + excluded.coins_sum,
+    shares_sum = shares_sum + excluded.shares_sum,
+    buildings_sum = buildings_sum + excluded.buildings_sum
+"""
+
+
+def winner_id(game: Any) -> Optional[str]:
+    """Id of the player with the highest final assets, or None for a draw or an unsettled game."""
+    totals: Dict[str, int] = game.final_assets or {}
+    if game.winner == "Draw" or not totals:
+        return None
+    ranked = sorted(totals.items(), key=lambda kv: kv[1], reverse=True)
+    if len(ranked) >= 2 and ranked[0][1] == ranked[1][1]:
+        return None
+    return ranked[0][0]
+
+
+class GameArchive:
+    """Append-only SQLite archive of finished games.
+
+    Per-player results are stored one row per player per game, and running
+    aggregates are updated in the same transaction, so the summary queries
+    cost O(players) no matter how many games have been archived.
+
+    ``submit`` takes the rows from the game on the calling thread and leaves
+    the write to a single background thread, so the event loop never waits
+    on SQLite; ``record`` writes synchronously.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="archive")
+
+    def close(self):
+        self._writer.shutdown(wait=True)
+        with self._lock:
+            self._db.close()
+
+    def flush(self):
+        """Wait until every submitted game has been written."""
+        self._writer.submit(lambda: None).result()
+
+    def record(self, game_id: str, game: Any, finished_at: Optional[float] = None) -> int:
+        """Archive a finalized game; returns the archive row id."""
+        return self._write(*self._rows(game_id, game, finished_at))
+
+    def submit(self, game_id: str, game: Any, finished_at: Optional[float] = None) -> "Future[int]":
+        """Archive a finalized game in the background; the future resolves to the archive row id."""
+        return self._writer.submit(self._write, *self._rows(game_id, game, finished_at))
+
+    def _rows(self, game_id: str, game: Any, finished_at: Optional[float]) -> Tuple[tuple, List[tuple]]:
+        totals: Dict[str, int] = game.final_assets or {}
+        is_draw = game.winner == "Draw"
+        # by id: names are free text, so a human called "Bot" or two equal names must not share a win
+        winner = winner_id(game)
+        rows: List[tuple] = []
+        for p in game.players:
+            inventory = {k: int(v) for k, v in (p.inventory or {}).items() if v}
+            rows.append((
+                p.id,
+                p.name,
+                int(p.id == winner),
+                int(totals.get(p.id, 0)),
+                int(p.coins),
+                int(p.stocks_shares),
+                sum(inventory.values()),
+                json.dumps(inventory, separators=(",", ":"), sort_keys=True),
+                sum(1 for sq in game.board if sq.building_owner == p.id),
+                int(p.crops_harvested),
+                int(getattr(p, "_turns", 0)),
+            ))
+        game_row = (game_id, finished_at if finished_at is not None else time.time(), int(game.turn),
+                    len(game.board), int(game.stock_price), game.winner, int(is_draw))
+        return game_row, rows
+
+    def _write(self, game_row: tuple, rows: List[tuple]) -> int:
+        _, _, turns, _, stock_price, _, is_draw = game_row
+        with self._lock:
+            cur = self._db.cursor()
+            cur.execute("BEGIN")
+            try:
+                cur.execute(
+                    "INSERT INTO games (game_id, finished_at, turns, board_size, stock_price, winner, is_draw)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    game_row,
+                )
+                row_id = cur.lastrowid
+                cur.executemany(
+                    "INSERT INTO game_players VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(row_id,) + r for r in rows],
+                )
+                cur.execute(
+                    "UPDATE totals SET games = games + 1, draws = draws + ?,"
+                    " stock_price_sum = stock_price_sum + ?, turns_sum = turns_sum + ? WHERE id = 0",
+                    (is_draw, stock_price, turns),
+                )
+                for pid, name, win, assets, coins, shares, _, _, buildings, _, _ in rows:
+                    cur.execute(_UPSERT_STATS, ("name", name, win, assets, coins, shares, buildings))
+                    cur.execute(_UPSERT_STATS, ("seat", pid, win, assets, coins, shares, buildings))
+                    if pid != "bot":
+                        self._submit_best(cur, game_row[0], game_row[1], name, assets)
+                cur.execute("COMMIT")
+            except Exception:
+                cur.execute("ROLLBACK")
+                raise
+        return row_id
+
+    @staticmethod
+    def _submit_best(cur: sqlite3.Cursor, game_id: str, at: float, name: str, score: int):
+        for board in WINDOWS:
+            cur.execute(_UPSERT_BEST, (board, window_period(board, at), name.casefold(), name, score, at, game_id))
+
+    def leaderboard_rows(self, periods: Dict[str, str]) -> Tuple[int, List[Tuple[str, str, str, int, float, str]]]:
+        """(archived game count, stored bests of each board's ``periods`` entry), bot seats left out.
+
+        Rows are ``(board, period, name, score, at, game id)``, read through the
+        primary key. Rows of earlier days and weeks are pruned. An archive
+        written before the table existed is backfilled once, from each
+        name's best game plus every game of the current week.
+        """
+        self.flush()
+        with self._lock:
+            (games,) = self._db.execute("SELECT games FROM totals WHERE id = 0").fetchone()
+            cur = self._db.cursor()
+            cur.execute("BEGIN")
+            try:
+                if games and cur.execute("SELECT 1 FROM leaderboard_best LIMIT 1").fetchone() is None:
+                    self._backfill_best(cur)
+                rows = []
+                for board, period in periods.items():
+                    if period:
+                        cur.execute("DELETE FROM leaderboard_best WHERE board = ? AND period < ?", (board, period))
+                    rows.extend(cur.execute(
+                        "SELECT board, period, name, score, at, game_id FROM leaderboard_best"
+                        " WHERE board = ? AND period = ?", (board, period),
+                    ))
+                cur.execute("COMMIT")
+            except Exception:
+                cur.execute("ROLLBACK")
+                raise
+        return games, rows
+
+    def _backfill_best(self, cur: sqlite3.Cursor):
+        results = cur.execute(
+            "SELECT game_id, finished_at, player_name, total_assets FROM ("
+            " SELECT g.game_id, g.finished_at, p.player_name, p.total_assets,"
+            "  ROW_NUMBER() OVER (PARTITION BY p.player_name"
+            "   ORDER BY p.total_assets DESC, g.finished_at) AS nth"
+            " FROM game_players p JOIN games g ON g.id = p.game_row WHERE p.player_id != 'bot'"
+            ") WHERE nth = 1 OR finished_at >= ? ORDER BY finished_at",
+            (week_start(time.time()),),
+        ).fetchall()
+        for game_id, at, name, score in results:
+            self._submit_best(cur, game_id, at, name, score)
+
+    def stats(self, player_name: Optional[str] = None, limit: int = 20) -> Dict[str, Any]:
+        """Win rates and averages across every archived game, including any still being written."""
+        self.flush()
+        with self._lock:
+            games, draws, price_sum, turns_sum = self._db.execute(
+                "SELECT games, draws, stock_price_sum, turns_sum FROM totals WHERE id = 0"
+            ).fetchone()
+            seats = self._db.execute(
+                "SELECT * FROM player_stats WHERE kind = 'seat' ORDER BY games DESC LIMIT ?", (limit,)
+            ).fetchall()
+            if player_name is not None:
+                players = self._db.execute(
+                    "SELECT * FROM player_stats WHERE kind = 'name' AND key = ?", (player_name,)
+                ).fetchall()
+            else:
+                players = self._db.execute(
+                    "SELECT * FROM player_stats WHERE kind = 'name' ORDER BY games DESC LIMIT ?", (limit,)
+                ).fetchall()
+
+        def summarize(row: tuple) -> Dict[str, Any]:
+            _, key, n, wins, assets, coins, shares, buildings = row
+            return {
+                "key": key,
+                "games": n,
+                "wins": wins,
+                "win_rate": wins / n if n else 0.0,
+                "avg_final_assets": assets / n if n else 0.0,
+                "avg_coins": coins / n if n else 0.0,
+                "avg_stocks_shares": shares / n if n else 0.0,
+                "avg_buildings": buildings / n if n else 0.0,
+            }
+
+        return {
+            "games": games,
+            "draws": draws,
+            "draw_rate": draws / games if games else 0.0,
+            "avg_stock_price_at_finish": price_sum / games if games else 0.0,
+            "avg_turns": turns_sum / games if games else 0.0,
+            "seats": [summarize(r) for r in seats],
+            "players": [summarize(r) for r in players],
+        }
@@ -0,0 +1,201 @@
+"""Exact battle odds by dynamic programming.
+
+A battle state is (enemy_hp, player_hp). Each round the player picks a
+command. The command gives a distribution of damage to the enemy, then, if
+the enemy survives, a distribution of damage to the player. Neither HP ever
+increases, so the win probability of every state can be computed bottom-up.
+A round where both sides deal 0 damage (defend/dodge fully absorbing a hit)
+is a self-loop and is solved in closed form.
+
+Tables are cached per (HP caps, damage model, policy). Looking up the odds of
+a live battle, or sampling a bot battle's outcome, is then O(1).
+"""
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+Dist = Tuple[Tuple[int, float], ...]  # ((damage, probability), ...)
+
+
+def uniform(lo: int, hi: int) -> Dist:
+    n = hi - lo + 1
+    return tuple((d, 1.0 / n) for d in range(lo, hi + 1))
+
+
+def _merge(*parts: Tuple[float, Dist]) -> Dist:
+    acc: Dict[int, float] = {}
+    for weight, dist in parts:
+        for d, p in dist:
+            acc[d] = acc.get(d, 0.0) + weight * p
+    return tuple(sorted(acc.items()))
+
+
+# --- damage models ---------------------------------------------------------
+# These mirror rpg_minigame_act / hybrid_minigame_command in app.main.
+
+@lru_cache(maxsize=None)
+def rpg_model(atk_min: int, atk_max: int) -> Dict[str, Tuple[Dist, Dist]]:
+    """The RPG battle has one command: a 3-6 hit, then the enemy's atk_min..atk_max."""
+    return {"attack": (uniform(3, 6), uniform(atk_min, atk_max))}
+
+
+@lru_cache(maxsize=None)
+def hybrid_model(dodge: float) -> Dict[str, Tuple[Dist, Dist]]:
+    normal_enemy = uniform(2, 5)
+    attack_hit = 0.8 * (1.0 - dodge)
+    heavy_hit = 0.6 * (1.0 - dodge)
+    # guarding: the enemy swings 4-7 (70%) or 2-5 (30%), then 2 is absorbed
+    guarded = _merge((0.7, uniform(4, 7)), (0.3, uniform(2, 5)))
+    guarded = _merge((1.0, tuple((max(0, d - 2), p) for d, p in guarded)))
+    return {
+        "attack": (_merge((attack_hit, uniform(3, 6)), (1.0 - attack_hit, ((0, 1.0),))), normal_enemy),
+        "heavy": (_merge((heavy_hit, uniform(5, 9)), (1.0 - heavy_hit, ((0, 1.0),))), normal_enemy),
+        "defend": (((0, 1.0),), guarded),
+        "dodge": (((0, 1.0),), _merge((0.6, ((0, 1.0),)), (0.4, normal_enemy))),
+    }
+
+
+# --- solver ----------------------------------------------------------------
+
+class BattleTable:
+    """Win probability and chosen command for every (enemy_hp, player_hp) up to the caps."""
+
+    def __init__(self, win: List[List[float]], choice: List[List[Optional[str]]]):
+        self.win = win
+        self.choice = choice
+
+    def odds(self, enemy_hp: int, player_hp: int) -> float:
+        if enemy_hp <= 0:
+            return 1.0
+        if player_hp <= 0:
+            return 0.0
+        return self.win[enemy_hp][player_hp]
+
+
+def _action_value(win: List[List[float]], e: int, h: int, player: Dist, enemy: Dist,
+                  stay_value: Optional[float] = None) -> float:
+    """Win probability of playing one round with this command, continuing with ``win``.
+
+    If the round leaves the state unchanged, the game is worth ``stay_value``.
+    When that is None, the command is assumed to be repeated until the state
+    changes, and the self-loop is divided out.
+    """
+    value = 0.0
+    stay = 0.0
+    for d, pd in player:
+        e2 = e - d
+        if e2 <= 0:
+            value += pd
+            continue
+        for x, px in enemy:
+            h2 = h - x
+            if h2 <= 0:
+                continue
+            if d == 0 and x == 0:
+                stay += pd * px
+            else:
+                value += pd * px * win[e2][h2]
+    if stay_value is not None:
+        return value + stay * stay_value
+    return value / (1.0 - stay) if stay < 1.0 else 0.0
+
+
+def _solve(enemy_cap: int, player_cap: int, model: Dict[str, Tuple[Dist, Dist]], policy: Optional[str]) -> BattleTable:
+    win = [[0.0] * (player_cap + 1) for _ in range(enemy_cap + 1)]
+    choice: List[List[Optional[str]]] = [[None] * (player_cap + 1) for _ in range(enemy_cap + 1)]
+    actions = [policy] if policy else list(model)
+    for e in range(1, enemy_cap + 1):
+        for h in range(1, player_cap + 1):
+            best, best_action = -1.0, None
+            for a in actions:
+                v = _action_value(win, e, h, *model[a])
+                if v > best:
+                    best, best_action = v, a
+            win[e][h] = best
+            choice[e][h] = best_action
+    return BattleTable(win, choice)
+
+
+@lru_cache(maxsize=None)
+def rpg_table(enemy_cap: int, player_cap: int, atk_min: int, atk_max: int) -> BattleTable:
+    return _solve(enemy_cap, player_cap, rpg_model(atk_min, atk_max), None)
+
+
+@lru_cache(maxsize=None)
+def hybrid_table(enemy_cap: int, player_cap: int, dodge: float, policy: Optional[str] = None) -> BattleTable:
+    """Table for a fixed command ``policy``, or for the best command each round when None."""
+    return _solve(enemy_cap, player_cap, hybrid_model(dodge), policy)
+
+
+def outcome_distribution(table: BattleTable, model: Dict[str, Tuple[Dist, Dist]], enemy_hp: int, player_hp: int) -> Dict[str, Dict[int, float]]:
+    """Distribution of end states when playing ``table``'s choices from the given state.
+
+    ``win`` maps the player's remaining HP to its probability, ``lose`` the
+    enemy's remaining HP.
+    """
+    result: Dict[str, Dict[int, float]] = {"win": {}, "lose": {}}
+    mass: Dict[Tuple[int, int], float] = {(enemy_hp, player_hp): 1.0}
+    # HP never increases, so visiting states by decreasing total HP is a topological order
+    while mass:
+        (e, h) = max(mass, key=lambda s: s[0] + s[1])
+        p = mass.pop((e, h))
+        player, enemy = model[table.choice[e][h]]
+        stay = sum(pd * px for d, pd in player if d == 0 for x, px in enemy if x == 0)
+        scale = p / (1.0 - stay) if stay < 1.0 else 0.0
+        for d, pd in player:
+            e2 = e - d
+            if e2 <= 0:
+                result["win"][h] = result["win"].get(h, 0.0) + scale * pd
+                continue
+            for x, px in enemy:
+                if d == 0 and x == 0:
+                    continue
+                h2 = h - x
+                if h2 <= 0:
+                    result["lose"][e2] = result["lose"].get(e2, 0.0) + scale * pd * px
+                else:
+                    mass[(e2, h2)] = mass.get((e2, h2), 0.0) + scale * pd * px
+    return result
+
+
+# --- live odds -------------------------------------------------------------
+
+def minigame_odds(mg: Dict[str, object], player_max_hp: int) -> Optional[Dict[str, object]]:
+    """Odds for a live RPG or hybrid minigame dict, or None for other minigames.
+
+    ``player_max_hp`` is the rules' starting HP (``battle.player_hp``); it
+    sizes the table so every live battle of those rules shares one.
+    """
+    kind = mg.get("type")
+    enemy = mg.get("enemy") or {}
+    if kind not in ("rpg", "hybrid") or not isinstance(enemy, dict):
+        return None
+    e = max(0, int(enemy.get("hp", 0)))
+    h = max(0, int(mg.get("player_hp", 0)))
+    e_cap = max(e, int(enemy.get("max_hp", e) or e))
+    h_cap = max(h, int(player_max_hp))
+    if kind == "rpg":
+        atk = (int(enemy.get("atk_min", 1)), int(enemy.get("atk_max", 4)))
+        table = rpg_table(e_cap, h_cap, *atk)
+        return {
+            "type": "rpg",
+            "enemy_hp": e,
+            "player_hp": h,
+            "win_probability": table.odds(e, h),
+            "outcomes": outcome_distribution(table, rpg_model(*atk), e, h) if e > 0 and h > 0 else None,
+        }
+    dodge = round(float(enemy.get("dodge", 0.3)), 4)
+    best = hybrid_table(e_cap, h_cap, dodge)
+    model = hybrid_model(dodge)
+    return {
+        "type": "hybrid",
+        "enemy_hp": e,
+        "player_hp": h,
+        "win_probability": best.odds(e, h),
+        "recommended_action": best.choice[e][h] if e > 0 and h > 0 else None,
+        # take this command now, then play optimally
+        "by_action": {a: _action_value(best.win, e, h, *model[a], stay_value=best.odds(e, h))
+                      if e > 0 and h > 0 else best.odds(e, h) for a in model},
+        # repeat the same command for the whole battle
+        "by_policy": {a: hybrid_table(e_cap, h_cap, dodge, a).odds(e, h) for a in model},
+        "outcomes": outcome_distribution(best, model, e, h) if e > 0 and h > 0 else None,
+    }
@@ -0,0 +1,106 @@
+import gzip
+from collections import OrderedDict
+from importlib.util import find_spec
+from typing import Callable, Dict, Hashable, Optional, Tuple
+
+
+# Levels picked from benchmarks/bench_compression.py: the cheapest settings
+# that still get most of the size win on GameState JSON.
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+ZSTD_LEVEL = 3
+
+# responses smaller than this are sent as-is
+MIN_COMPRESS_SIZE = 512
+
+
+def _gzip(data: bytes) -> bytes:
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def _zstd() -> Callable[[bytes], bytes]:
+    import zstandard  # type: ignore
+    return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress
+
+
+def _brotli() -> Callable[[bytes], bytes]:
+    import brotli  # type: ignore
+    return lambda data: brotli.compress(data, quality=BROTLI_QUALITY)
+
+
+class _Lazy:
+    """An encoder whose codec module is imported on the first call, not at startup."""
+
+    def __init__(self, load: Callable[[], Callable[[bytes], bytes]]):
+        self._load = load
+        self._encode: Optional[Callable[[bytes], bytes]] = None
+
+    def __call__(self, data: bytes) -> bytes:
+        if self._encode is None:
+            self._encode = self._load()
+        return self._encode(data)
+
+
+ENCODERS: Dict[str, Callable[[bytes], bytes]] = {"gzip": _gzip}
+# optional: pip install zstandard / brotli. find_spec checks for them without importing.
+if find_spec("zstandard") is not None:
+    ENCODERS["zstd"] = _Lazy(_zstd)
+if find_spec("brotli") is not None:
+    ENCODERS["br"] = _Lazy(_brotli)
+
+# server preference when the client accepts several with equal weight
+_PREFERENCE = ("br", "zstd", "gzip")
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Pick the best supported coding from an Accept-Encoding header, or None for identity."""
+    if not accept_encoding:
+        return None
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name] = q
+    best, best_q = None, 0.0
+    for enc in _PREFERENCE:
+        if enc not in ENCODERS:
+            continue
+        q = weights.get(enc, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = enc, q
+    return best
+
+
+class CompressedCache:
+    """Small LRU of compressed bodies keyed by (resource, version, encoding)."""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[Hashable, int, str], bytes]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, version: int, encoding: str) -> Optional[bytes]:
+        entry = self._entries.get((key, version, encoding))
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end((key, version, encoding))
+        self.hits += 1
+        return entry
+
+    def put(self, key: Hashable, version: int, encoding: str, body: bytes):
+        self._entries[(key, version, encoding)] = body
+        self._entries.move_to_end((key, version, encoding))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
@@ -0,0 +1,269 @@
+"""Invariant fuzzer for the game rules.
+
+Random action sequences are played in-process against the regular route
+handlers (like ``app.tournament``, without HTTP), and the game state is
+checked after every action. A failing sequence is shrunk to a minimal one
+that still breaks the same invariant and can be replayed from its JSON.
+
+    python -m app.fuzz --seeds 500 --actions 400 [--workers 8]
+    python -m app.fuzz --replay failure.json
+
+A run is fully determined by its seed: the action list is drawn up front
+from the seed, and the game's own randomness (``random``, the market
+engine) is reseeded with it before the first action.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+
+from . import main
+from .tournament import drive
+
+Action = Tuple[str, Tuple[Any, ...]]
+
+_MINIGAME_ACTIONS = ("attack", "heavy", "defend", "dodge", "flee")
+
+
+# name -> (weight, argument generator)
+ACTIONS: Dict[str, Tuple[int, Callable[[random.Random], Tuple[Any, ...]]]] = {
+    "roll_dice": (30, lambda r: ()),
+    "end_turn": (12, lambda r: ()),
+    "plant_crop": (8, lambda r: (r.choice(list(main.CropType)),)),
+    "harvest_crop": (6, lambda r: ()),
+    "buy_stock": (3, lambda r: (r.randint(-1, 4),)),
+    "sell_stock": (3, lambda r: (r.randint(-1, 4),)),
+    "sell_inventory": (3, lambda r: (r.choice(list(main.CropType)).value, r.randint(-1, 5))),
+    "build_estate": (3, lambda r: (r.randint(-1, 41),)),
+    "minigame_ready": (2, lambda r: ()),
+    "minigame_resolve": (4, lambda r: (r.choice(["attacker", "defender"]),)),
+    "rpg_minigame_act": (5, lambda r: (r.choice(_MINIGAME_ACTIONS),)),
+    "hybrid_minigame_start": (2, lambda r: ()),
+    "hybrid_minigame_command": (5, lambda r: (r.choice(_MINIGAME_ACTIONS),)),
+    "mining_dig": (6, lambda r: (r.randint(-1, 120),)),
+    "mining_bot_dig": (2, lambda r: ()),
+    "mining_finish": (2, lambda r: ()),
+    "undo": (1, lambda r: ()),
+    "next_stage": (1, lambda r: ()),
+    # the minigame deadline firing (the handler's own timer is never awaited here)
+    "expire_minigame": (1, lambda r: ()),
+}
+_NAMES = list(ACTIONS)
+_WEIGHTS = [ACTIONS[n][0] for n in _NAMES]
+
+
+def generate(seed: int, n: int) -> List[Action]:
+    rng = random.Random(seed)
+    names = rng.choices(_NAMES, weights=_WEIGHTS, k=n)
+    return [(name, ACTIONS[name][1](rng)) for name in names]
+
+
+class HandlerCrash(Exception):
+    pass
+
+
+def _apply(game_id: str, action: Action):
+    name, args = action
+    if name == "expire_minigame":
+        # what the timer callback does, minus _game_changed: like the handlers
+        # here (no middleware), fuzz games never reach spectators or the archive
+        game = main.games[game_id]
+        if game.minigame:
+            main._maybe_finalize_game(game, main._settle_minigame(game))
+        return
+    try:
+        drive(getattr(main, name)(game_id, *args))
+    except HTTPException:
+        pass
+    except Exception as e:
+        raise HandlerCrash(f"{name}{args!r} raised {type(e).__name__}: {e}") from e
+
+
+# --- invariants -------------------------------------------------------------
+
+def check_invariants(game: main.GameState) -> Optional[str]:
+    """Name and detail of the first broken invariant, or None."""
+    players = game.players
+    ids = {p.id for p in players}
+    if not 0 <= game.current_player < len(players):
+        return f"current_player: {game.current_player} with {len(players)} players"
+    for p in players:
+        if p.coins < 0:
+            return f"coins: {p.id} has {p.coins}"
+        if p.stocks_shares < 0:
+            return f"stocks: {p.id} has {p.stocks_shares} shares"
+        if any(q < 0 for q in p.inventory.values()):
+            return f"inventory: {p.id} has {p.inventory}"
+        if not 0 <= p.position < len(game.board):
+            return f"position: {p.id} at {p.position} on {len(game.board)} squares"
+    for sq in game.board.touched():
+        if sq.owner is not None and sq.owner not in ids:
+            return f"owner: square {sq.id} owned by {sq.owner}"
+        if sq.building_owner is not None and sq.building_owner not in ids:
+            return f"building: square {sq.id} built by {sq.building_owner}"
+    limit = main.rule_store.current.config.turn_limit
+    if game.game_over:
+        if game.final_assets is None or game.winner is None:
+            return "settlement: game over without final assets or winner"
+        if game.minigame:
+            return "orphan minigame: pending after game over"
+    elif game.turn >= limit and not game.awaiting_action and not game.minigame:
+        return f"settlement: turn {game.turn} reached the {limit}-turn limit without finalizing"
+    mg = game.minigame
+    if mg:
+        kind = main._minigame_type(mg)
+        if kind == "invader":
+            if mg.get("attacker_id") not in ids or mg.get("defender_id") not in ids:
+                return "orphan minigame: invader between unknown players"
+            if not 0 <= int(mg.get("square_id", -1)) < len(game.board):
+                return "orphan minigame: invader square off the board"
+        elif mg.get("player_id") != players[game.current_player].id:
+            # nobody can act on it: every minigame handler checks the seat to move
+            return f"orphan minigame: {kind} of {mg.get('player_id')} while {players[game.current_player].id} is to move"
+    return None
+
+
+def _invariant_name(failure: str) -> str:
+    return failure.split(":", 1)[0]
+
+
+# --- running ----------------------------------------------------------------
+
+def run(seed: int, actions: Sequence[Action], check: Callable[[main.GameState], Optional[str]] = check_invariants
+        ) -> Tuple[Optional[Tuple[int, str]], int]:
+    """Play ``actions`` in a fresh game; ``((index, failure) or None, actions applied)``."""
+    random.seed(seed)
+    main.markets.seed(seed)
+    game_id = f"fuzz_{seed}_{uuid.uuid4().hex[:8]}"
+    coins = main.rule_store.current.config.starting_coins
+    game = main.new_game_state([
+        main.Player(id="player1", name="Fuzz", position=0, coins=coins, crops_harvested=0, inventory={}),
+        main.Player(id="bot", name="Bot", position=0, coins=coins, crops_harvested=0, inventory={}),
+    ])
+    main.register_game(game_id, game)
+    try:
+        for i, action in enumerate(actions):
+            try:
+                _apply(game_id, action)
+            except HandlerCrash as e:
+                return (i, f"crash: {e}"), i + 1
+            failure = check(main.games[game_id])
+            if failure is not None:
+                return (i, failure), i + 1
+        return None, len(actions)
+    finally:
+        main.drop_game(game_id)
+        # this game's pending minigame deadlines are stale; other games' are not
+        main.minigame_timers.forget(game_id)
+
+
+def shrink(seed: int, actions: Sequence[Action], failure: str,
+           check: Callable[[main.GameState], Optional[str]] = check_invariants) -> List[Action]:
+    """Smallest subsequence found (ddmin) that still breaks the same invariant."""
+    want = _invariant_name(failure)
+
+    def fails(candidate: List[Action]) -> Optional[List[Action]]:
+        result, _ = run(seed, candidate, check)
+        if result is not None and _invariant_name(result[1]) == want:
+            return candidate[:result[0] + 1]
+        return None
+
+    current = fails(list(actions)) or list(actions)
+    chunks = 2
+    while len(current) >= 2:
+        size = max(1, len(current) // chunks)
+        for start in range(0, len(current), size):
+            reduced = fails(current[:start] + current[start + size:])
+            if reduced is not None:
+                current = reduced
+                chunks = max(chunks - 1, 2)
+                break
+        else:
+            if size == 1:
+                break
+            chunks = min(len(current), chunks * 2)
+    return current
+
+
+def _fuzz_batch(seeds: Sequence[int], n_actions: int) -> Tuple[int, List[Dict[str, Any]]]:
+    failures = []
+    applied = 0
+    for seed in seeds:
+        result, done = run(seed, generate(seed, n_actions))
+        applied += done
+        if result is not None:
+            failures.append({"seed": seed, "index": result[0], "failure": result[1]})
+    return applied, failures
+
+
+def fuzz(seeds: Sequence[int], n_actions: int, shrink_failures: bool = True, workers: Optional[int] = 1,
+         batch_size: int = 50) -> Dict[str, Any]:
+    """Run every seed (on a process pool with ``workers`` > 1) and shrink the failures in-process."""
+    seeds = list(seeds)
+    batches = [seeds[i:i + batch_size] for i in range(0, len(seeds), batch_size)]
+    workers = workers or os.cpu_count() or 1
+    t0 = time.perf_counter()
+    if workers <= 1 or len(batches) <= 1:
+        results = [_fuzz_batch(b, n_actions) for b in batches]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(batches))) as pool:
+            results = list(pool.map(_fuzz_batch, batches, [n_actions] * len(batches)))
+    elapsed = time.perf_counter() - t0
+    applied = sum(done for done, _ in results)
+    failures = [f for _, batch in results for f in batch]
+    if shrink_failures:
+        for f in failures:
+            f["actions"] = [[name, list(args)] for name, args in
+                            shrink(f["seed"], generate(f["seed"], n_actions)[:f["index"] + 1], f["failure"])]
+    return {
+        "seeds": len(seeds),
+        "actions": applied,
+        "seconds": round(elapsed, 3),
+        "actions_per_sec": round(applied / elapsed, 1) if elapsed > 0 else None,
+        "failures": failures,
+    }
+
+
+def _load_actions(raw: List[List[Any]]) -> List[Action]:
+    actions = []
+    for name, args in raw:
+        if name == "plant_crop":
+            args = [main.CropType(args[0])]
+        actions.append((name, tuple(args)))
+    return actions
+
+
+def main_(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Fuzz the game rules with random action sequences.")
+    parser.add_argument("--seeds", type=int, default=200)
+    parser.add_argument("--start", type=int, default=0, help="first seed")
+    parser.add_argument("--actions", type=int, default=400, help="actions per seed")
+    parser.add_argument("--no-shrink", action="store_true")
+    parser.add_argument("--workers", type=int, default=1, help="process pool size (0: cpu count)")
+    parser.add_argument("--replay", help="JSON failure (seed + actions) to replay")
+    args = parser.parse_args(argv)
+
+    if args.replay:
+        with open(args.replay, encoding="utf-8") as f:
+            failure = json.load(f)
+        result, _ = run(failure["seed"], _load_actions(failure["actions"]))
+        print(json.dumps({"seed": failure["seed"], "failure": result and result[1]}, ensure_ascii=False))
+        return 1 if result else 0
+
+    report = fuzz(range(args.start, args.start + args.seeds), args.actions, not args.no_shrink, args.workers)
+    for f in report["failures"]:
+        print(json.dumps(f, ensure_ascii=False, default=str))
+    print(f"{report['actions']} actions over {report['seeds']} seeds in {report['seconds']}s "
+          f"({report['actions_per_sec']} actions/sec), {len(report['failures'])} failures", file=sys.stderr)
+    return 1 if report["failures"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_())
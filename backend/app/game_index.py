@@ -0,0 +1,138 @@
+import time
+from collections import OrderedDict
+from itertools import islice
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+
+class GameIndex:
+    """Secondary indexes over live games, maintained on every state change.
+
+    Status, minigame type and player name map to sets of game ids; last
+    activity is an ``OrderedDict`` kept in touch order, so the most (or
+    least) recently active games are read off one end without sorting.
+    A filtered query intersects the matching sets, smallest first, and only
+    sorts that result.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self._clock = clock
+        self._status: Dict[str, Set[str]] = {}
+        self._minigame: Dict[str, Set[str]] = {}
+        self._player: Dict[str, Set[str]] = {}
+        self._activity: "OrderedDict[str, float]" = OrderedDict()
+        # game_id -> (status, minigame, player names) currently indexed
+        self._keys: Dict[str, Tuple[str, Optional[str], Tuple[str, ...]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._activity)
+
+    def __contains__(self, game_id: str) -> bool:
+        return game_id in self._activity
+
+    @staticmethod
+    def _add(index: Dict[str, Set[str]], key: str, game_id: str):
+        index.setdefault(key, set()).add(game_id)
+
+    @staticmethod
+    def _discard(index: Dict[str, Set[str]], key: str, game_id: str):
+        ids = index.get(key)
+        if ids is not None:
+            ids.discard(game_id)
+            if not ids:
+                del index[key]
+
+    def update(self, game_id: str, status: str, minigame: Optional[str], players: Sequence[str]):
+        """Record a change to ``game_id``: touch its activity and move it between index keys."""
+        self._activity[game_id] = self._clock()
+        self._activity.move_to_end(game_id)
+        names = tuple(sorted({p.casefold() for p in players}))
+        keys = (status, minigame, names)
+        old = self._keys.get(game_id)
+        if old == keys:
+            return
+        self._keys[game_id] = keys
+        old_status, old_minigame, old_names = old if old is not None else (None, None, ())
+        if status != old_status:
+            if old_status is not None:
+                self._discard(self._status, old_status, game_id)
+            self._add(self._status, status, game_id)
+        if minigame != old_minigame:
+            if old_minigame is not None:
+                self._discard(self._minigame, old_minigame, game_id)
+            if minigame is not None:
+                self._add(self._minigame, minigame, game_id)
+        if names != old_names:
+            for name in set(old_names) - set(names):
+                self._discard(self._player, name, game_id)
+            for name in set(names) - set(old_names):
+                self._add(self._player, name, game_id)
+
+    def load(self, rows: Iterable[Tuple[str, str, Optional[str], Sequence[str], float]]):
+        """Index ``(game_id, status, minigame, players, last activity)`` rows for games not indexed yet.
+
+        For restoring many games at once: rows, oldest first, go straight into
+        the indexes without the per-update diffing, and rank as less recently
+        active than every game already indexed.
+        """
+        newer = list(self._activity)
+        for game_id, status, minigame, players, at in rows:
+            if game_id in self._keys:
+                continue
+            names = tuple(sorted({p.casefold() for p in players}))
+            self._keys[game_id] = (status, minigame, names)
+            self._activity[game_id] = at
+            self._status.setdefault(status, set()).add(game_id)
+            if minigame is not None:
+                self._minigame.setdefault(minigame, set()).add(game_id)
+            for name in names:
+                self._player.setdefault(name, set()).add(game_id)
+        for game_id in newer:
+            self._activity.move_to_end(game_id)
+
+    def remove(self, game_id: str):
+        keys = self._keys.pop(game_id, None)
+        self._activity.pop(game_id, None)
+        if keys is None:
+            return
+        status, minigame, names = keys
+        self._discard(self._status, status, game_id)
+        if minigame is not None:
+            self._discard(self._minigame, minigame, game_id)
+        for name in names:
+            self._discard(self._player, name, game_id)
+
+    def status(self, game_id: str) -> Optional[str]:
+        keys = self._keys.get(game_id)
+        return keys[0] if keys else None
+
+    def last_activity(self, game_id: str) -> Optional[float]:
+        return self._activity.get(game_id)
+
+    def counts(self) -> Dict[str, int]:
+        return {status: len(ids) for status, ids in self._status.items()}
+
+    def _idle(self, idle_seconds: float) -> Iterable[str]:
+        cutoff = self._clock() - idle_seconds
+        for game_id, at in self._activity.items():
+            if at > cutoff:
+                break
+            yield game_id
+
+    def query(self, status: Optional[str] = None, minigame: Optional[str] = None, player: Optional[str] = None,
+              idle_seconds: Optional[float] = None, oldest_first: bool = False,
+              limit: int = 50, offset: int = 0) -> Tuple[int, List[str]]:
+        """``(total matches, one page of game ids)`` ordered by last activity, newest first by default."""
+        sets: List[Set[str]] = []
+        for index, key in ((self._status, status), (self._minigame, minigame), (self._player, player)):
+            if key is not None:
+                sets.append(index.get(key.casefold() if index is self._player else key, set()))
+        if idle_seconds is not None:
+            sets.append(set(self._idle(idle_seconds)))
+        if not sets:
+            ordered = self._activity if oldest_first else reversed(self._activity)
+            return len(self._activity), list(islice(ordered, offset, offset + limit))
+        sets.sort(key=len)
+        matches = set(sets[0]).intersection(*sets[1:])
+        activity = self._activity
+        ordered = sorted(matches, key=lambda g: (activity[g], g), reverse=not oldest_first)
+        return len(matches), ordered[offset:offset + limit]
@@ -0,0 +1,133 @@
+import time
+from typing import Any, Callable, Dict, Iterable, Tuple
+
+_MISSING = object()
+
+
+class GameStore(dict):
+    """The live games, evaluated lazily.
+
+    Every game remembers when it was last brought up to date. Reading it
+    back with ``store[game_id]`` or ``store.get(game_id)`` hands the number of
+    whole ticks that have passed since then to ``advance``, which applies
+    them in one step. Dormant games cost nothing until they are read, and a
+    game read every tick ends up in the same state as one read once after
+    many. Iteration, ``in`` and ``len`` never evaluate anything.
+
+    ``tick_seconds`` of 0 turns catch-up off; reads are then plain dict reads.
+
+    Games can also be deferred (``defer``): they count as present for ``in``
+    and ``len`` but are only built by their loader on first read. Iteration
+    covers loaded games only; ``deferred`` lists the rest. A game whose
+    loader fails stays deferred, so it can be retried and is never lost:
+    ``store[game_id]`` raises the loader's error and ``get`` returns the
+    default.
+    """
+
+    def __init__(self, advance: Callable[[str, Any, int], None], tick_seconds: float = 0,
+                 clock: Callable[[], float] = time.time):
+        super().__init__()
+        self._advance = advance
+        self._clock = clock
+        self.tick_seconds = tick_seconds
+        # game_id -> time up to which the game has been evaluated
+        self._evaluated: Dict[str, float] = {}
+        # game_id -> (loader, evaluation time) for games not built yet
+        self._deferred: Dict[str, Tuple[Callable[[str], Any], float]] = {}
+
+    def set_tick(self, seconds: float):
+        """Change the tick length; all games start counting afresh from now."""
+        if seconds == self.tick_seconds:
+            return
+        self.tick_seconds = seconds
+        now = self._clock()
+        for game_id in self._evaluated:
+            self._evaluated[game_id] = now
+        for game_id, (load, _) in self._deferred.items():
+            self._deferred[game_id] = (load, now)
+
+    def evaluated_at(self, game_id: str) -> float:
+        """When ``game_id`` was last brought up to date (for snapshots)."""
+        entry = self._deferred.get(game_id)
+        return entry[1] if entry is not None else self._evaluated.get(game_id, self._clock())
+
+    def defer(self, game_ids: Iterable[Tuple[str, float]], load: Callable[[str], Any]):
+        """Register ``(game_id, evaluated at)`` pairs whose games ``load`` builds on first read."""
+        loaded = super().__contains__
+        self._deferred.update((game_id, (load, at)) for game_id, at in game_ids if not loaded(game_id))
+
+    @property
+    def deferred(self) -> Tuple[str, ...]:
+        return tuple(self._deferred)
+
+    def _load(self, game_id: str) -> Any:
+        load, at = self._deferred[game_id]
+        game = load(game_id)
+        del self._deferred[game_id]
+        super().__setitem__(game_id, game)
+        self._evaluated[game_id] = at
+        return game
+
+    def __contains__(self, game_id: object) -> bool:
+        return super().__contains__(game_id) or game_id in self._deferred
+
+    def __len__(self) -> int:
+        return super().__len__() + len(self._deferred)
+
+    def __setitem__(self, game_id: str, game: Any):
+        self._deferred.pop(game_id, None)
+        super().__setitem__(game_id, game)
+        # replacing a game (undo) keeps its evaluation time
+        self._evaluated.setdefault(game_id, self._clock())
+
+    def __delitem__(self, game_id: str):
+        if self._deferred.pop(game_id, None) is None:
+            super().__delitem__(game_id)
+        self._evaluated.pop(game_id, None)
+
+    def pop(self, game_id: str, *default: Any) -> Any:
+        self._evaluated.pop(game_id, None)
+        if game_id in self._deferred:
+            # dropped before anyone read it: no need to build it
+            del self._deferred[game_id]
+            return default[0] if default else None
+        return super().pop(game_id, *default)
+
+    def clear(self):
+        super().clear()
+        self._evaluated.clear()
+        self._deferred.clear()
+
+    def __getitem__(self, game_id: str) -> Any:
+        game = super().get(game_id, _MISSING)
+        if game is _MISSING:
+            if game_id not in self._deferred:
+                raise KeyError(game_id)
+            game = self._load(game_id)
+        if self.tick_seconds > 0:
+            self._catch_up(game_id, game)
+        return game
+
+    def get(self, game_id: str, default: Any = None) -> Any:
+        game = super().get(game_id, _MISSING)
+        if game is _MISSING:
+            if game_id not in self._deferred:
+                return default
+            try:
+                game = self._load(game_id)
+            except Exception:
+                # the loader reports its own failures; the game stays deferred
+                return default
+        if self.tick_seconds > 0:
+            self._catch_up(game_id, game)
+        return game
+
+    def _catch_up(self, game_id: str, game: Any):
+        now = self._clock()
+        at = self._evaluated.setdefault(game_id, now)
+        ticks = int((now - at) // self.tick_seconds)
+        if ticks <= 0:
+            return
+        # advance the mark first: ``advance`` may read the game again
+        self._evaluated[game_id] = at + ticks * self.tick_seconds
+        self._advance(game_id, game, ticks)
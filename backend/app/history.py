@@ -0,0 +1,45 @@
+from collections import deque
+from typing import Deque, Generic, List, Optional, Tuple, TypeVar
+
+S = TypeVar("S")
+
+
+class StateHistory(Generic[S]):
+    """Bounded list of per-turn snapshots of one game, oldest first.
+
+    Snapshots are expected to share structure with each other (see
+    ``Board.fork``), so keeping many of them costs roughly what changed
+    between turns rather than a full copy each.
+    """
+
+    def __init__(self, capacity: int = 120):
+        self._snaps: Deque[Tuple[int, S]] = deque(maxlen=capacity)
+
+    def __len__(self) -> int:
+        return len(self._snaps)
+
+    def turns(self) -> List[int]:
+        return [turn for turn, _ in self._snaps]
+
+    def record(self, turn: int, snapshot: S):
+        self._snaps.append((turn, snapshot))
+
+    def at_turn(self, turn: int) -> Optional[S]:
+        """Latest snapshot taken at ``turn``."""
+        for t, snap in reversed(self._snaps):
+            if t == turn:
+                return snap
+        return None
+
+    def pop(self) -> Optional[Tuple[int, S]]:
+        return self._snaps.pop() if self._snaps else None
+
+    def copy(self) -> "StateHistory[S]":
+        other: StateHistory[S] = StateHistory(self._snaps.maxlen or 120)
+        other._snaps.extend(self._snaps)
+        return other
+
+    def truncate(self, turn: int):
+        """Drop snapshots taken at or after ``turn``."""
+        while self._snaps and self._snaps[-1][0] >= turn:
+            self._snaps.pop()
@@ -0,0 +1,210 @@
+import time
+from bisect import bisect_left, insort
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+WINDOWS = ("all", "daily", "weekly")
+
+
+def window_period(window: str, at: float) -> str:
+    """The UTC day or ISO week ``at`` falls in; the all-time board has a single period."""
+    if window == "daily":
+        return time.strftime("%Y-%m-%d", time.gmtime(at))
+    if window == "weekly":
+        return time.strftime("%G-W%V", time.gmtime(at))
+    return ""
+
+
+def week_start(at: float) -> float:
+    """Start of the UTC ISO week (Monday 00:00) that ``at`` falls in."""
+    return at - at % 86400 - time.gmtime(at).tm_wday * 86400
+
+
+@dataclass
+class Entry:
+    name: str
+    score: int
+    at: float
+    game_id: str
+
+
+class Ranking:
+    """Each player's best score, kept sorted so pages and rank lookups are bisects.
+
+    ``_order`` holds ``(-score, at, key)``: higher scores first, and the earlier
+    of two equal scores ranks higher. ``version`` only moves when a submitted
+    score changes the order.
+    """
+
+    def __init__(self, period: str = ""):
+        self.period = period
+        self.version = 0
+        self._best: Dict[str, Entry] = {}
+        self._order: List[Tuple[int, float, str]] = []
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def submit(self, key: str, entry: Entry) -> bool:
+        """Record ``entry`` for ``key`` if it beats the player's best; True when the ranking changed."""
+        old = self._best.get(key)
+        if old is not None:
+            if entry.score <= old.score:
+                return False
+            del self._order[bisect_left(self._order, (-old.score, old.at, key))]
+        self._best[key] = entry
+        insort(self._order, (-entry.score, entry.at, key))
+        self.version += 1
+        return True
+
+    def merge(self, entries: Iterable[Tuple[str, Entry]]) -> bool:
+        """``submit`` many entries at once, sorting once instead of inserting each; True when the ranking changed."""
+        changed = False
+        for key, entry in entries:
+            old = self._best.get(key)
+            if old is None or entry.score > old.score:
+                self._best[key] = entry
+                changed = True
+        if changed:
+            self._order = sorted((-e.score, e.at, key) for key, e in self._best.items())
+            self.version += 1
+        return changed
+
+    def rank(self, key: str) -> Optional[int]:
+        """1-based rank of ``key``, or None if the player has no score here."""
+        entry = self._best.get(key)
+        if entry is None:
+            return None
+        return bisect_left(self._order, (-entry.score, entry.at, key)) + 1
+
+    def entry(self, key: str) -> Optional[Entry]:
+        return self._best.get(key)
+
+    def top(self, offset: int, limit: int) -> List[Tuple[int, Entry]]:
+        return [(offset + i + 1, self._best[key]) for i, (_, _, key) in enumerate(self._order[offset:offset + limit])]
+
+
+def stored_rankings(results: Iterable[Tuple[str, str, str, int, float, str]],
+                    periods: Dict[str, str]) -> Dict[str, Ranking]:
+    """Rankings of the stored ``(window, period, name, score, at, game id)`` bests for the given periods.
+
+    Builds new objects only, so it can run off the event loop; see ``Leaderboard.adopt``.
+    """
+    entries: Dict[str, List[Tuple[str, Entry]]] = {w: [] for w in periods}
+    for window, period, name, score, at, game_id in results:
+        if periods.get(window) == period:
+            entries[window].append((name.casefold(), Entry(name, int(score), at, game_id)))
+    boards = {}
+    for window, period in periods.items():
+        boards[window] = Ranking(period)
+        boards[window].merge(entries[window])
+    return boards
+
+
+class Leaderboard:
+    """Cross-game ranking of players by their best final assets.
+
+    Every finished game is ingested once. There is an all-time board plus one
+    for the current UTC day and ISO week; a window's board starts empty when
+    its period rolls over. Rendered pages are cached until the board's
+    version or period changes, so polling an unchanged leaderboard costs a
+    dict lookup.
+
+    Players have no account, so they are keyed by display name, casefolded:
+    everyone who plays as "alice" (or under a default name) shares one entry.
+    The boards live in memory. The archive keeps each board's best results
+    too, and they are loaded back after a restart (``stored_rankings`` and
+    ``adopt``); until then ``warming`` is set.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.time, max_cached_pages: int = 256):
+        self._clock = clock
+        self._boards: Dict[str, Ranking] = {w: Ranking(window_period(w, clock())) for w in WINDOWS}
+        self._pages: Dict[Tuple[str, int, int], Tuple[str, int, Dict[str, Any]]] = {}
+        self.max_cached_pages = max_cached_pages
+        self.games = 0
+        # archived games the boards were restored from, and whether that is still under way
+        self.restored = 0
+        self.warming = False
+        self.hits = 0
+        self.misses = 0
+
+    def _board(self, window: str, at: float) -> Ranking:
+        board = self._boards[window]
+        period = window_period(window, at)
+        if period > board.period:
+            board = self._boards[window] = Ranking(period)
+        return board
+
+    def record(self, game_id: str, players: List[Tuple[str, int]], at: Optional[float] = None) -> bool:
+        """Ingest one finished game's ``(player name, final assets)`` pairs; True if any ranking changed."""
+        at = self._clock() if at is None else at
+        self.games += 1
+        changed = False
+        for window in WINDOWS:
+            board = self._board(window, at)
+            if board.period != window_period(window, at):
+                continue  # a late result for a period that is already over
+            for name, score in players:
+                changed |= board.submit(name.casefold(), Entry(name, int(score), at, game_id))
+        return changed
+
+    def periods(self) -> Dict[str, str]:
+        """The current period of every window."""
+        now = self._clock()
+        return {window: self._board(window, now).period for window in WINDOWS}
+
+    def adopt(self, boards: Dict[str, Ranking]):
+        """Take over rankings built elsewhere (``stored_rankings``) for boards still in their period.
+
+        Results ranked here in the meantime are merged into them, and their
+        version moves past the current one, so no cached page survives.
+        """
+        for window, board in boards.items():
+            current = self._boards[window]
+            if board.period != current.period:
+                continue
+            board.merge(current._best.items())
+            board.version = current.version + board.version + 1
+            self._boards[window] = board
+
+    def rank(self, window: str, name: str) -> Optional[Dict[str, Any]]:
+        board = self._board(window, self._clock())
+        key = name.casefold()
+        entry = board.entry(key)
+        if entry is None:
+            return None
+        return {"rank": board.rank(key), "name": entry.name, "score": entry.score, "game_id": entry.game_id}
+
+    def page(self, window: str, limit: int = 50, offset: int = 0) -> Dict[str, Any]:
+        board = self._board(window, self._clock())
+        cache_key = (window, limit, offset)
+        cached = self._pages.get(cache_key)
+        if cached is not None and cached[0] == board.period and cached[1] == board.version:
+            self.hits += 1
+            return cached[2]
+        self.misses += 1
+        rows = board.top(offset, limit)
+        page = {
+            "window": window,
+            "period": board.period or None,
+            "version": board.version,
+            "total": len(board),
+            "offset": offset,
+            "next_offset": offset + len(rows) if offset + len(rows) < len(board) else None,
+            "entries": [{"rank": rank, "name": e.name, "score": e.score, "game_id": e.game_id, "at": e.at}
+                        for rank, e in rows],
+        }
+        if len(self._pages) >= self.max_cached_pages and cache_key not in self._pages:
+            self._pages.clear()
+        self._pages[cache_key] = (board.period, board.version, page)
+        return page
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "games": self.games,
+            "restored_games": self.restored,
+            "warming": self.warming,
+            "players": {w: len(self._boards[w]) for w in WINDOWS},
+            "page_cache": {"entries": len(self._pages), "hits": self.hits, "misses": self.misses},
+        }
@@ -1,9 +1,44 @@
-﻿from fastapi import FastAPI, HTTPException
+﻿from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from concurrent.futures import Future
+from functools import lru_cache, partial
+from pydantic import BaseModel, ConfigDict, GetCoreSchemaHandler
+from pydantic_core import core_schema
 from enum import Enum
-from typing import Dict, List, Optional, Any, Any
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple, Any, Any
+import asyncio
+import copy
+import itertools
+import json
+import logging
+import os
 import random
+import re
+import threading
+import time
+
+from .admission import AdmissionController, AdmissionSettings, classify
+from .history import StateHistory
+from .compression import ENCODERS, MIN_COMPRESS_SIZE, CompressedCache, choose_encoding
+from .game_index import GameIndex
+from .game_store import GameStore
+from .leaderboard import WINDOWS, Leaderboard, stored_rankings
+from .market_history import MarketHistory
+from .routing import RouteTable
+from .rules import DEFAULT_RULES_PATH, RuleStore, RuleTables, RulesError
+from .snapshot import Snapshot, SnapshotError, encode_blob, open_snapshot, write_snapshot
+from .spectators import SpectatorHub
+from .timers import TimerScheduler
+
+if TYPE_CHECKING:
+    from .archive import GameArchive
+    from .market import MarketEngine
+
+logger = logging.getLogger(__name__)
 
 
 class CropType(str, Enum):
@@ -44,6 +79,136 @@ class Square(BaseModel):
     story_effect: Optional[str] = None # 'gift'|'tax'|'boost' etc.
 
 
+class TemplateSquare(Square):
+    """Read-only square shared by every game through a board template."""
+    model_config = ConfigDict(frozen=True)
+
+
+@lru_cache(maxsize=None)
+def board_template(size: int) -> Tuple[TemplateSquare, ...]:
+    """Static layout (event tiles) for a board of ``size`` squares, built once per size."""
+    flags: List[Dict[str, bool]] = [{} for _ in range(size)]
+    # place events on first loop
+    if size > 5:
+        flags[5]["is_market"] = True
+    if size > 10:
+        flags[10]["is_farm"] = True
+    if size > 12:
+        flags[12]["is_farm"] = True
+    if size > 14:
+        flags[14]["is_battle"] = True
+    if size > 15:
+        flags[15]["is_estate"] = True
+    if size > 17:
+        flags[17]["is_mine"] = True
+    # place mirrored events for large boards (40 etc.)
+    if size >= 36:
+        if size > 25:
+            flags[25 % size]["is_market"] = True
+        if size > 30:
+            flags[30 % size]["is_farm"] = True
+        if size > 32:
+            flags[32 % size]["is_farm"] = True
+        if size > 34:
+            flags[34 % size]["is_battle"] = True
+        if size > 35:
+            flags[35 % size]["is_estate"] = True
+        if size > 37:
+            flags[37 % size]["is_mine"] = True
+    return tuple(TemplateSquare(id=i, **f) for i, f in enumerate(flags))
+
+
+# fields that differ from the template once a game touches a square
+_SQUARE_STATE_FIELDS = ("crop", "owner", "building_owner", "is_story", "story_label", "story_color", "story_turns", "story_effect")
+
+
+def _is_pristine(sq: Square, template: TemplateSquare) -> bool:
+    return all(getattr(sq, f) == getattr(template, f) for f in _SQUARE_STATE_FIELDS)
+
+
+class Board:
+    """A game's board: a shared template plus a sparse overlay of touched squares.
+
+    Indexing and iteration return the game's own square where one exists and
+    the shared, frozen template square otherwise, so reads never allocate.
+    Code that changes a square must get it through ``mut(i)``, which copies
+    the template square into the overlay on first write.
+
+    ``fork()`` makes a copy that shares every overlay square with this board;
+    whichever side writes a shared square first gets its own copy, so a fork
+    costs one pointer per touched square until something changes.
+    """
+
+    __slots__ = ("template", "overlay", "owned")
+
+    def __init__(self, template: Tuple[TemplateSquare, ...], overlay: Optional[Dict[int, Square]] = None):
+        self.template = template
+        self.overlay: Dict[int, Square] = overlay if overlay is not None else {}
+        # overlay squares referenced only by this board (safe to write in place)
+        self.owned = set(self.overlay)
+
+    @classmethod
+    def from_squares(cls, squares: List[Square]) -> "Board":
+        template = board_template(len(squares))
+        overlay = {i: sq for i, sq in enumerate(squares) if not _is_pristine(sq, template[i])}
+        return cls(template, overlay)
+
+    def __len__(self) -> int:
+        return len(self.template)
+
+    def __getitem__(self, i: int) -> Square:
+        sq = self.overlay.get(i)
+        return sq if sq is not None else self.template[i]
+
+    def __iter__(self):
+        overlay = self.overlay
+        if not overlay:
+            return iter(self.template)
+        return (overlay.get(i, t) for i, t in enumerate(self.template))
+
+    def mut(self, i: int) -> Square:
+        sq = self.overlay.get(i)
+        if sq is None:
+            t = self.template[i]
+            sq = self.overlay[i] = Square.model_construct(**{f: getattr(t, f) for f in Square.model_fields})
+            self.owned.add(i)
+        elif i not in self.owned:
+            # the crop is the only nested (mutable) field
+            sq = self.overlay[i] = sq.model_copy(update={"crop": sq.crop.model_copy() if sq.crop else None})
+            self.owned.add(i)
+        return sq
+
+    def fork(self) -> "Board":
+        self.owned.clear()
+        other = Board(self.template, dict(self.overlay))
+        other.owned.clear()
+        return other
+
+    def touched(self) -> List[Square]:
+        """Squares this game has written to (the only ones that can carry crops, owners or stories)."""
+        return list(self.overlay.values())
+
+    def compact(self):
+        """Drop overlay squares that have returned to their template state."""
+        for i in [i for i, sq in self.overlay.items() if _is_pristine(sq, self.template[i])]:
+            del self.overlay[i]
+            self.owned.discard(i)
+
+    @classmethod
+    def __get_pydantic_core_schema__(cls, source: Any, handler: GetCoreSchemaHandler) -> core_schema.CoreSchema:
+        squares = handler.generate_schema(List[Square])
+        from_list = core_schema.chain_schema([squares, core_schema.no_info_plain_validator_function(cls.from_squares)])
+        return core_schema.json_or_python_schema(
+            json_schema=from_list,
+            python_schema=core_schema.union_schema([core_schema.is_instance_schema(cls), from_list]),
+            serialization=core_schema.plain_serializer_function_ser_schema(list, return_schema=squares),
+        )
+
+
+def create_board(size: int = 20) -> Board:
+    return Board(board_template(size))
+
+
 class Player(BaseModel):
     id: str
     name: str
@@ -57,7 +222,7 @@ class Player(BaseModel):
 class GameState(BaseModel):
     players: List[Player]
     current_player: int
-    board: List[Square]
+    board: Board
     turn: int
     dice_value: Optional[int] = None
     awaiting_action: bool = False
@@ -72,59 +237,316 @@ class GameState(BaseModel):
     final_assets: Optional[Dict[str, int]] = None
     winner: Optional[str] = None
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    restore_snapshot()
+    # the boards are read back in the background; GET /leaderboard says "warming" until then
+    boards = asyncio.ensure_future(restore_leaderboard())
+    if app.state.warmup:
+        warm_up(app)
+    minigame_timers.start()
+    try:
+        yield
+    finally:
+        boards.cancel()
+        await asyncio.gather(boards, return_exceptions=True)
+        await minigame_timers.stop()
+        if _archive is not None:
+            _archive.flush()
+        save_snapshot()
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
 
+# handlers are registered on each app by create_app()
+routes = RouteTable()
 
-def create_board(size: int = 20) -> List[Square]:
-    board = [Square(id=i) for i in range(size)]
-    # place events on first loop
-    if size > 5:
-        board[5].is_market = True
-    if size > 10:
-        board[10].is_farm = True
-    if size > 12:
-        board[12].is_farm = True
-    if size > 14:
-        board[14].is_battle = True
-    if size > 15:
-        board[15].is_estate = True
-    if size > 17:
-        board[17].is_mine = True
-    # place mirrored events for large boards (40 etc.)
-    if size >= 36:
-        if size > 25:
-            board[25 % size].is_market = True
-        if size > 30:
-            board[30 % size].is_farm = True
-        if size > 32:
-            board[32 % size].is_farm = True
-        if size > 34:
-            board[34 % size].is_battle = True
-        if size > 35:
-            board[35 % size].is_estate = True
-        if size > 37:
-            board[37 % size].is_mine = True
-    return board
+_GAME_PATH = re.compile(r"^/game/(?!create$)([^/]+)")
+
+
+async def notify_game_changes(request: Request, call_next):
+    """Every successful POST under /game/{game_id} counts as a state change."""
+    response = await call_next(request)
+    if request.method == "POST" and response.status_code < 400:
+        m = _GAME_PATH.match(request.url.path)
+        if m:
+            _game_changed(m.group(1))
+    return response
+
+
+_GAME_STATE_PATH = re.compile(r"^/game/([^/]+)$")
+compressed_responses = CompressedCache()
+
+
+async def compress_responses(request: Request, call_next):
+    """Compress JSON responses for clients that accept it.
+
+    Compressed ``GET /game/{game_id}`` bodies are cached per game version, so
+    repeated polls of an unchanged game skip both serialization and compression.
+    """
+    encoding = choose_encoding(request.headers.get("accept-encoding"))
+    if encoding is None:
+        return await call_next(request)
+    cache_key = None
+    version = 0
+    if request.method == "GET":
+        m = _GAME_STATE_PATH.match(request.url.path)
+        # games.get, not "in": reading the game applies any pending catch-up first
+        if m and games.get(m.group(1)) is not None:
+            cache_key = m.group(1)
+            version = game_versions.get(cache_key, 0)
+            cached = compressed_responses.get(cache_key, version, encoding)
+            if cached is not None:
+                return Response(cached, media_type="application/json",
+                                headers={"Content-Encoding": encoding, "Vary": "Accept-Encoding"})
+
+    response = await call_next(request)
+    if "content-encoding" in response.headers or not response.headers.get("content-type", "").startswith("application/json"):
+        return response
+    raw = b"".join([chunk async for chunk in response.body_iterator])
+    headers = response.headers.mutablecopy()
+    del headers["content-length"]
+    if len(raw) < MIN_COMPRESS_SIZE:
+        return Response(raw, status_code=response.status_code, headers=headers)
+    body = ENCODERS[encoding](raw)
+    if cache_key is not None and response.status_code == 200:
+        compressed_responses.put(cache_key, version, encoding, body)
+    headers["content-encoding"] = encoding
+    headers["vary"] = "Accept-Encoding"
+    return Response(body, status_code=response.status_code, headers=headers)
+
+
+admission = AdmissionController(AdmissionSettings.from_env())
+
+
+async def admission_control(request: Request, call_next):
+    """Rate-limit per client and per game, and shed load by route priority."""
+    if not admission.settings.enabled:
+        return await call_next(request)
+    priority = classify(request.method, request.url.path)
+    # streams are admitted by their handlers (_admit_stream) for as long as they stay open
+    if priority is None or priority == "spectator":
+        return await call_next(request)
+    m = _GAME_PATH.match(request.url.path)
+    client = request.client.host if request.client else "unknown"
+    rejected = admission.admit(priority, client, m.group(1) if m else None)
+    if rejected is not None:
+        status, retry_after = rejected
+        detail = "Too many requests" if status == 429 else "Server busy"
+        return JSONResponse({"detail": detail}, status_code=status,
+                            headers={"Retry-After": str(max(1, int(retry_after + 0.999)))})
+    try:
+        return await call_next(request)
+    finally:
+        admission.release()
+
+
+def _admit_stream(client: Optional[str]) -> Optional[Tuple[int, float]]:
+    """Take a stream slot for a spectator (None: admitted, release with admission.release_stream)."""
+    if not admission.settings.enabled:
+        admission.streams += 1
+        return None
+    return admission.admit_stream(client or "unknown")
+
+
+
+
+# game rules from app/rules.json (or SUGOROKU_RULES_PATH); handlers read
+# rule_store.current on each call, so POST /rules/reload applies immediately
+rule_store = RuleStore(os.environ.get("SUGOROKU_RULES_PATH") or DEFAULT_RULES_PATH, [c.value for c in CropType])
 
 
 def get_crop_growth_time(tp: CropType) -> int:
-    return {
-        CropType.CARROT: 2,
-        CropType.TOMATO: 3,
-        CropType.CORN: 4,
-        CropType.WHEAT: 3,
-    }[tp]
+    return rule_store.current.growth_time[tp.value]
+
+
+# reads catch a game up on the ticks it slept through (see _catch_up)
+games: Dict[str, GameState] = GameStore(lambda game_id, game, ticks: _catch_up(game_id, game, ticks),
+                                        tick_seconds=rule_store.current.config.dormancy.tick_seconds)
+
+
+def _encode_game(game_id: str) -> Optional[bytes]:
+    game = games.get(game_id)
+    return game.model_dump_json().encode() if game is not None else None
+
+
+spectators = SpectatorHub(_encode_game)
+
+# market state of every live game; SUGOROKU_SHARED_MARKET=1 makes all games trade on one exchange.
+# Built by get_markets() on first use, so NumPy is not imported at startup.
+_markets: Optional["MarketEngine"] = None
+
+
+def get_markets() -> "MarketEngine":
+    global _markets
+    if _markets is None:
+        from .market import MarketEngine
+        _markets = MarketEngine(
+            [c.value for c in CropType],
+            shared=os.environ.get("SUGOROKU_SHARED_MARKET", "0") not in ("0", "false", "off", ""),
+            rules=rule_store.current.config.market,
+        )
+    return _markets
+
+
+def _apply_rules(tables: RuleTables):
+    if _markets is not None:
+        _markets.rules = tables.config.market
+    games.set_tick(tables.config.dormancy.tick_seconds)
+
+
+rule_store.on_reload(_apply_rules)
+
+# per-game price history for charts; one quote per turn
+MARKET_HISTORY_CAPACITY = 128
+market_histories: Dict[str, MarketHistory] = {}
+
+
+# per-turn snapshots for undo and branching
+HISTORY_CAPACITY = 120
+state_histories: Dict[str, StateHistory[GameState]] = {}
+_branch_ids = itertools.count(1)
+
+
+def snapshot_state(game: GameState) -> GameState:
+    """Copy of ``game`` that shares every unchanged square with it (see ``Board.fork``)."""
+    return game.model_copy(update={
+        "board": game.board.fork(),
+        "players": [p.model_copy(update={"inventory": dict(p.inventory)}) for p in game.players],
+        "crop_prices": dict(game.crop_prices),
+        "crop_changes": dict(game.crop_changes),
+        "minigame": copy.deepcopy(game.minigame),
+        "final_assets": dict(game.final_assets) if game.final_assets is not None else None,
+    })
+
+
+def _record_snapshot(game_id: str, game: GameState):
+    hist = state_histories.get(game_id)
+    if hist is None:
+        hist = state_histories[game_id] = StateHistory(HISTORY_CAPACITY)
+    hist.record(game.turn, snapshot_state(game))
+
+
+def _record_market(game_id: str, game: GameState):
+    hist = market_histories.get(game_id)
+    if hist is None:
+        hist = market_histories[game_id] = MarketHistory([c.value for c in CropType], MARKET_HISTORY_CAPACITY)
+    hist.record(game.turn, game.stock_price, game.crop_prices)
+
+
+# finished-game archive; set SUGOROKU_ARCHIVE_PATH to "" to disable. The default sits in the
+# backend directory, not in whatever directory the server happens to be started from.
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ARCHIVE_PATH = os.environ.get("SUGOROKU_ARCHIVE_PATH", os.path.join(BACKEND_DIR, "archive.sqlite3"))
+_archive: Optional["GameArchive"] = None
+# the leaderboard restore may open the archive from a worker thread
+_archive_lock = threading.Lock()
+
 
+def get_archive() -> Optional["GameArchive"]:
+    global _archive
+    if _archive is None and ARCHIVE_PATH:
+        with _archive_lock:
+            if _archive is None:
+                from .archive import GameArchive  # sqlite3 is loaded on first use
+                _archive = GameArchive(ARCHIVE_PATH)
+    return _archive
 
-games: Dict[str, GameState] = {}
+
+# best final assets per player: all-time, today and this week
+leaderboard = Leaderboard()
+
+
+def _read_leaderboard(periods: Dict[str, str]) -> Tuple[int, Dict[str, Any]]:
+    archived, rows = get_archive().leaderboard_rows(periods)
+    return archived, stored_rankings(rows, periods)
+
+
+async def restore_leaderboard() -> int:
+    """Load the boards' stored bests from the archive; returns the number of archived games they cover.
+
+    Opening SQLite, reading the rows and sorting them happen on a worker
+    thread, so neither startup nor requests wait. The event loop only swaps
+    the finished rankings in, merging any game finished meanwhile.
+    """
+    if not ARCHIVE_PATH:
+        return 0
+    leaderboard.warming = True
+    try:
+        archived, boards = await run_in_threadpool(_read_leaderboard, leaderboard.periods())
+        leaderboard.adopt(boards)
+        leaderboard.restored = archived
+        return archived
+    except Exception:
+        logger.exception("leaderboard: cannot restore from the archive")
+        return 0
+    finally:
+        leaderboard.warming = False
+
+
+# finished games that could not be ranked or archived; reported in /metrics
+result_failures: Dict[str, int] = {"leaderboard": 0, "archive": 0}
+
+
+def _result_failed(kind: str, game_id: str, exc: BaseException):
+    result_failures[kind] += 1
+    logger.error("%s: cannot record finished game %s", kind, game_id, exc_info=exc)
+
+
+def _archive_written(game_id: str, written: "Future[int]"):
+    exc = written.exception()
+    if exc is not None:
+        _result_failed("archive", game_id, exc)
+
+
+def _on_game_finished(game_id: str, game: GameState):
+    """Rank and archive a finished game. Best-effort: failures are logged and counted, never raised."""
+    totals = game.final_assets or {}
+    # one timestamp for both, so a restart reads back exactly the entries ranked now
+    finished_at = time.time()
+    try:
+        leaderboard.record(game_id, [(p.name, totals.get(p.id, 0)) for p in game.players if p.id != "bot"],
+                           at=finished_at)
+    except Exception as e:
+        _result_failed("leaderboard", game_id, e)
+    try:
+        archive = get_archive()
+        if archive is not None:
+            # written on the archive's own thread; the request doesn't wait for SQLite
+            archive.submit(game_id, game, finished_at).add_done_callback(partial(_archive_written, game_id))
+    except Exception as e:
+        _result_failed("archive", game_id, e)
+
+
+# bumped on every state change; keys caches of encoded game state
+game_versions: Dict[str, int] = {}
+
+# status / minigame / player / last-activity indexes behind GET /games
+game_index = GameIndex()
+GAME_STATUSES = ("active", "minigame", "overdue", "finished")
+
+
+def _game_status(game: GameState) -> str:
+    if game.game_over:
+        return "finished"
+    if game.turn >= rule_store.current.config.turn_limit:
+        # past the last turn but not settled, e.g. stuck behind a minigame
+        return "overdue"
+    if game.minigame:
+        return "minigame"
+    return "active"
+
+
+def _game_changed(game_id: str):
+    """Notify everything that mirrors a game's state that it has changed."""
+    game_versions[game_id] = game_versions.get(game_id, 0) + 1
+    spectators.publish(game_id)
+    game = games.get(game_id)
+    if game is not None:
+        game_index.update(game_id, _game_status(game), _minigame_type(game.minigame) if game.minigame else None,
+                          [p.name for p in game.players])
+    if game is not None and game.game_over and not getattr(game, "_recorded", False):
+        setattr(game, "_recorded", True)
+        # results are best-effort; never fail the request that finished the game
+        _on_game_finished(game_id, game)
 
 
 def _finalize_game(game: GameState) -> List[str]:
@@ -164,11 +586,11 @@ def _finalize_game(game: GameState) -> List[str]:
 
 
 def _maybe_finalize_game(game: GameState, events: Optional[List[str]] = None):
-    """Finalize only when 60+ turns and no pending action/minigame."""
+    """Finalize only at the turn limit with no pending action/minigame."""
     try:
         if getattr(game, 'game_over', False):
             return
-        if int(getattr(game, 'turn', 0)) >= 60 and not getattr(game, 'awaiting_action', False) and not getattr(game, 'minigame', None):
+        if int(getattr(game, 'turn', 0)) >= rule_store.current.config.turn_limit and not getattr(game, 'awaiting_action', False) and not getattr(game, 'minigame', None):
             evs = _finalize_game(game)
             if events is not None:
                 events.extend(evs)
@@ -177,48 +599,451 @@ def _maybe_finalize_game(game: GameState, events: Optional[List[str]] = None):
         pass
 
 
-@app.get("/healthz")
-async def healthz():
-    return {"status": "ok"}
+# Server-side minigame deadlines come from the rules (``time_limits``).
+# Clients keep their own countdowns for display; these only reclaim
+# minigames that were abandoned.
+# slack on top of the client-visible time limit for network latency
+MINIGAME_GRACE_SECONDS = 5
 
+_timer_ids = itertools.count(1)
 
-@app.post("/game/create")
-async def create_game(player_name: str):
-    game_id = f"game_{random.randint(1000, 9999)}"
-    p1 = Player(id="player1", name=player_name, position=0, coins=100, crops_harvested=0, inventory={})
-    bot = Player(id="bot", name="Bot", position=0, coins=100, crops_harvested=0, inventory={})
-
-    crop_prices = {k: random.randint(30, 100) for k in [
-        CropType.CARROT.value,
-        CropType.TOMATO.value,
-        CropType.CORN.value,
-        CropType.WHEAT.value,
-    ]}
-
-    state = GameState(
-        players=[p1, bot],
+
+def _minigame_type(mg: Dict[str, Any]) -> str:
+    return mg.get("type") or "invader"
+
+
+def _require_no_minigame(game: GameState):
+    """Turn actions wait until the seat's own battle or mining run is over (end_turn settles it instead)."""
+    mg = game.minigame
+    if mg and _minigame_type(mg) != "invader":
+        raise HTTPException(status_code=400, detail="Finish the minigame first")
+
+
+def _arm_minigame_timer(game_id: str, game: GameState):
+    """Attach a fresh deadline to the game's current minigame; older deadlines become stale."""
+    mg = game.minigame
+    if not mg:
+        return
+    limit = mg.get("time_limit") or rule_store.current.time_limits.get(_minigame_type(mg), 60)
+    delay = float(limit) + MINIGAME_GRACE_SECONDS
+    token = str(next(_timer_ids))
+    mg["timer_id"] = token
+    mg["expires_at"] = time.time() + delay
+    minigame_timers.schedule(game_id, token, delay)
+
+
+def _pass_turn(game: GameState):
+    game.awaiting_action = False
+    game.current_player = (game.current_player + 1) % len(game.players)
+
+
+def _resolve_invader(game: GameState, winner: str) -> List[str]:
+    """Apply the invader duel result and clear the minigame."""
+    mg = game.minigame or {}
+    attacker_id = mg["attacker_id"]
+    defender_id = mg["defender_id"]
+    sq = game.board.mut(int(mg["square_id"]))
+    # apply result based on winner
+    winner = (winner or "attacker").lower()
+    attacker = next((p for p in game.players if p.id == attacker_id), None)
+    defender = next((p for p in game.players if p.id == defender_id), None)
+    if winner == "attacker":
+        # 勝者が挑戦者（攻撃側）の場合: 作物マスを奪取
+        sq.owner = attacker_id
+    else:
+        # 勝者が挑まれた側（防御側）の場合: 報酬コイン獲得
+        reward = rule_store.current.config.invader.defender_reward
+        if defender:
+            defender.coins += reward
+    # build reward logs for invader minigame result
+    events: List[str] = []
+    if winner == "attacker":
+        if attacker and defender:
+            events.append(f"インベーダー勝利: {attacker.name} がマス{sq.id}を奪取！")
+            events.append(f"{defender.name}: 作物マスを失った……")
+        else:
+            events.append(f"インベーダー勝利: マス{sq.id}を奪取！")
+    else:
+        if defender:
+            events.append(f"防衛成功: {defender.name} は+{reward}コインの報酬！")
+        if attacker:
+            events.append(f"{attacker.name}: 作物マスを奪えなかった……")
+    game.minigame = None
+    return events
+
+
+def _end_battle(game: GameState, p: Player, victory: bool):
+    """Settle an RPG/hybrid battle for ``p`` and pass the turn."""
+    battle = rule_store.current.config.battle
+    if victory:
+        p.coins += battle.victory_reward
+    else:
+        loss = min(p.coins, battle.defeat_loss)
+        p.coins -= loss
+    game.minigame = None
+    # end action phase and pass turn to next player
+    _pass_turn(game)
+
+
+def _finish_mining(game: GameState, bot_score: int) -> List[str]:
+    """Close the mining minigame against ``bot_score`` and pass the turn; coins unaffected."""
+    mg = game.minigame or {}
+    score = int(mg.get("score", 0))
+    player_name = next((pl.name for pl in game.players if pl.id == mg.get("player_id")), None)
+    winner = 'BOT' if bot_score > score else (player_name or 'Player') if score > bot_score else '引き分け'
+    events = [
+        f"採掘終了: {player_name or 'Player'} のスコア {score}",
+        f"採掘終了: BOT のスコア {bot_score}",
+        f"勝者: {winner}",
+    ]
+    game.minigame = None
+    _pass_turn(game)
+    return events
+
+
+def _settle_minigame(game: GameState) -> List[str]:
+    """Resolve an abandoned minigame with a deterministic outcome.
+
+    Invader duels go to the defender, battles count as a defeat and mining is
+    scored with whatever both sides dug so far. Battles and mining pass the turn.
+    """
+    mg = game.minigame or {}
+    kind = _minigame_type(mg)
+    events: List[str] = []
+    if kind == "invader":
+        events = _resolve_invader(game, "defender")
+    elif kind == "mining":
+        events = _finish_mining(game, int(mg.get("bot_score", 0) or 0))
+    else:
+        p = next((pl for pl in game.players if pl.id == mg.get("player_id")), None)
+        if p is None:
+            game.minigame = None
+        else:
+            _end_battle(game, p, victory=False)
+    return events
+
+
+def _expire_minigame(game_id: str, token: str):
+    """Timer callback: settle the minigame if ``token`` is still its deadline."""
+    game = games.get(game_id)
+    mg = game.minigame if game else None
+    if not mg or mg.get("timer_id") != token:
+        return
+    events = _settle_minigame(game)
+    _maybe_finalize_game(game, events)
+    _game_changed(game_id)
+
+
+minigame_timers = TimerScheduler(_expire_minigame)
+
+
+def new_game_state(players: List[Player]) -> GameState:
+    """Fresh 20-tile game for ``players``; seats whose id is "bot" are played by the server."""
+    market = rule_store.current.config.market
+    crop_prices = {c.value: random.randint(*market.crop_price) for c in CropType}
+
+    return GameState(
+        players=players,
         current_player=0,
         board=create_board(20),
         turn=1,
         awaiting_action=False,
-        stock_price=80,
+        stock_price=market.initial_stock_price,
         last_stock_change=0,
         crop_prices=crop_prices,
         crop_changes={k: 0 for k in crop_prices.keys()},
         bazaar_offer_price=None,
     )
+
+
+def register_game(game_id: str, state: GameState):
     games[game_id] = state
+    get_markets().attach(game_id, state)
+    _game_changed(game_id)
+    market_histories.pop(game_id, None)
+    state_histories.pop(game_id, None)
+    _record_market(game_id, state)
+
+
+def drop_game(game_id: str):
+    """Forget a game and every per-game side table."""
+    games.pop(game_id, None)
+    if _markets is not None:
+        _markets.release(game_id)
+    market_histories.pop(game_id, None)
+    state_histories.pop(game_id, None)
+    game_versions.pop(game_id, None)
+    game_index.remove(game_id)
+    snapshot_failures.pop(game_id, None)
+
+
+@routes.get("/healthz")
+async def healthz():
+    return {"status": "ok"}
+
+
+@routes.post("/game/create")
+async def create_game(player_name: str):
+    game_id = f"game_{random.randint(1000, 9999)}"
+    while game_id in games:
+        game_id = f"game_{random.randint(1000, 9999)}"
+    coins = rule_store.current.config.starting_coins
+    p1 = Player(id="player1", name=player_name, position=0, coins=coins, crops_harvested=0, inventory={})
+    bot = Player(id="bot", name="Bot", position=0, coins=coins, crops_harvested=0, inventory={})
+    state = new_game_state([p1, bot])
+    register_game(game_id, state)
     return {"game_id": game_id, "game_state": state}
 
 
-@app.get("/game/{game_id}")
+@routes.get("/games")
+async def list_games(status: Optional[str] = None, minigame: Optional[str] = None, player: Optional[str] = None,
+                     idle_seconds: Optional[float] = None, oldest_first: bool = False,
+                     limit: int = 50, offset: int = 0):
+    """Page through live games by status, minigame type, player name and idle time, most recently active first."""
+    if status is not None and status not in GAME_STATUSES:
+        raise HTTPException(status_code=400, detail=f"status must be one of {', '.join(GAME_STATUSES)}")
+    limit = max(1, min(limit, 200))
+    offset = max(0, offset)
+    total, ids = game_index.query(status=status, minigame=minigame, player=player, idle_seconds=idle_seconds,
+                                  oldest_first=oldest_first, limit=limit, offset=offset)
+    page = []
+    stale = 0
+    for game_id in ids:
+        game = games.get(game_id)
+        if game is None:
+            # dropped without going through drop_game: forget it rather than fail the listing
+            game_index.remove(game_id)
+            stale += 1
+            continue
+        page.append({
+            "game_id": game_id,
+            "status": game_index.status(game_id),
+            "turn": game.turn,
+            "minigame": _minigame_type(game.minigame) if game.minigame else None,
+            "players": [p.name for p in game.players],
+            "last_activity": game_index.last_activity(game_id),
+        })
+    total -= stale
+    return {
+        "total": total,
+        "counts": game_index.counts(),
+        "offset": offset,
+        "next_offset": offset + len(page) if offset + len(page) < total else None,
+        "games": page,
+    }
+
+
+@routes.get("/game/{game_id}")
 async def get_game(game_id: str):
     if game_id not in games:
         raise HTTPException(status_code=404, detail="Game not found")
     return games[game_id]
 
 
-@app.post("/game/{game_id}/roll-dice")
+@routes.get("/game/{game_id}/market/history")
+async def market_history(game_id: str, since_turn: Optional[int] = None):
+    """Stock and crop price history as parallel arrays indexed like ``turns``."""
+    if game_id not in games:
+        raise HTTPException(status_code=404, detail="Game not found")
+    hist = market_histories.get(game_id)
+    if hist is None:
+        _record_market(game_id, games[game_id])
+        hist = market_histories[game_id]
+    return hist.query(since_turn)
+
+
+@routes.post("/tournament")
+async def start_tournament(strategies: str, format: str = "round-robin",
+                           games_per_pair: int = Query(10, alias="games"),
+                           workers: Optional[int] = None, seed: int = 0):
+    """Run a bot-vs-bot tournament headlessly on a process pool; poll GET /tournament/{id}.
+
+    One tournament runs at a time (409 otherwise) on at most one worker per CPU.
+    """
+    from . import tournament
+    try:
+        run = tournament.start(strategies, format, games_per_pair, workers, seed)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    except tournament.TournamentBusy as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+    return run.to_dict()
+
+
+@routes.get("/tournament/{tournament_id}")
+async def get_tournament(tournament_id: str):
+    from . import tournament
+    run = tournament.tournaments.get(tournament_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail="Tournament not found")
+    return run.to_dict()
+
+
+@routes.get("/leaderboard")
+async def get_leaderboard(window: str = "all", limit: int = 50, offset: int = 0, player: Optional[str] = None):
+    """Players ranked by their best final assets; ``player`` adds that player's rank in the window."""
+    if window not in WINDOWS:
+        raise HTTPException(status_code=400, detail=f"window must be one of {', '.join(WINDOWS)}")
+    page = leaderboard.page(window, limit=max(1, min(limit, 200)), offset=max(0, offset))
+    # while warming, results from before the restart are still being loaded
+    page = {**page, "warming": leaderboard.warming}
+    if player is None:
+        return page
+    return {**page, "player": leaderboard.rank(window, player)}
+
+
+@routes.get("/metrics")
+async def metrics():
+    return {
+        "games": len(games),
+        "games_by_status": game_index.counts(),
+        "snapshot": {"path": SNAPSHOT_PATH or None, "not_loaded": len(games.deferred), "error": snapshot_error,
+                     "failed": sorted(snapshot_failures)},
+        "leaderboard": leaderboard.metrics(),
+        "result_failures": dict(result_failures),
+        "admission": admission.metrics(),
+        "spectators": {"subscribers": spectators.subscriber_count(), "skipped_versions": spectators.skipped},
+        "minigame_timers": {"pending": len(minigame_timers)},
+        "compression_cache": {"entries": len(compressed_responses), "hits": compressed_responses.hits, "misses": compressed_responses.misses},
+    }
+
+
+def _market_moved(game_id: str):
+    game = games.get(game_id)
+    if game is not None:
+        _record_market(game_id, game)
+        _game_changed(game_id)
+
+
+@routes.get("/market")
+async def market_overview():
+    """Live market count, and the shared quote when all games trade on one exchange."""
+    markets = get_markets()
+    overview: Dict[str, Any] = {"shared": markets.shared, "games": len(markets)}
+    if markets.shared:
+        overview.update(markets.shared_quote())
+    return overview
+
+
+@routes.post("/market/tick")
+async def market_tick():
+    """Advance every live game's market in one pass."""
+    moved = get_markets().tick()
+    for game_id in moved:
+        _market_moved(game_id)
+    return {"games": len(moved)}
+
+
+@routes.post("/market/shock")
+async def market_shock(stock_pct: float = 0.0, crop_pct: float = 0.0):
+    """Server-wide event: move every market by the given percentages."""
+    if stock_pct <= -100 or crop_pct <= -100:
+        raise HTTPException(status_code=400, detail="Percentages must be above -100")
+    moved = get_markets().shock(stock_pct, crop_pct)
+    for game_id in moved:
+        _market_moved(game_id)
+    return {"games": len(moved)}
+
+
+@routes.get("/rules")
+async def get_rules():
+    return rule_store.describe()
+
+
+@routes.post("/rules/reload")
+async def reload_rules():
+    """Re-read the rules file; on a validation error the current rules stay in effect."""
+    try:
+        rule_store.reload()
+    except RulesError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"message": "rules reloaded", "version": rule_store.version}
+
+
+@routes.get("/archive/stats")
+async def archive_stats(player_name: Optional[str] = None, limit: int = 20):
+    """Aggregates over every archived game: win rates, average assets, stock price at finish."""
+    archive = get_archive()
+    if archive is None:
+        raise HTTPException(status_code=404, detail="Archive disabled")
+    return await run_in_threadpool(archive.stats, player_name=player_name, limit=max(1, min(limit, 200)))
+
+
+# Keep-alive interval for idle spectator connections (seconds)
+SPECTATOR_KEEPALIVE_SECONDS = 15
+
+
+@routes.websocket("/game/{game_id}/spectate")
+async def spectate_ws(websocket: WebSocket, game_id: str):
+    """Push the game state to a watcher on every change (binary frames of UTF-8 JSON)."""
+    if game_id not in games:
+        await websocket.close(code=4404)
+        return
+    if _admit_stream(websocket.client.host if websocket.client else None) is not None:
+        await websocket.close(code=1013)  # try again later
+        return
+    await websocket.accept()
+    sub = spectators.subscribe(game_id)
+
+    async def until_disconnect():
+        # watchers never send anything we need; reading is how a close is noticed
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+
+    closed = asyncio.ensure_future(until_disconnect())
+    try:
+        while True:
+            waiting = asyncio.ensure_future(sub.next_frame(SPECTATOR_KEEPALIVE_SECONDS))
+            await asyncio.wait({waiting, closed}, return_when=asyncio.FIRST_COMPLETED)
+            if closed.done():
+                waiting.cancel()
+                break
+            frame = waiting.result()
+            if frame is None:
+                if game_id not in games:
+                    break
+                # a send on a dead connection fails, which ends a half-open watcher
+                await websocket.send_text("keep-alive")
+                continue
+            await websocket.send_bytes(frame)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        closed.cancel()
+        sub.close()
+        admission.release_stream()
+
+
+@routes.get("/game/{game_id}/spectate/sse")
+async def spectate_sse(game_id: str, request: Request):
+    """Server-sent events variant of the spectator stream."""
+    if game_id not in games:
+        raise HTTPException(status_code=404, detail="Game not found")
+    rejected = _admit_stream(request.client.host if request.client else None)
+    if rejected is not None:
+        status, retry_after = rejected
+        raise HTTPException(status_code=status, detail="Too many requests" if status == 429 else "Server busy",
+                            headers={"Retry-After": str(max(1, int(retry_after + 0.999)))})
+    sub = spectators.subscribe(game_id, fmt="sse")
+
+    async def stream():
+        try:
+            while not await request.is_disconnected():
+                frame = await sub.next_frame(SPECTATOR_KEEPALIVE_SECONDS)
+                if frame is None:
+                    if game_id not in games:
+                        break
+                    yield b": keep-alive\n\n"
+                    continue
+                yield frame
+        finally:
+            sub.close()
+            admission.release_stream()
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@routes.post("/game/{game_id}/roll-dice")
 async def roll_dice(game_id: str):
     if game_id not in games:
         raise HTTPException(status_code=404, detail="Game not found")
@@ -227,7 +1052,11 @@ async def roll_dice(game_id: str):
     # prevent further play after game over
     if getattr(game, 'game_over', False):
         raise HTTPException(status_code=400, detail="Game is over")
+    _require_no_minigame(game)
+    tables = rule_store.current
+    rules = tables.config
     events: List[str] = []
+    _record_snapshot(game_id, game)
 
     current = game.players[game.current_player]
     dice = random.randint(1, 6)
@@ -238,19 +1067,13 @@ async def roll_dice(game_id: str):
     new_pos = (current.position + dice) % len(game.board)
     current.position = new_pos
 
-    # crop growth across board
-    for sq in game.board:
-        if sq.crop and sq.crop.stage != CropStage.READY:
-            diff = game.turn - sq.crop.planted_turn
-            if diff >= sq.crop.growth_time:
-                sq.crop.stage = CropStage.READY
-            elif diff >= max(1, sq.crop.growth_time // 2):
-                sq.crop.stage = CropStage.GROWING
+    _grow_crops(game)
 
     # auto-harvest only when stopping on a READY crop you own
     stop_sq = game.board[current.position]
     if stop_sq.crop and stop_sq.crop.stage == CropStage.READY and stop_sq.owner == current.id:
-        qty = random.randint(1, 5)
+        stop_sq = game.board.mut(current.position)
+        qty = random.randint(*rules.harvest_qty)
         key = stop_sq.crop.type.value
         current.inventory[key] = current.inventory.get(key, 0) + qty
         current.crops_harvested += qty
@@ -285,37 +1108,27 @@ async def roll_dice(game_id: str):
     # RPG battle tile (square 14): random encounter for human; bot auto-resolves
     stop_sq = game.board[current.position]
     if getattr(stop_sq, 'is_battle', False):
+        battle = rules.battle
         if current.id != "bot":
-            enemy_pool = [
-                {"name": "スライム", "hp": 30, "atk_min": 1, "atk_max": 3},
-                {"name": "ゴブリン", "hp": 30, "atk_min": 2, "atk_max": 4},
-                {"name": "オオカミ", "hp": 30, "atk_min": 1, "atk_max": 4},
-            ]
-            foe = random.choice(enemy_pool)
+            foe = random.choice(battle.rpg_enemies)
             game.minigame = {
                 "type": "rpg",
                 "status": "countdown",
                 "player_id": current.id,
-                "player_hp": 10,
-                "enemy": {"name": foe["name"], "hp": 30, "max_hp": 30, "atk_min": foe["atk_min"], "atk_max": foe["atk_max"]},
+                "player_hp": battle.player_hp,
+                "enemy": {"name": foe.name, "hp": battle.enemy_hp, "max_hp": battle.enemy_hp, "atk_min": foe.atk_min, "atk_max": foe.atk_max},
                 "created_turn": game.turn,
-                "log": [f"{foe['name']} が あらわれた！"],
+                "log": [f"{foe.name} が あらわれた！"],
             }
-            events.append(f"バトル開始: {foe['name']} 出現！")
+            events.append(f"バトル開始: {foe.name} 出現！")
         else:
-            # bot auto resolve
-            enemy_hp = 30
-            player_hp = 10
-            while enemy_hp > 0 and player_hp > 0:
-                enemy_hp -= random.randint(3, 6)
-                if enemy_hp <= 0:
-                    break
-                player_hp -= random.randint(1, 4)
-            if enemy_hp <= 0:
-                current.coins += 100
-                events.append("BOTは野良モンスターを倒した！（+100コイン）")
+            # bot auto resolve: a single draw against the exact odds of the
+            # battle (precomputed with the rules) instead of simulating it
+            if random.random() < tables.bot_battle_odds:
+                current.coins += battle.bot_victory_reward
+                events.append(f"BOTは野良モンスターを倒した！（+{battle.bot_victory_reward}コイン）")
             else:
-                loss = min(current.coins, 20)
+                loss = min(current.coins, battle.bot_defeat_loss)
                 current.coins -= loss
                 events.append(f"BOTは逃げ出した…（-{loss}コイン）")
 
@@ -324,21 +1137,7 @@ async def roll_dice(game_id: str):
     if getattr(stop_sq, 'is_mine', False):
         if current.id != "bot":
             # Minecraft-like distribution: many dirt/stone, rare gems
-            kinds = [
-                ("diamond", 50, 2),
-                ("emerald", 40, 3),
-                ("sapphire", 30, 4),
-                ("topaz", 20, 6),
-                ("iron", 10, 18),
-                ("stone", 0, 36),
-                ("dirt", 0, 50),
-            ]
-            field: List[Dict[str, Any]] = []
-            bid = 0
-            for name, val, count in kinds:
-                for _ in range(count):
-                    field.append({"id": bid, "kind": name, "value": val, "mined": False})
-                    bid += 1
+            field = [{"id": bid, "kind": kind, "value": val, "mined": False} for bid, kind, val in tables.mining_field]
             random.shuffle(field)
             game.minigame = {
                 "type": "mining",
@@ -347,82 +1146,65 @@ async def roll_dice(game_id: str):
                 "created_turn": game.turn,
                 "score": 0,
                 "field": field,
-                "time_limit": 30,
+                "time_limit": rules.mining.time_limit,
                 "bot_score": 0,
             }
             events.append("採掘ミニゲーム: ブロックを掘ってスコアを稼ごう！")
         else:
-            score = sum(random.choice([0, 10, 20, 30, 40, 50]) for _ in range(5))
+            score = sum(random.choice(rules.mining.bot_dig_values) for _ in range(rules.mining.bot_digs))
             events.append(f"BOTは採掘を行い、仮スコア {score} を記録した！")
 
-    # stock price change (clamp 10..300)
-    old = game.stock_price
-    delta = random.randint(-30, 30)
-    newp = max(10, min(300, old + delta))
-    pct = int(round(((newp - old) / old) * 100)) if old > 0 else 0
-    game.stock_price = newp
-    game.last_stock_change = pct
-    if pct != 0:
+    if game.minigame and "timer_id" not in game.minigame:
+        _arm_minigame_timer(game_id, game)
+
+    # stock random walk (clamp 10..300) and crop market update (30..100) every turn
+    moved = get_markets().step(game_id, game)
+    pct = game.last_stock_change
+    if moved is not None and pct != 0:
+        old, newp = moved
         events.append(f"株価が{old}→{newp}（{'+' if pct>0 else ''}{pct}%）に変動")
 
     # per-player turn counter
     turns_for_player = getattr(current, "_turns", 0) + 1
     setattr(current, "_turns", turns_for_player)
 
-    # crop market update (30..100) every turn
-    if game.crop_prices:
-        new_prices: Dict[str, int] = {}
-        new_changes: Dict[str, int] = {}
-        for k, oldp in game.crop_prices.items():
-            np = random.randint(30, 100)
-            chg = int(round(((np - oldp) / oldp) * 100)) if oldp > 0 else 0
-            new_prices[k] = np
-            new_changes[k] = chg
-        game.crop_prices = new_prices
-        game.crop_changes = new_changes
-    else:
-        game.crop_prices = {k: random.randint(30, 100) for k in [
-            CropType.CARROT.value,
-            CropType.TOMATO.value,
-            CropType.CORN.value,
-            CropType.WHEAT.value,
-        ]}
-        game.crop_changes = {k: 0 for k in game.crop_prices.keys()}
-
-    # building income: every 3 turns for the player
-    if turns_for_player % 3 == 0:
-        bcnt = sum(1 for s in game.board if s.building_owner == current.id)
+    # building income: every few turns for the player
+    if turns_for_player % rules.buildings.income_every_turns == 0:
+        bcnt = sum(1 for s in game.board.touched() if s.building_owner == current.id)
         if bcnt > 0:
-            income = 50 * bcnt
+            income = rules.buildings.income * bcnt
             current.coins += income
             events.append(f"{current.name}: 建物の収益 +{income}コイン（{bcnt}棟）")
 
     # bazaar offer: always present when on farm (fixed presence)
     if stop_sq.is_farm:
-        game.bazaar_offer_price = random.randint(50, 200)
+        game.bazaar_offer_price = random.randint(*rules.bazaar_offer)
     else:
         game.bazaar_offer_price = None
 
     # next phase/turn
     game.turn += 1
     # === AI Story: apply/decay story tiles and resolve on landing ===
-    events.extend(_ai_story_tick(game, current))
+    events.extend(_ai_story_tick(game_id, game, current))
+    game.board.compact()
     if current.id == "bot":
         # bot simple auto-plant on empty normal tile
-        if stop_sq.crop is None and not (stop_sq.is_market or stop_sq.is_farm or stop_sq.is_estate) and current.coins >= 20:
+        if stop_sq.crop is None and not (stop_sq.is_market or stop_sq.is_farm or stop_sq.is_estate) and current.coins >= rules.plant_cost:
             ct = random.choice(list(CropType))
-            current.coins -= 20
+            current.coins -= rules.plant_cost
+            stop_sq = game.board.mut(current.position)
             stop_sq.crop = Crop(type=ct, stage=CropStage.PLANTED, planted_turn=game.turn, growth_time=get_crop_growth_time(ct))
             stop_sq.owner = current.id
             events.append(f"{current.name}: {ct.value}を植えた")
         # bot auto-build when at estate
-        if stop_sq.is_estate and current.coins >= 500:
+        cost = rules.buildings.cost
+        if stop_sq.is_estate and current.coins >= cost:
             candidates = [s for s in game.board if not (s.is_market or s.is_farm or s.is_estate) and not s.building_owner]
             if candidates:
-                tgt = random.choice(candidates)
-                current.coins -= 500
+                tgt = game.board.mut(random.choice(candidates).id)
+                current.coins -= cost
                 tgt.building_owner = current.id
-                events.append(f"{current.name}: マス{tgt.id}に建物を建設（500コイン）")
+                events.append(f"{current.name}: マス{tgt.id}に建物を建設（{cost}コイン）")
         # pass to human
         game.current_player = (game.current_player + 1) % len(game.players)
         game.awaiting_action = False
@@ -460,6 +1242,8 @@ async def roll_dice(game_id: str):
         game.final_assets = totals
         game.winner = win_name
 
+    _record_market(game_id, game)
+
     # 60ターン到達時の決算は、イベントやミニゲームの処理完了後に行う
     _maybe_finalize_game(game, events)
 
@@ -467,16 +1251,71 @@ async def roll_dice(game_id: str):
     return {"game_state": game, "events": events, "dice_value": dice}
 
 
-def _ai_story_tick(game: GameState, current: Player):
+def _grow_crops(game: GameState):
+    """Move every crop to the stage its age (turns since planting) has reached."""
+    # only touched squares can hold crops
+    for sq in game.board.touched():
+        if sq.crop and sq.crop.stage != CropStage.READY:
+            diff = game.turn - sq.crop.planted_turn
+            if diff >= sq.crop.growth_time:
+                game.board.mut(sq.id).crop.stage = CropStage.READY
+            elif diff >= max(1, sq.crop.growth_time // 2) and sq.crop.stage != CropStage.GROWING:
+                game.board.mut(sq.id).crop.stage = CropStage.GROWING
+
+
+def _catch_up(game_id: str, game: GameState, ticks: int):
+    """Apply ``ticks`` idle ticks at once, as if a sweep had visited the game after each.
+
+    Crops age by ``ticks`` turns until they are ready, story tiles lose ``ticks`` turns (one with n
+    turns left is gone after n + 1) and buildings pay their owners once per
+    ``income_every_turns`` ticks, counting the ticks left over from earlier
+    catch-ups. Finished games stay as they are.
+    """
+    if game.game_over:
+        return
+    rules = rule_store.current.config
+    ticks = min(ticks, rules.dormancy.max_ticks)
+
+    for sq in game.board.touched():
+        if sq.crop and sq.crop.stage != CropStage.READY:
+            # a crop stops aging at its first tick as READY
+            crop = game.board.mut(sq.id).crop
+            crop.planted_turn -= min(ticks, max(1, crop.growth_time - (game.turn - crop.planted_turn)))
+        if sq.is_story:
+            sq = game.board.mut(sq.id)
+            if sq.story_turns < ticks:
+                sq.is_story = False
+                sq.story_label = None
+                sq.story_color = None
+                sq.story_effect = None
+                sq.story_turns = 0
+            else:
+                sq.story_turns -= ticks
+    _grow_crops(game)
+
+    idle = getattr(game, "_idle_ticks", 0)
+    payouts = (idle + ticks) // rules.buildings.income_every_turns
+    setattr(game, "_idle_ticks", (idle + ticks) % rules.buildings.income_every_turns)
+    if payouts:
+        for p in game.players:
+            bcnt = sum(1 for s in game.board.touched() if s.building_owner == p.id)
+            p.coins += rules.buildings.income * bcnt * payouts
+    _game_changed(game_id)
+
+
+def _ai_story_tick(game_id: str, game: GameState, current: Player):
     """Simple AI story system: occasionally paints temporary story tiles and
     applies lightweight effects when a player lands on them.
     """
-    rng = random.Random()
+    # the global generator, so a seeded game replays exactly
+    rng = random
+    story = rule_store.current.config.story
     evs: List[str] = []
 
     # 1) Decay existing story overlays
-    for sq in game.board:
+    for sq in game.board.touched():
         if getattr(sq, 'is_story', False):
+            sq = game.board.mut(sq.id)
             sq.story_turns = max(0, int(getattr(sq, 'story_turns', 0)))
             if sq.story_turns <= 0:
                 # clear
@@ -489,41 +1328,43 @@ def _ai_story_tick(game: GameState, current: Player):
 
     # 2) Randomly spawn a new story tile on a normal (non-event) square
     #    small chance per roll to avoid noise
-    if rng.random() < 0.25:
+    if rng.random() < story.spawn_chance:
         normal_candidates = [s for s in game.board if not (s.is_market or s.is_farm or s.is_estate) and not s.is_story]
         if normal_candidates:
-            sq = rng.choice(normal_candidates)
-            effect = rng.choice(['gift', 'tax', 'boost'])
-            label, color = {
-                'gift': ('福', 'emerald'),
-                'tax': ('禍', 'rose'),
-                'boost': ('風', 'sky'),
-            }[effect]
+            sq = game.board.mut(rng.choice(normal_candidates).id)
+            effect = rng.choice(rule_store.current.story_effects)
+            style = story.effects[effect]
             sq.is_story = True
-            sq.story_label = label
-            sq.story_color = color
+            sq.story_label = style.label
+            sq.story_color = style.color
             sq.story_effect = effect
-            sq.story_turns = rng.randint(2, 4)
-            evs.append(f"AIストーリー: マス{sq.id}に『{label}』の気配が漂う…（{sq.story_turns}ターン）")
+            sq.story_turns = rng.randint(*story.duration)
+            evs.append(f"AIストーリー: マス{sq.id}に『{style.label}』の気配が漂う…（{sq.story_turns}ターン）")
 
     # 3) Resolve if current player landed on a story tile
     stop_sq = game.board[current.position]
     if getattr(stop_sq, 'is_story', False) and stop_sq.story_effect:
+        stop_sq = game.board.mut(current.position)
         effect = stop_sq.story_effect
-        if effect == 'gift':
-            amt = rng.randint(30, 80)
+        # a tile painted before a rules reload may name an effect that is gone
+        params = story.effects.get(effect)
+        if params is None:
+            evs.append("何も起こらなかった。")
+        elif effect == 'gift':
+            amt = rng.randint(*params.coins)
             current.coins += amt
             evs.append(f"{current.name}: 謎の加護で+{amt}コイン！")
         elif effect == 'tax':
-            amt = rng.randint(20, 60)
+            amt = rng.randint(*params.coins)
             pay = min(current.coins, amt)
             current.coins -= pay
             evs.append(f"{current.name}: 不運に見舞われ-{pay}コイン…")
         elif effect == 'boost':
             # small global boost to crop prices
             if game.crop_prices:
-                for k in list(game.crop_prices.keys()):
-                    game.crop_prices[k] = int(round(min(300, game.crop_prices[k] * 1.1)))
+                for other_id in get_markets().scale_crops(game_id, params.factor):
+                    if other_id != game_id:
+                        _market_moved(other_id)
                 evs.append("風の便り：作物相場が少し上向きに！")
             else:
                 evs.append("風が吹いたが、特に影響はなかった。")
@@ -537,19 +1378,25 @@ def _ai_story_tick(game: GameState, current: Player):
     return evs
 
 
-@app.post("/game/{game_id}/end-turn")
+@routes.post("/game/{game_id}/end-turn")
 async def end_turn(game_id: str):
     if game_id not in games:
         raise HTTPException(status_code=404, detail="Game not found")
     game = games[game_id]
-    game.awaiting_action = False
     game.bazaar_offer_price = None
-    game.current_player = (game.current_player + 1) % len(game.players)
-    _maybe_finalize_game(game)
-    return {"message": "Turn ended", "game_state": game}
+    if game.minigame and _minigame_type(game.minigame) != "invader":
+        # walking away from a battle or the mine settles it like a missed
+        # deadline (and passes the turn); otherwise nobody could act on it
+        events = _settle_minigame(game)
+    else:
+        events = []
+        game.awaiting_action = False
+        game.current_player = (game.current_player + 1) % len(game.players)
+    _maybe_finalize_game(game, events)
+    return {"message": "Turn ended", "game_state": game, "events": events}
 
 
-@app.get("/game/{game_id}/minigame")
+@routes.get("/game/{game_id}/minigame")
 async def get_minigame(game_id: str):
     if game_id not in games:
         raise HTTPException(status_code=404, detail="Game not found")
@@ -559,7 +1406,22 @@ async def get_minigame(game_id: str):
     return {"minigame": game.minigame, "game_state": game}
 
 
-@app.post("/game/{game_id}/minigame/ready")
+@routes.get("/game/{game_id}/minigame/odds")
+async def get_minigame_odds(game_id: str):
+    """Exact win probability (and end-state distribution) of the live RPG/hybrid battle."""
+    if game_id not in games:
+        raise HTTPException(status_code=404, detail="Game not found")
+    game = games[game_id]
+    if not getattr(game, 'minigame', None):
+        raise HTTPException(status_code=404, detail="No minigame")
+    from .battle_math import minigame_odds
+    odds = minigame_odds(game.minigame, rule_store.current.config.battle.player_hp)
+    if odds is None:
+        raise HTTPException(status_code=400, detail="No odds for this minigame")
+    return odds
+
+
+@routes.post("/game/{game_id}/minigame/ready")
 async def minigame_ready(game_id: str):
     if game_id not in games:
         raise HTTPException(status_code=404, detail="Game not found")
@@ -570,50 +1432,23 @@ async def minigame_ready(game_id: str):
     return {"message": "minigame started", "minigame": game.minigame, "game_state": game}
 
 
-@app.post("/game/{game_id}/minigame/resolve")
+@routes.post("/game/{game_id}/minigame/resolve")
 async def minigame_resolve(game_id: str, winner: str = "attacker"):
     if game_id not in games:
         raise HTTPException(status_code=404, detail="Game not found")
     game = games[game_id]
     mg = game.minigame
-    if not mg:
-        raise HTTPException(status_code=404, detail="No minigame")
+    if not mg or _minigame_type(mg) != "invader":
+        raise HTTPException(status_code=404, detail="No invader minigame")
     sq_id = int(mg["square_id"])
     if not (0 <= sq_id < len(game.board)):
         raise HTTPException(status_code=400, detail="Invalid square")
-    attacker_id = mg["attacker_id"]
-    defender_id = mg["defender_id"]
-    sq = game.board[sq_id]
-    # apply result based on winner
-    winner = (winner or "attacker").lower()
-    attacker = next((p for p in game.players if p.id == attacker_id), None)
-    defender = next((p for p in game.players if p.id == defender_id), None)
-    if winner == "attacker":
-        # 勝者が挑戦者（攻撃側）の場合: 作物マスを奪取
-        sq.owner = attacker_id
-    else:
-        # 勝者が挑まれた側（防御側）の場合: 50コイン獲得
-        if defender:
-            defender.coins += 50
-    # build reward logs for invader minigame result
-    events: List[str] = []
-    if winner == "attacker":
-        if attacker and defender:
-            events.append(f"インベーダー勝利: {attacker.name} がマス{sq.id}を奪取！")
-            events.append(f"{defender.name}: 作物マスを失った……")
-        else:
-            events.append(f"インベーダー勝利: マス{sq.id}を奪取！")
-    else:
-        if defender:
-            events.append(f"防衛成功: {defender.name} は+50コインの報酬！")
-        if attacker:
-            events.append(f"{attacker.name}: 作物マスを奪えなかった……")
-    game.minigame = None
+    events = _resolve_invader(game, winner)
     _maybe_finalize_game(game, events)
     return {"message": "minigame resolved", "game_state": game, "events": events}
 
 
-@app.post("/game/{game_id}/minigame/rpg/act")
+@routes.post("/game/{game_id}/minigame/rpg/act")
 async def rpg_minigame_act(game_id: str, action: str = "attack"):
     if game_id not in games:
         raise HTTPException(status_code=404, detail="Game not found")
@@ -635,11 +1470,7 @@ async def rpg_minigame_act(game_id: str, action: str = "attack"):
     log.append(f"あなたの攻撃！ {dmg} ダメージ")
     if mg["enemy"]["hp"] <= 0:
         # victory
-        p.coins += 100
-        game.minigame = None
-        # end action phase and pass turn to next player
-        game.awaiting_action = False
-        game.current_player = (game.current_player + 1) % len(game.players)
+        _end_battle(game, p, victory=True)
         _maybe_finalize_game(game)
         return {"message": "victory", "game_state": game}
 
@@ -651,11 +1482,7 @@ async def rpg_minigame_act(game_id: str, action: str = "attack"):
     log.append(f"{mg['enemy']['name']} の攻撃！ {edmg} ダメージ")
     if mg["player_hp"] <= 0:
         # defeat
-        loss = min(p.coins, 30)
-        p.coins -= loss
-        game.minigame = None
-        game.awaiting_action = False
-        game.current_player = (game.current_player + 1) % len(game.players)
+        _end_battle(game, p, victory=False)
         _maybe_finalize_game(game)
         return {"message": "defeat", "game_state": game}
 
@@ -664,45 +1491,38 @@ async def rpg_minigame_act(game_id: str, action: str = "attack"):
     return {"message": "turn resolved", "game_state": game}
 
 
-@app.post("/game/{game_id}/minigame/hybrid/start")
+@routes.post("/game/{game_id}/minigame/hybrid/start")
 async def hybrid_minigame_start(game_id: str):
     if game_id not in games:
         raise HTTPException(status_code=404, detail="Game not found")
     game = games[game_id]
+    if not game.awaiting_action:
+        raise HTTPException(status_code=400, detail="Not your action phase")
     p = game.players[game.current_player]
     sq = game.board[p.position]
     if not getattr(sq, 'is_battle', False):
         raise HTTPException(status_code=400, detail="Not on battle square")
+    if game.minigame and _minigame_type(game.minigame) not in ("rpg", "hybrid"):
+        raise HTTPException(status_code=400, detail="Finish the minigame first")
     # create/convert to hybrid encounter
-    enemy_pool = [
-        {"name": "スライム", "hp": random.randint(10, 14), "dodge": 0.35},
-        {"name": "ゴブリン", "hp": random.randint(12, 16), "dodge": 0.45},
-        {"name": "影の戦士", "hp": random.randint(14, 18), "dodge": 0.6},
-    ]
-    foe = random.choice(enemy_pool)
+    battle = rule_store.current.config.battle
+    foe = random.choice(battle.hybrid_enemies)
     game.minigame = {
         "type": "hybrid",
         "status": "moving",
         "player_id": p.id,
-        "player_hp": 15,
+        "player_hp": battle.player_hp,
         "player_guard": 0,
         "player_evade": 0,
-        "enemy": {"name": foe["name"], "hp": foe["hp"], "max_hp": foe["hp"], "dodge": foe["dodge"]},
+        "enemy": {"name": foe.name, "hp": battle.enemy_hp, "max_hp": battle.enemy_hp, "dodge": foe.dodge},
         "created_turn": game.turn,
-        "log": [f"{foe['name']} が あらわれた！"],
+        "log": [f"{foe.name} が あらわれた！"],
     }
-    # enforce HP settings: player=10, enemy=30
-    try:
-        game.minigame["player_hp"] = 10
-        if isinstance(game.minigame.get("enemy"), dict):
-            game.minigame["enemy"]["hp"] = 30
-            game.minigame["enemy"]["max_hp"] = 30
-    except Exception:
-        pass
+    _arm_minigame_timer(game_id, game)
     return {"message": "hybrid ready", "game_state": game, "minigame": game.minigame}
 
 
-@app.post("/game/{game_id}/minigame/hybrid/command")
+@routes.post("/game/{game_id}/minigame/hybrid/command")
 async def hybrid_minigame_command(game_id: str, action: str = "attack"):
     if game_id not in games:
         raise HTTPException(status_code=404, detail="Game not found")
@@ -749,10 +1569,7 @@ async def hybrid_minigame_command(game_id: str, action: str = "attack"):
 
     # check victory
     if int(enemy["hp"]) <= 0:
-        p.coins += 100
-        game.minigame = None
-        game.awaiting_action = False
-        game.current_player = (game.current_player + 1) % len(game.players)
+        _end_battle(game, p, victory=True)
         _maybe_finalize_game(game)
         return {"message": "victory", "game_state": game}
 
@@ -786,11 +1603,7 @@ async def hybrid_minigame_command(game_id: str, action: str = "attack"):
     mg["player_evade"] = 0
 
     if int(mg["player_hp"]) <= 0:
-        loss = min(p.coins, 30)
-        p.coins -= loss
-        game.minigame = None
-        game.awaiting_action = False
-        game.current_player = (game.current_player + 1) % len(game.players)
+        _end_battle(game, p, victory=False)
         _maybe_finalize_game(game)
         return {"message": "defeat", "game_state": game}
 
@@ -798,7 +1611,7 @@ async def hybrid_minigame_command(game_id: str, action: str = "attack"):
     return {"message": "turn resolved", "game_state": game}
 
 
-@app.post("/game/{game_id}/minigame/mining/dig")
+@routes.post("/game/{game_id}/minigame/mining/dig")
 async def mining_dig(game_id: str, block_id: int):
     if game_id not in games:
         raise HTTPException(status_code=404, detail="Game not found")
@@ -825,7 +1638,7 @@ async def mining_dig(game_id: str, block_id: int):
     return {"message": "dug", "gained": val, "game_state": game, "minigame": mg}
 
 
-@app.post("/game/{game_id}/minigame/mining/bot-dig")
+@routes.post("/game/{game_id}/minigame/mining/bot-dig")
 async def mining_bot_dig(game_id: str):
     if game_id not in games:
         raise HTTPException(status_code=404, detail="Game not found")
@@ -844,7 +1657,7 @@ async def mining_bot_dig(game_id: str):
     return {"message": "bot dug", "gained": val, "game_state": game, "minigame": mg}
 
 
-@app.post("/game/{game_id}/minigame/mining/finish")
+@routes.post("/game/{game_id}/minigame/mining/finish")
 async def mining_finish(game_id: str):
     if game_id not in games:
         raise HTTPException(status_code=404, detail="Game not found")
@@ -852,32 +1665,78 @@ async def mining_finish(game_id: str):
     mg = game.minigame
     if not mg or mg.get("type") != "mining":
         raise HTTPException(status_code=404, detail="No mining minigame")
-    # clear minigame and pass to next player; coins unaffected
-    score = int(mg.get("score", 0))
-    player_name = next((pl.name for pl in game.players if pl.id == mg.get("player_id")), None)
-        # BOT競争スコア（未設定時は擬似計算）
-    score = int(mg.get("score", 0))
+    # BOT競争スコア（未設定時は擬似計算）
     try:
         bot_score = int(mg.get("bot_score", 0))
     except Exception:
         bot_score = 0
     if bot_score <= 0:
-        import random
-        bot_score = random.randint(120, 260)
-    player_name = next((pl.name for pl in game.players if pl.id == mg.get("player_id")), None)
-    winner = 'BOT' if bot_score > score else (player_name or 'Player') if score > bot_score else '引き分け'
-    events = [
-        f"採掘終了: {player_name or 'Player'} のスコア {score}",
-        f"採掘終了: BOT のスコア {bot_score}",
-        f"勝者: {winner}",
-    ]
-    game.minigame = None
-    game.awaiting_action = False
-    game.current_player = (game.current_player + 1) % len(game.players)
+        bot_score = random.randint(*rule_store.current.config.mining.bot_finish_score)
+    events = _finish_mining(game, bot_score)
     _maybe_finalize_game(game, events)
     return {"message": "mining finished", "game_state": game, "events": events}
 
-@app.post("/game/{game_id}/next-stage")
+@routes.get("/game/{game_id}/history")
+async def get_history(game_id: str):
+    """Turns that can be restored with undo or branched from."""
+    if game_id not in games:
+        raise HTTPException(status_code=404, detail="Game not found")
+    hist = state_histories.get(game_id)
+    return {"turns": hist.turns() if hist else [], "current_turn": games[game_id].turn}
+
+
+@routes.post("/game/{game_id}/undo")
+async def undo(game_id: str):
+    """Rewind to the state before the most recent dice roll."""
+    if game_id not in games:
+        raise HTTPException(status_code=404, detail="Game not found")
+    hist = state_histories.get(game_id)
+    entry = hist.pop() if hist else None
+    if entry is None:
+        raise HTTPException(status_code=400, detail="Nothing to undo")
+    turn, snap = entry
+    if getattr(games[game_id], "_recorded", False):
+        # the result is already archived and ranked; replaying the ending must not count it again
+        setattr(snap, "_recorded", True)
+    games[game_id] = snap
+    get_markets().attach(game_id, snap)
+    if game_id in market_histories:
+        market_histories[game_id].truncate(turn)
+    _arm_minigame_timer(game_id, snap)
+    return {"message": "undone", "game_state": snap}
+
+
+@routes.post("/game/{game_id}/branch")
+async def branch(game_id: str, turn: Optional[int] = None):
+    """Start a new game from this one as it was before the roll at ``turn`` (default: now)."""
+    if game_id not in games:
+        raise HTTPException(status_code=404, detail="Game not found")
+    game = games[game_id]
+    hist = state_histories.get(game_id)
+    if turn is None or turn == game.turn:
+        source, turn = game, game.turn
+    else:
+        source = hist.at_turn(turn) if hist else None
+        if source is None:
+            raise HTTPException(status_code=404, detail="No snapshot for that turn")
+    state = snapshot_state(source)
+    # a branch of a game that already counted (from any turn) never counts again
+    setattr(state, "_recorded", bool(getattr(game, "_recorded", False)))
+    new_id = f"{game_id}-b{next(_branch_ids)}"
+    register_game(new_id, state)
+    if game_id in market_histories:
+        market = market_histories[game_id].copy()
+        market.truncate(turn)
+        market_histories[new_id] = market
+    if hist is not None:
+        branch_hist = hist.copy()
+        branch_hist.truncate(turn)
+        state_histories[new_id] = branch_hist
+    _arm_minigame_timer(new_id, state)
+    return {"game_id": new_id, "branched_from": game_id, "turn": turn, "game_state": state}
+
+
+@routes.post("/game/{game_id}/next-stage")
 async def next_stage(game_id: str):
     if game_id not in games:
         raise HTTPException(status_code=404, detail="Game not found")
@@ -893,16 +1752,23 @@ async def next_stage(game_id: str):
     game.game_over = False
     game.final_assets = None
     game.winner = None
+    setattr(game, "_recorded", False)
     # reset positions
     for p in game.players:
         p.position = 0
+    # turns restart, so the previous stage's quotes would collide with the new ones
+    if game_id in market_histories:
+        market_histories[game_id].clear()
+    state_histories.pop(game_id, None)
+    _record_market(game_id, game)
     return {"message": "next stage", "game_state": game}
 
-@app.post("/game/{game_id}/plant-crop")
+@routes.post("/game/{game_id}/plant-crop")
 async def plant_crop(game_id: str, crop_type: CropType):
     if game_id not in games:
         raise HTTPException(status_code=404, detail="Game not found")
     game = games[game_id]
+    _require_no_minigame(game)
     p = game.players[game.current_player]
     sq = game.board[p.position]
 
@@ -911,10 +1777,12 @@ async def plant_crop(game_id: str, crop_type: CropType):
         raise HTTPException(status_code=400, detail="Cannot plant on event square")
     if sq.crop is not None:
         raise HTTPException(status_code=400, detail="Square already has a crop")
-    if p.coins < 20:
+    cost = rule_store.current.config.plant_cost
+    if p.coins < cost:
         raise HTTPException(status_code=400, detail="Not enough coins")
 
-    p.coins -= 20
+    p.coins -= cost
+    sq = game.board.mut(p.position)
     sq.crop = Crop(type=crop_type, stage=CropStage.PLANTED, planted_turn=game.turn, growth_time=get_crop_growth_time(crop_type))
     sq.owner = p.id
 
@@ -925,28 +1793,31 @@ async def plant_crop(game_id: str, crop_type: CropType):
     return {"message": "planted", "game_state": game}
 
 
-@app.post("/game/{game_id}/harvest-crop")
+@routes.post("/game/{game_id}/harvest-crop")
 async def harvest_crop(game_id: str):
     if game_id not in games:
         raise HTTPException(status_code=404, detail="Game not found")
     game = games[game_id]
+    _require_no_minigame(game)
     p = game.players[game.current_player]
     sq = game.board[p.position]
     if not sq.crop or sq.owner != p.id or sq.crop.stage != CropStage.READY:
         raise HTTPException(status_code=400, detail="Nothing to harvest here")
-    qty = random.randint(1, 5)
+    qty = random.randint(*rule_store.current.config.harvest_qty)
     key = sq.crop.type.value
     p.inventory[key] = p.inventory.get(key, 0) + qty
     p.crops_harvested += qty
+    sq = game.board.mut(p.position)
     sq.crop = None
     sq.owner = None
+    game.board.compact()
     game.awaiting_action = False
     game.current_player = (game.current_player + 1) % len(game.players)
     _maybe_finalize_game(game)
     return {"message": "harvested", "harvested_qty": qty, "game_state": game}
 
 
-@app.post("/game/{game_id}/buy-stock")
+@routes.post("/game/{game_id}/buy-stock")
 async def buy_stock(game_id: str, shares: int = 1):
     if game_id not in games:
         raise HTTPException(status_code=404, detail="Game not found")
@@ -963,7 +1834,7 @@ async def buy_stock(game_id: str, shares: int = 1):
     return {"message": "bought", "game_state": game}
 
 
-@app.post("/game/{game_id}/sell-stock")
+@routes.post("/game/{game_id}/sell-stock")
 async def sell_stock(game_id: str, shares: int = 1):
     if game_id not in games:
         raise HTTPException(status_code=404, detail="Game not found")
@@ -979,7 +1850,7 @@ async def sell_stock(game_id: str, shares: int = 1):
     return {"message": "sold", "game_state": game}
 
 
-@app.post("/game/{game_id}/sell-inventory")
+@routes.post("/game/{game_id}/sell-inventory")
 async def sell_inventory(game_id: str, crop_type: str, qty: int):
     if game_id not in games:
         raise HTTPException(status_code=404, detail="Game not found")
@@ -1002,7 +1873,7 @@ async def sell_inventory(game_id: str, crop_type: str, qty: int):
     return {"message": "sold", "sold_qty": sell_n, "unit_price": game.bazaar_offer_price, "game_state": game}
 
 
-@app.post("/game/{game_id}/build-estate")
+@routes.post("/game/{game_id}/build-estate")
 async def build_estate(game_id: str, target_square_id: int):
     if game_id not in games:
         raise HTTPException(status_code=404, detail="Game not found")
@@ -1018,13 +1889,165 @@ async def build_estate(game_id: str, target_square_id: int):
         raise HTTPException(status_code=400, detail="Cannot build on event square")
     if tgt.building_owner:
         raise HTTPException(status_code=400, detail="Building already exists on target")
-    if p.coins < 500:
+    cost = rule_store.current.config.buildings.cost
+    if p.coins < cost:
         raise HTTPException(status_code=400, detail="Not enough coins")
-    p.coins -= 500
+    p.coins -= cost
+    tgt = game.board.mut(target_square_id)
     tgt.building_owner = p.id
     _maybe_finalize_game(game)
     return {"message": "built", "game_state": game}
 
 
+# live games are written here on shutdown and read back lazily on startup; "" disables
+SNAPSHOT_PATH = os.environ.get("SUGOROKU_SNAPSHOT_PATH", os.path.join(BACKEND_DIR, "games.snapshot"))
+_snapshot: Optional[Snapshot] = None
+snapshot_error: Optional[str] = None
+# game_id -> why it could not be decoded; the game stays in the snapshot
+snapshot_failures: Dict[str, str] = {}
 
 
+def _snapshot_entry(game_id: str, game: GameState) -> Tuple[str, bytes, List[Any]]:
+    # per-game counters the server keeps outside the model
+    extra = {
+        "turns": {p.id: getattr(p, "_turns", 0) for p in game.players},
+        "idle_ticks": getattr(game, "_idle_ticks", 0),
+        "recorded": getattr(game, "_recorded", False),
+    }
+    raw = json.dumps(extra, separators=(",", ":")).encode() + b"\n" + game.model_dump_json().encode()
+    # what a restore needs without decoding the game: the GET /games index row and the catch-up clock
+    meta = [
+        _game_status(game),
+        _minigame_type(game.minigame) if game.minigame else None,
+        [p.name for p in game.players],
+        game_index.last_activity(game_id) or time.time(),
+        games.evaluated_at(game_id),
+    ]
+    return game_id, encode_blob(raw), meta
+
+
+def _load_snapshot_game(game_id: str) -> GameState:
+    try:
+        extra, _, state = _snapshot.read(game_id).partition(b"\n")
+        extra = json.loads(extra)
+        game = GameState.model_validate_json(state)
+    except Exception as e:
+        # keep the stored copy (it is carried into the next snapshot) but stop listing the game
+        if game_id not in snapshot_failures:
+            logger.error("snapshot: cannot load game %s: %s", game_id, e)
+        snapshot_failures[game_id] = str(e)
+        game_index.remove(game_id)
+        raise
+    snapshot_failures.pop(game_id, None)
+    for p in game.players:
+        setattr(p, "_turns", extra["turns"].get(p.id, 0))
+    setattr(game, "_idle_ticks", extra["idle_ticks"])
+    setattr(game, "_recorded", extra["recorded"])
+    get_markets().attach(game_id, game)
+    _record_market(game_id, game)
+    if game.minigame:
+        # the old process's deadline died with it; the player gets a fresh one
+        _arm_minigame_timer(game_id, game)
+    return game
+
+
+def save_snapshot(path: Optional[str] = None) -> int:
+    """Write every live game to the snapshot file; games never read since startup are copied as stored."""
+    path = SNAPSHOT_PATH if path is None else path
+    if not path:
+        return 0
+
+    entries = [_snapshot_entry(game_id, game) for game_id, game in dict.items(games)]
+    entries.extend((game_id, _snapshot.blob(game_id), _snapshot.meta(game_id)) for game_id in games.deferred)
+    # least recently active first, the order restore_snapshot indexes them in
+    entries.sort(key=lambda e: e[2][3])
+    return write_snapshot(path, entries)
+
+
+def restore_snapshot(path: Optional[str] = None) -> int:
+    """Map the snapshot file and register its games to load on first access; returns the game count.
+
+    Only the header is read here. The listing indexes are filled from it, so
+    ``GET /games`` sees every restored game before any has been loaded. A
+    broken file is reported in ``/metrics`` and the server starts empty.
+    """
+    global _snapshot, snapshot_error
+    path = SNAPSHOT_PATH if path is None else path
+    if not path:
+        return 0
+    try:
+        snap = open_snapshot(path)
+    except SnapshotError as e:
+        snapshot_error = str(e)
+        return 0
+    if snap is None:
+        return 0
+    if _snapshot is not None:
+        if games.deferred:
+            # the games still waiting to load are read from the mapped file
+            snap.close()
+            return 0
+        _snapshot.close()
+    _snapshot = snap
+    rows = [(g, *snap.meta(g)) for g in snap if g not in games]
+    game_index.load(r[:5] for r in rows)
+    games.defer(((r[0], r[5]) for r in rows), _load_snapshot_game)
+    return len(rows)
+
+
+def warm_up(app: FastAPI):
+    """Pay the first-use costs at startup instead of on the first requests.
+
+    Builds the board templates, compiles the GameState serializers and the
+    OpenAPI schema, builds the market engine, solves the bot's battle odds,
+    opens the archive and loads every compression codec.
+    """
+    for size in (20, 40):
+        board_template(size)
+    state = new_game_state([Player(id="player1", name="warmup", position=0, coins=0, crops_harvested=0, inventory={})])
+    body = state.model_dump_json().encode()
+    jsonable_encoder({"game_id": "warmup", "game_state": state})
+    for encode in ENCODERS.values():
+        encode(body)
+    app.openapi()
+    get_markets()
+    rule_store.current.bot_battle_odds
+    get_archive()
+
+
+def create_app(warmup: Optional[bool] = None) -> FastAPI:
+    """Build the API app.
+
+    ``warmup`` (default: ``SUGOROKU_WARMUP``, on) runs ``warm_up`` during
+    startup. Game state lives in this module, so every app built here
+    serves the same games.
+    """
+    if warmup is None:
+        warmup = os.environ.get("SUGOROKU_WARMUP", "1") not in ("0", "false", "off", "")
+    app = FastAPI(lifespan=lifespan)
+    app.state.warmup = warmup
+    routes.register(app)
+    # last added is outermost
+    app.middleware("http")(notify_game_changes)
+    app.middleware("http")(compress_responses)
+    app.middleware("http")(admission_control)
+    # outermost, so rejections above still carry CORS headers
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    return app
+
+
+def __getattr__(name: str):
+    # ``app.main:app`` is built on first access, so importing this module (or
+    # serving with ``--factory app.main:create_app``) doesn't build it twice
+    if name == "app":
+        app = globals()["app"] = create_app()
+        return app
+    if name == "markets":  # ``main.markets`` for callers outside this module
+        return get_markets()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,217 @@
+"""Market state of every live game in a few NumPy arrays.
+
+Each game owns one row: its stock price, last stock change and one column
+per crop for prices and changes. A roll advances its game's row; a global
+tick advances every row in one vectorized pass. After an update the row is
+written back into the game's own ``stock_price``/``crop_prices``/... fields
+in place, so handlers and serialization keep reading plain GameState fields
+and no per-roll dicts are allocated.
+
+In shared mode every game is attached to the same row: all games see one
+exchange, rolls don't move it, and only global ticks and shocks do.
+"""
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .rules import MarketRules
+
+
+def _pct(old: np.ndarray, new: np.ndarray) -> np.ndarray:
+    """``int(round((new - old) / old * 100))``, or 0 where old is 0."""
+    safe = np.where(old > 0, old, 1)
+    return np.where(old > 0, np.rint((new - old) / safe * 100), 0).astype(np.int64)
+
+
+class MarketEngine:
+    def __init__(self, crops: Sequence[str], shared: bool = False, capacity: int = 64, seed: Optional[int] = None,
+                 rules: MarketRules = MarketRules()):
+        self.crops = tuple(crops)
+        self.shared = shared
+        # replaced on a rules reload; applies from the next update on
+        self.rules = rules
+        self.rng = np.random.default_rng(seed)
+        self.stock = np.zeros(capacity, np.int64)
+        self.stock_change = np.zeros(capacity, np.int64)
+        self.prices = np.zeros((capacity, len(self.crops)), np.int64)
+        self.changes = np.zeros((capacity, len(self.crops)), np.int64)
+        self._rows: Dict[str, int] = {}
+        self._games: Dict[str, Any] = {}
+        self._free: List[int] = []
+        self._next = 0
+        if shared:
+            self._shared_row = self._allocate()
+            self.stock[self._shared_row] = rules.initial_stock_price
+            self.prices[self._shared_row] = self._draw_prices(len(self.crops))
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, game_id: str) -> bool:
+        return game_id in self._rows
+
+    def seed(self, seed: int):
+        self.rng = np.random.default_rng(seed)
+
+    def _allocate(self) -> int:
+        if self._free:
+            return self._free.pop()
+        if self._next == len(self.stock):
+            grow = len(self.stock)
+            self.stock = np.concatenate([self.stock, np.zeros(grow, np.int64)])
+            self.stock_change = np.concatenate([self.stock_change, np.zeros(grow, np.int64)])
+            self.prices = np.concatenate([self.prices, np.zeros((grow, len(self.crops)), np.int64)])
+            self.changes = np.concatenate([self.changes, np.zeros((grow, len(self.crops)), np.int64)])
+        self._next += 1
+        return self._next - 1
+
+    def row(self, game_id: str) -> int:
+        return self._rows[game_id]
+
+    def attach(self, game_id: str, game: Any):
+        """Bind ``game``'s market fields to a row.
+
+        Outside shared mode the row is loaded from the game, so this is also
+        how a restored or replaced state takes over its game's market. In
+        shared mode the game is overwritten with the shared quote.
+        """
+        self._games[game_id] = game
+        if self.shared:
+            self._rows[game_id] = self._shared_row
+            self._write(game, self._shared_row)
+            return
+        row = self._rows.get(game_id)
+        if row is None:
+            row = self._rows[game_id] = self._allocate()
+        self.stock[row] = game.stock_price
+        self.stock_change[row] = game.last_stock_change
+        if game.crop_prices:
+            self.prices[row] = [int(game.crop_prices.get(c, 0)) for c in self.crops]
+            self.changes[row] = [int(game.crop_changes.get(c, 0)) for c in self.crops]
+        else:
+            self.prices[row] = self._draw_prices(len(self.crops))
+            self.changes[row] = 0
+        self._write(game, row)
+
+    def release(self, game_id: str):
+        row = self._rows.pop(game_id, None)
+        self._games.pop(game_id, None)
+        if row is not None and not self.shared:
+            self._free.append(row)
+
+    def shared_quote(self) -> Dict[str, Any]:
+        row = self._shared_row
+        return {
+            "stock_price": int(self.stock[row]),
+            "last_stock_change": int(self.stock_change[row]),
+            "crop_prices": dict(zip(self.crops, self.prices[row].tolist())),
+            "crop_changes": dict(zip(self.crops, self.changes[row].tolist())),
+        }
+
+    def _write(self, game: Any, row: int):
+        self._assign(game, int(self.stock[row]), int(self.stock_change[row]),
+                     self.prices[row].tolist(), self.changes[row].tolist())
+
+    def _assign(self, game: Any, stock: int, stock_change: int, prices: List[int], changes: List[int]):
+        game.stock_price = stock
+        game.last_stock_change = stock_change
+        game_prices, game_changes = game.crop_prices, game.crop_changes
+        for crop, p, c in zip(self.crops, prices, changes):
+            game_prices[crop] = p
+            game_changes[crop] = c
+
+    def _sync(self, rows: Iterable[int]) -> List[str]:
+        """Write the given rows back into their games; return the ids of those games."""
+        rows = set(rows)
+        # one bulk conversion instead of per-element NumPy indexing
+        stock, stock_change = self.stock.tolist(), self.stock_change.tolist()
+        prices, changes = self.prices.tolist(), self.changes.tolist()
+        synced = []
+        for game_id, game in self._games.items():
+            row = self._rows[game_id]
+            if row in rows:
+                self._assign(game, stock[row], stock_change[row], prices[row], changes[row])
+                synced.append(game_id)
+        return synced
+
+    def _active_rows(self) -> np.ndarray:
+        if self.shared:
+            return np.array([self._shared_row])
+        return np.fromiter(self._rows.values(), np.int64, len(self._rows))
+
+    def _draw_prices(self, shape) -> np.ndarray:
+        lo, hi = self.rules.crop_price
+        return self.rng.integers(lo, hi + 1, shape)
+
+    def _advance(self, rows: np.ndarray):
+        r = self.rules
+        old = self.stock[rows]
+        new = np.clip(old + self.rng.integers(-r.stock_step, r.stock_step + 1, len(rows)), *r.stock_price)
+        self.stock_change[rows] = _pct(old, new)
+        self.stock[rows] = new
+        old_prices = self.prices[rows]
+        new_prices = self._draw_prices(old_prices.shape)
+        self.changes[rows] = _pct(old_prices, new_prices)
+        self.prices[rows] = new_prices
+
+    def step(self, game_id: str, game: Any) -> Optional[Tuple[int, int]]:
+        """Advance one game's market for a roll; ``(old, new)`` stock price.
+
+        Returns None in shared mode, where rolls don't move the market; the
+        game is only refreshed from the shared quote. A state that is not the
+        one attached under ``game_id`` is attached first.
+        """
+        if self._games.get(game_id) is not game:
+            self.attach(game_id, game)
+        row = self._rows[game_id]
+        if self.shared:
+            self._write(game, row)
+            return None
+        # a single row is cheaper in plain ints: one draw call, no temporary arrays
+        r = self.rules
+        lo, hi = r.crop_price
+        u = self.rng.random(1 + len(self.crops)).tolist()
+        old = int(self.stock[row])
+        new = max(r.stock_price[0], min(r.stock_price[1], old - r.stock_step + int(u[0] * (2 * r.stock_step + 1))))
+        old_prices = self.prices[row].tolist()
+        new_prices = [lo + int(x * (hi - lo + 1)) for x in u[1:]]
+        changes = [int(round((n - o) / o * 100)) if o > 0 else 0 for o, n in zip(old_prices, new_prices)]
+        stock_change = int(round((new - old) / old * 100)) if old > 0 else 0
+        self.stock[row] = new
+        self.stock_change[row] = stock_change
+        self.prices[row] = new_prices
+        self.changes[row] = changes
+        self._assign(game, new, stock_change, new_prices, changes)
+        return old, new
+
+    def tick(self) -> List[str]:
+        """Advance every live market in one pass; return the ids of the games that changed."""
+        rows = self._active_rows()
+        if len(rows) == 0:
+            return []
+        self._advance(rows)
+        return self._sync(rows.tolist())
+
+    def scale_crops(self, game_id: str, factor: float) -> List[str]:
+        """Multiply a game's crop prices by ``factor`` (capped); return the games sharing that row."""
+        row = self._rows[game_id]
+        self.prices[row] = np.rint(np.minimum(self.rules.price_cap, self.prices[row] * factor))
+        if self.shared:
+            return self._sync([row])
+        self._write(self._games[game_id], row)
+        return [game_id]
+
+    def shock(self, stock_pct: float = 0.0, crop_pct: float = 0.0) -> List[str]:
+        """Move every market by the given percentages at once; return the ids of the games that changed."""
+        rows = self._active_rows()
+        if len(rows) == 0:
+            return []
+        old = self.stock[rows]
+        new = np.clip(np.rint(old * (1 + stock_pct / 100)), *self.rules.stock_price).astype(np.int64)
+        self.stock_change[rows] = _pct(old, new)
+        self.stock[rows] = new
+        old_prices = self.prices[rows]
+        new_prices = np.clip(np.rint(old_prices * (1 + crop_pct / 100)), 1, self.rules.price_cap).astype(np.int64)
+        self.changes[rows] = _pct(old_prices, new_prices)
+        self.prices[rows] = new_prices
+        return self._sync(rows.tolist())
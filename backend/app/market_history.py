@@ -0,0 +1,78 @@
+from array import array
+from bisect import bisect_left
+from typing import Dict, List, Mapping, Optional, Sequence
+
+
+class MarketHistory:
+    """Fixed-size ring buffer of market quotes for one game.
+
+    Turns, the stock price and one column per crop are stored in parallel
+    ``array('i')`` columns, so a game's whole history is a handful of flat
+    buffers no matter how long it runs. Once full, the oldest quote is
+    overwritten. Turns must be recorded in non-decreasing order.
+    """
+
+    def __init__(self, crops: Sequence[str], capacity: int = 128):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.crops = tuple(crops)
+        self.capacity = capacity
+        self._turns = array("i", bytes(4 * capacity))
+        self._stock = array("i", bytes(4 * capacity))
+        self._prices = [array("i", bytes(4 * capacity)) for _ in self.crops]
+        self._start = 0
+        self._len = 0
+
+    def __len__(self) -> int:
+        return self._len
+
+    def clear(self):
+        self._start = 0
+        self._len = 0
+
+    def truncate(self, max_turn: int):
+        """Forget quotes recorded after ``max_turn`` (used when a game is rewound)."""
+        while self._len and self._turns[(self._start + self._len - 1) % self.capacity] > max_turn:
+            self._len -= 1
+
+    def copy(self) -> "MarketHistory":
+        other = MarketHistory(self.crops, self.capacity)
+        other._turns = self._turns[:]
+        other._stock = self._stock[:]
+        other._prices = [col[:] for col in self._prices]
+        other._start = self._start
+        other._len = self._len
+        return other
+
+    def record(self, turn: int, stock_price: int, crop_prices: Mapping[str, int]):
+        if self._len < self.capacity:
+            slot = (self._start + self._len) % self.capacity
+            self._len += 1
+        else:
+            slot = self._start
+            self._start = (self._start + 1) % self.capacity
+        self._turns[slot] = turn
+        self._stock[slot] = stock_price
+        for col, crop in zip(self._prices, self.crops):
+            col[slot] = int(crop_prices.get(crop, 0))
+
+    def _column(self, col: array, first: int) -> List[int]:
+        # logical range [first, len) of the ring as at most two slices
+        begin = (self._start + first) % self.capacity
+        n = self._len - first
+        end = begin + n
+        if end <= self.capacity:
+            return col[begin:end].tolist()
+        return col[begin:].tolist() + col[:end - self.capacity].tolist()
+
+    def query(self, since_turn: Optional[int] = None) -> Dict[str, object]:
+        """Return quotes with ``turn >= since_turn`` (all when None) as parallel arrays."""
+        first = 0
+        if since_turn is not None:
+            first = bisect_left(range(self._len), since_turn,
+                                key=lambda i: self._turns[(self._start + i) % self.capacity])
+        return {
+            "turns": self._column(self._turns, first),
+            "stock_price": self._column(self._stock, first),
+            "crop_prices": {crop: self._column(col, first) for crop, col in zip(self.crops, self._prices)},
+        }
@@ -0,0 +1,41 @@
+from typing import Any, Callable, Dict, List, Tuple
+
+from fastapi import FastAPI
+
+
+class RouteTable:
+    """Collects route handlers at import time without building them.
+
+    ``fastapi.APIRouter`` analyzes every handler's signature as soon as it is
+    decorated, and ``include_router`` analyzes it again for the app. A table
+    defers that work to ``register``, so it is done once, per app, when the
+    app factory runs.
+    """
+
+    def __init__(self):
+        self._routes: List[Tuple[str, str, Callable, Dict[str, Any]]] = []
+
+    def __len__(self) -> int:
+        return len(self._routes)
+
+    def _add(self, method: str, path: str, **kwargs) -> Callable[[Callable], Callable]:
+        def decorator(fn: Callable) -> Callable:
+            self._routes.append((method, path, fn, kwargs))
+            return fn
+        return decorator
+
+    def get(self, path: str, **kwargs):
+        return self._add("GET", path, **kwargs)
+
+    def post(self, path: str, **kwargs):
+        return self._add("POST", path, **kwargs)
+
+    def websocket(self, path: str, **kwargs):
+        return self._add("WEBSOCKET", path, **kwargs)
+
+    def register(self, app: FastAPI):
+        for method, path, fn, kwargs in self._routes:
+            if method == "WEBSOCKET":
+                app.add_api_websocket_route(path, fn, **kwargs)
+            else:
+                app.add_api_route(path, fn, methods=[method], **kwargs)
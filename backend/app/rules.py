@@ -0,0 +1,247 @@
+"""Game rules loaded from a JSON file and compiled into immutable lookup tables.
+
+``rules.json`` next to this module holds the defaults; ``SUGOROKU_RULES_PATH``
+points the server at another file. The file is validated with the models
+below and compiled once into a ``RuleTables``; ``RuleStore.reload`` swaps in
+a new one atomically (a broken file leaves the current rules in place).
+
+Combat damage formulas stay in code: ``battle_math`` solves the exact odds
+for them.
+"""
+import json
+import os
+from dataclasses import dataclass
+from functools import cached_property
+from types import MappingProxyType
+from typing import Annotated, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from pydantic import AfterValidator, BaseModel, ConfigDict, Field, ValidationError, model_validator
+
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(__file__), "rules.json")
+
+# story effects the server knows how to apply
+STORY_EFFECTS = ("gift", "tax", "boost")
+
+
+def _ordered(r: Tuple[int, int]) -> Tuple[int, int]:
+    if r[0] > r[1]:
+        raise ValueError(f"range {list(r)} is empty")
+    return r
+
+
+IntRange = Annotated[Tuple[int, int], AfterValidator(_ordered)]
+NonNegative = Annotated[int, Field(ge=0)]
+
+
+class _Frozen(BaseModel):
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
+
+class CropRules(_Frozen):
+    growth_time: Annotated[int, Field(ge=1)]
+
+
+class BuildingRules(_Frozen):
+    cost: NonNegative
+    income: NonNegative
+    income_every_turns: Annotated[int, Field(ge=1)]
+
+
+class MarketRules(_Frozen):
+    initial_stock_price: Annotated[int, Field(ge=1)] = 80
+    stock_step: NonNegative = 30
+    stock_price: IntRange = (10, 300)
+    crop_price: IntRange = (30, 100)
+    price_cap: Annotated[int, Field(ge=1)] = 300
+
+    @model_validator(mode="after")
+    def _positive_prices(self):
+        if self.stock_price[0] < 1 or self.crop_price[0] < 1:
+            raise ValueError("prices must be at least 1")
+        return self
+
+
+class InvaderRules(_Frozen):
+    defender_reward: NonNegative
+    time_limit: Annotated[float, Field(gt=0)]
+
+
+class RpgEnemy(_Frozen):
+    name: str
+    atk_min: NonNegative
+    atk_max: NonNegative
+
+
+class HybridEnemy(_Frozen):
+    name: str
+    dodge: Annotated[float, Field(ge=0, lt=1)]
+
+
+class BattleRules(_Frozen):
+    player_hp: Annotated[int, Field(ge=1)]
+    enemy_hp: Annotated[int, Field(ge=1)]
+    victory_reward: NonNegative
+    defeat_loss: NonNegative
+    bot_victory_reward: NonNegative
+    bot_defeat_loss: NonNegative
+    time_limit: Annotated[float, Field(gt=0)]
+    rpg_enemies: Annotated[Tuple[RpgEnemy, ...], Field(min_length=1)]
+    hybrid_enemies: Annotated[Tuple[HybridEnemy, ...], Field(min_length=1)]
+
+    @model_validator(mode="after")
+    def _attack_ranges(self):
+        for e in self.rpg_enemies:
+            _ordered((e.atk_min, e.atk_max))
+        return self
+
+
+class MiningBlock(_Frozen):
+    kind: str
+    value: NonNegative
+    count: Annotated[int, Field(ge=1)]
+
+
+class MiningRules(_Frozen):
+    time_limit: Annotated[float, Field(gt=0)]
+    blocks: Annotated[Tuple[MiningBlock, ...], Field(min_length=1)]
+    bot_digs: NonNegative
+    bot_dig_values: Annotated[Tuple[NonNegative, ...], Field(min_length=1)]
+    bot_finish_score: IntRange
+
+
+class StoryEffect(_Frozen):
+    label: str
+    color: str
+    coins: Optional[IntRange] = None
+    factor: Optional[Annotated[float, Field(gt=0)]] = None
+
+
+class StoryRules(_Frozen):
+    spawn_chance: Annotated[float, Field(ge=0, le=1)]
+    duration: IntRange
+    effects: Mapping[str, StoryEffect]
+
+    @model_validator(mode="after")
+    def _known_effects(self):
+        if not self.effects:
+            raise ValueError("at least one story effect is required")
+        for name, effect in self.effects.items():
+            if name not in STORY_EFFECTS:
+                raise ValueError(f"unknown story effect {name!r}; expected one of {', '.join(STORY_EFFECTS)}")
+            if name in ("gift", "tax") and effect.coins is None:
+                raise ValueError(f"story effect {name!r} needs coins")
+            if name == "boost" and effect.factor is None:
+                raise ValueError("story effect 'boost' needs factor")
+        return self
+
+
+class DormancyRules(_Frozen):
+    # seconds of real time per catch-up tick for games nobody is reading; 0 turns catch-up off
+    tick_seconds: Annotated[float, Field(ge=0)] = 0
+    # a game back from a long absence advances by at most this many ticks
+    max_ticks: Annotated[int, Field(ge=1)] = 240
+
+
+class Rules(_Frozen):
+    turn_limit: Annotated[int, Field(ge=1)]
+    starting_coins: NonNegative
+    crops: Mapping[str, CropRules]
+    plant_cost: NonNegative
+    harvest_qty: IntRange
+    bazaar_offer: IntRange
+    buildings: BuildingRules
+    market: MarketRules
+    invader: InvaderRules
+    battle: BattleRules
+    mining: MiningRules
+    story: StoryRules
+    dormancy: DormancyRules = DormancyRules()
+
+
+@dataclass(frozen=True)
+class RuleTables:
+    """Validated rules plus the lookup tables derived from them."""
+
+    config: Rules
+    growth_time: Mapping[str, int]
+    # server-side minigame deadlines (seconds) per minigame type
+    time_limits: Mapping[str, float]
+    # the mining field before shuffling: (block id, kind, value) per block
+    mining_field: Tuple[Tuple[int, str, int], ...]
+    story_effects: Tuple[str, ...]
+
+    @cached_property
+    def bot_battle_odds(self) -> float:
+        """The bot's auto-resolved battle, fought against the union of the enemies' attack ranges.
+
+        Solved on first use, so ``battle_math`` is not imported at startup.
+        """
+        from .battle_math import rpg_table
+        battle = self.config.battle
+        atk = (min(e.atk_min for e in battle.rpg_enemies), max(e.atk_max for e in battle.rpg_enemies))
+        return rpg_table(battle.enemy_hp, battle.player_hp, *atk).odds(battle.enemy_hp, battle.player_hp)
+
+
+class RulesError(ValueError):
+    pass
+
+
+def compile_rules(config: Rules, crops: Sequence[str] = ()) -> RuleTables:
+    missing = [c for c in crops if c not in config.crops]
+    if missing:
+        raise RulesError(f"no rules for crops: {', '.join(missing)}")
+    battle = config.battle
+    field = []
+    for block in config.mining.blocks:
+        for _ in range(block.count):
+            field.append((len(field), block.kind, block.value))
+    return RuleTables(
+        config=config,
+        growth_time=MappingProxyType({name: c.growth_time for name, c in config.crops.items()}),
+        time_limits=MappingProxyType({
+            "invader": config.invader.time_limit,
+            "mining": config.mining.time_limit,
+            "rpg": battle.time_limit,
+            "hybrid": battle.time_limit,
+        }),
+        mining_field=tuple(field),
+        story_effects=tuple(config.story.effects),
+    )
+
+
+def load_rules(path: str, crops: Sequence[str] = ()) -> RuleTables:
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return compile_rules(Rules.model_validate(data), crops)
+    except (OSError, json.JSONDecodeError, ValidationError) as e:
+        raise RulesError(f"{path}: {e}") from e
+
+
+class RuleStore:
+    """The rules every handler reads (``store.current``), reloadable at runtime."""
+
+    def __init__(self, path: str, crops: Sequence[str] = ()):
+        self.path = path
+        self.crops = tuple(crops)
+        self.current = load_rules(path, self.crops)
+        self.version = 1
+        self._listeners: List[Callable[[RuleTables], None]] = []
+
+    def on_reload(self, listener: Callable[[RuleTables], None]):
+        self._listeners.append(listener)
+
+    def reload(self, path: Optional[str] = None) -> RuleTables:
+        """Load, validate and swap in the rules file; raises RulesError and keeps the old rules on failure."""
+        tables = load_rules(path or self.path, self.crops)
+        if path:
+            self.path = path
+        self.current = tables
+        self.version += 1
+        for listener in self._listeners:
+            listener(tables)
+        return tables
+
+    def describe(self) -> Dict[str, object]:
+        return {"path": self.path, "version": self.version, "rules": self.current.config.model_dump(mode="json")}
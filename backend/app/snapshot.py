@@ -0,0 +1,113 @@
+"""Binary snapshot of the live games, read back through ``mmap``.
+
+Layout::
+
+    b"SGRKSNAP" | u32 version | u32 header length | header (JSON) | blobs
+
+The header maps each game id to ``[offset, length, meta]``, with offsets
+counted from the end of the header; ``meta`` is whatever the writer wants
+available without decoding the game. Each blob is zlib-compressed and
+opaque to this module. Opening a snapshot only parses the header, so
+startup cost does not depend on how much state the games hold.
+"""
+import json
+import mmap
+import os
+import struct
+import zlib
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+MAGIC = b"SGRKSNAP"
+VERSION = 1
+_PREFIX = struct.Struct("<8sII")
+
+
+class SnapshotError(ValueError):
+    pass
+
+
+def encode_blob(raw: bytes) -> bytes:
+    return zlib.compress(raw, 6)
+
+
+def write_snapshot(path: str, entries: Iterable[Tuple[str, bytes, Any]]) -> int:
+    """Write ``(game_id, compressed blob, meta)`` entries to ``path`` atomically; returns the game count.
+
+    The file is written next to ``path`` and renamed over it, so a reader
+    that has the old file mapped keeps a consistent view.
+    """
+    header: Dict[str, list] = {}
+    blobs = []
+    offset = 0
+    for game_id, blob, meta in entries:
+        header[game_id] = [offset, len(blob), meta]
+        blobs.append(blob)
+        offset += len(blob)
+    head = json.dumps({"games": header}, separators=(",", ":"), ensure_ascii=False).encode()
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(_PREFIX.pack(MAGIC, VERSION, len(head)))
+        f.write(head)
+        for blob in blobs:
+            f.write(blob)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return len(header)
+
+
+class Snapshot:
+    """A snapshot file mapped into memory; games are decompressed one at a time on request."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < _PREFIX.size:
+                raise SnapshotError(f"{path}: truncated")
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, head_len = _PREFIX.unpack_from(self._map, 0)
+            if magic != MAGIC or version != VERSION:
+                raise SnapshotError(f"{path}: not a version {VERSION} snapshot")
+            self._base = _PREFIX.size + head_len
+            self._index: Dict[str, list] = json.loads(self._map[_PREFIX.size:self._base])["games"]
+            if any(off + length > size - self._base for off, length, _ in self._index.values()):
+                raise SnapshotError(f"{path}: truncated")
+        except SnapshotError:
+            self._map.close()
+            raise
+        except (ValueError, KeyError, TypeError, struct.error) as e:
+            self._map.close()
+            raise SnapshotError(f"{path}: {e}") from e
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, game_id: str) -> bool:
+        return game_id in self._index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._index)
+
+    def meta(self, game_id: str) -> Any:
+        return self._index[game_id][2]
+
+    def blob(self, game_id: str) -> bytes:
+        """The compressed bytes as stored, for copying into the next snapshot unread."""
+        off, length, _ = self._index[game_id]
+        return self._map[self._base + off:self._base + off + length]
+
+    def read(self, game_id: str) -> bytes:
+        return zlib.decompress(self.blob(game_id))
+
+    def close(self):
+        self._map.close()
+
+
+def open_snapshot(path: str) -> Optional[Snapshot]:
+    """The snapshot at ``path``, or None if there is none."""
+    try:
+        return Snapshot(path)
+    except FileNotFoundError:
+        return None
@@ -0,0 +1,110 @@
+import asyncio
+from typing import Callable, Dict, Optional
+
+
+class _Channel:
+    """Latest-state broadcast for one game.
+
+    The state is encoded at most once per version, the first time any
+    subscriber asks for it, and every subscriber receives the same bytes.
+    Nothing is queued per subscriber: a consumer that falls behind simply
+    skips to the newest version on its next read.
+    """
+
+    def __init__(self, game_id: str, encode: Callable[[str], Optional[bytes]]):
+        self.game_id = game_id
+        self.version = 0
+        self.subscribers = 0
+        self._encode = encode
+        self._changed = asyncio.Event()
+        self._frames: Dict[str, bytes] = {}
+        self._frames_version = -1
+
+    def publish(self):
+        self.version += 1
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    def frame(self, fmt: str) -> Optional[bytes]:
+        if self._frames_version != self.version:
+            self._frames = {}
+            self._frames_version = self.version
+        cached = self._frames.get(fmt)
+        if cached is not None:
+            return cached
+        body = self._encode(self.game_id)
+        if body is None:
+            return None
+        payload = b'{"version":%d,"game_state":%s}' % (self.version, body)
+        if fmt == "sse":
+            data = b"event: state\nid: %d\ndata: %s\n\n" % (self.version, payload)
+        else:
+            data = payload
+        self._frames[fmt] = data
+        return data
+
+
+class Subscription:
+    def __init__(self, hub: "SpectatorHub", channel: _Channel, fmt: str):
+        self._hub = hub
+        self._channel = channel
+        self._fmt = fmt
+        self.seen = -1
+        self.skipped = 0
+
+    async def next_frame(self, timeout: Optional[float] = None) -> Optional[bytes]:
+        """Wait for a version newer than the last one delivered and return its frame.
+
+        Returns None on timeout (so callers can send keep-alives) or when the
+        game no longer exists.
+        """
+        ch = self._channel
+        if ch.version == self.seen:
+            try:
+                await asyncio.wait_for(ch._changed.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        if self.seen >= 0 and ch.version > self.seen + 1:
+            self.skipped += ch.version - self.seen - 1
+            self._hub.skipped += ch.version - self.seen - 1
+        self.seen = ch.version
+        return ch.frame(self._fmt)
+
+    def close(self):
+        self._hub._unsubscribe(self._channel)
+
+
+class SpectatorHub:
+    """Registry of per-game broadcast channels.
+
+    ``encode(game_id)`` must return the JSON bytes of the game state, or None
+    when the game is gone.
+    """
+
+    def __init__(self, encode: Callable[[str], Optional[bytes]]):
+        self._encode = encode
+        self._channels: Dict[str, _Channel] = {}
+        self.skipped = 0
+
+    def subscriber_count(self, game_id: Optional[str] = None) -> int:
+        if game_id is not None:
+            ch = self._channels.get(game_id)
+            return ch.subscribers if ch else 0
+        return sum(ch.subscribers for ch in self._channels.values())
+
+    def publish(self, game_id: str):
+        ch = self._channels.get(game_id)
+        if ch is not None:
+            ch.publish()
+
+    def subscribe(self, game_id: str, fmt: str = "json") -> Subscription:
+        ch = self._channels.get(game_id)
+        if ch is None:
+            ch = self._channels[game_id] = _Channel(game_id, self._encode)
+        ch.subscribers += 1
+        return Subscription(self, ch, fmt)
+
+    def _unsubscribe(self, ch: _Channel):
+        ch.subscribers -= 1
+        if ch.subscribers <= 0 and self._channels.get(ch.game_id) is ch:
+            del self._channels[ch.game_id]
@@ -0,0 +1,88 @@
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Callable, List, Optional, Tuple
+
+
+class TimerScheduler:
+    """Deadline scheduler shared by every game.
+
+    All pending deadlines live in one heap and a single asyncio task sleeps
+    until the earliest one, so the cost of a pending timer is one heap entry
+    rather than one task per game. Entries are never removed on cancel: the
+    expire callback receives the token it was scheduled with and is expected
+    to ignore tokens that are no longer current.
+    """
+
+    def __init__(self, on_expire: Callable[[str, str], None], clock: Callable[[], float] = time.monotonic):
+        self._heap: List[Tuple[float, int, str, str]] = []
+        self._seq = itertools.count()
+        self._on_expire = on_expire
+        self._clock = clock
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def schedule(self, game_id: str, token: str, delay: float) -> float:
+        """Schedule an expiry for (game_id, token) after ``delay`` seconds and return the deadline."""
+        deadline = self._clock() + max(0.0, float(delay))
+        earliest = not self._heap or deadline < self._heap[0][0]
+        heapq.heappush(self._heap, (deadline, next(self._seq), game_id, token))
+        if earliest and self._wakeup is not None:
+            self._wakeup.set()
+        return deadline
+
+    def forget(self, game_id: str) -> int:
+        """Drop every pending deadline of ``game_id`` without firing it; returns how many were dropped."""
+        kept = [entry for entry in self._heap if entry[2] != game_id]
+        dropped = len(self._heap) - len(kept)
+        if dropped:
+            heapq.heapify(kept)
+            self._heap = kept
+        return dropped
+
+    def expire_due(self, now: Optional[float] = None) -> int:
+        """Fire every deadline at or before ``now``; returns the number of entries popped."""
+        now = self._clock() if now is None else now
+        fired = 0
+        while self._heap and self._heap[0][0] <= now:
+            _, _, game_id, token = heapq.heappop(self._heap)
+            try:
+                self._on_expire(game_id, token)
+            except Exception:
+                # one broken game must not stall every other deadline
+                pass
+            fired += 1
+        return fired
+
+    def start(self) -> None:
+        if self._task is not None and not self._task.done():
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        self._wakeup = None
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    async def _run(self) -> None:
+        wakeup = self._wakeup
+        assert wakeup is not None
+        while True:
+            self.expire_due()
+            timeout = max(0.0, self._heap[0][0] - self._clock()) if self._heap else None
+            wakeup.clear()
+            try:
+                await asyncio.wait_for(wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,408 @@
+"""Headless bot-vs-bot tournaments.
+
+Games are played in-process by calling the regular route handlers, so every
+rule (``roll_dice``, the minigames, ``_finalize_game``) is exactly the one
+the API serves. Matches are spread over a process pool and results are
+streamed back as they complete.
+
+A game reseeds the process-wide ``random`` and market generators, so games
+started by the API always run in worker processes and never touch the
+server's games, timers or market arrays.
+
+    python -m app.tournament --format round-robin --strategies farmer,trader,builder --games 200
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+from . import main
+
+# hard cap on handler calls per game, in case a strategy stalls
+MAX_STEPS = 2000
+
+
+def drive(coro):
+    """Run a handler coroutine that never awaits, without an event loop."""
+    try:
+        coro.send(None)
+    except StopIteration as stop:
+        return stop.value
+    coro.close()
+    raise RuntimeError("handler suspended; it cannot be driven headlessly")
+
+
+def _try(coro) -> Optional[Any]:
+    try:
+        return drive(coro)
+    except HTTPException:
+        return None
+
+
+# --- strategies -------------------------------------------------------------
+# A strategy plays one action phase for the current seat; anything it leaves
+# pending is closed with end-turn by the runner.
+
+def _plant_or_harvest(game_id: str, game: main.GameState, me: main.Player):
+    sq = game.board[me.position]
+    if sq.crop and sq.owner == me.id and sq.crop.stage == main.CropStage.READY:
+        _try(main.harvest_crop(game_id))
+    elif sq.crop is None and me.coins >= main.rule_store.current.config.plant_cost:
+        best = max(main.CropType, key=lambda c: game.crop_prices.get(c.value, 0) / main.get_crop_growth_time(c))
+        _try(main.plant_crop(game_id, best))
+
+
+def _sell_inventory(game_id: str, game: main.GameState, me: main.Player):
+    for crop, qty in list(me.inventory.items()):
+        if qty > 0 and game.bazaar_offer_price and game.bazaar_offer_price >= 100:
+            _try(main.sell_inventory(game_id, crop, qty))
+
+
+def passive(game_id: str, game: main.GameState, me: main.Player):
+    pass
+
+
+def farmer(game_id: str, game: main.GameState, me: main.Player):
+    _sell_inventory(game_id, game, me)
+    _plant_or_harvest(game_id, game, me)
+
+
+def trader(game_id: str, game: main.GameState, me: main.Player):
+    sq = game.board[me.position]
+    if sq.is_market:
+        if game.stock_price <= 60 and me.coins >= game.stock_price:
+            _try(main.buy_stock(game_id, me.coins // game.stock_price))
+        elif game.stock_price >= 120 and me.stocks_shares:
+            _try(main.sell_stock(game_id, me.stocks_shares))
+        return
+    farmer(game_id, game, me)
+
+
+def builder(game_id: str, game: main.GameState, me: main.Player):
+    sq = game.board[me.position]
+    if sq.is_estate and me.coins >= main.rule_store.current.config.buildings.cost:
+        target = next((s.id for s in game.board
+                       if s.id and not (s.is_market or s.is_farm or s.is_estate) and not s.building_owner), None)
+        if target is not None:
+            _try(main.build_estate(game_id, target))
+        return
+    farmer(game_id, game, me)
+
+
+STRATEGIES: Dict[str, Callable[[str, main.GameState, main.Player], None]] = {
+    "passive": passive,
+    "farmer": farmer,
+    "trader": trader,
+    "builder": builder,
+}
+
+
+def _play_minigame(game_id: str, game: main.GameState, rng: random.Random):
+    mg = game.minigame or {}
+    kind = mg.get("type") or "invader"
+    owner = mg.get("player_id") or mg.get("attacker_id")
+    if owner != game.players[game.current_player].id:
+        # not actionable by the seat to move: settle it the way the timer would
+        main._expire_minigame(game_id, mg.get("timer_id", ""))
+        if game.minigame is mg:
+            game.minigame = None
+        return
+    if kind == "invader":
+        _try(main.minigame_resolve(game_id, rng.choice(["attacker", "defender"])))
+    elif kind == "rpg":
+        _try(main.rpg_minigame_act(game_id, "attack"))
+    elif kind == "hybrid":
+        _try(main.hybrid_minigame_command(game_id, "attack"))
+    elif kind == "mining":
+        for block in rng.sample(mg.get("field") or [], k=min(12, len(mg.get("field") or []))):
+            _try(main.mining_dig(game_id, int(block["id"])))
+            _try(main.mining_bot_dig(game_id))
+        _try(main.mining_finish(game_id))
+    else:
+        game.minigame = None
+
+
+def play_game(seats: Tuple[str, str], seed: int) -> Dict[str, Any]:
+    """Play one game between two strategies and return its result summary."""
+    random.seed(seed)
+    main.markets.seed(seed)
+    rng = random.Random(seed)
+    game_id = f"t_{seed}_{uuid.uuid4().hex[:8]}"
+    coins = main.rule_store.current.config.starting_coins
+    players = [
+        main.Player(id=f"seat{i}", name=name, position=0, coins=coins, crops_harvested=0, inventory={})
+        for i, name in enumerate(seats)
+    ]
+    game = main.new_game_state(players)
+    main.register_game(game_id, game)
+    steps = 0
+    try:
+        while not game.game_over and steps < MAX_STEPS:
+            steps += 1
+            if game.minigame:
+                _play_minigame(game_id, game, rng)
+            elif game.awaiting_action:
+                me = game.players[game.current_player]
+                STRATEGIES[me.name](game_id, game, me)
+                if game.awaiting_action and not game.minigame and game.players[game.current_player] is me:
+                    _try(main.end_turn(game_id))
+            else:
+                drive(main.roll_dice(game_id))
+        totals = dict(game.final_assets or {})
+        winner = game.winner if game.game_over else None
+        return {
+            "seed": seed,
+            "seats": list(seats),
+            "totals": {p.name: totals.get(p.id, 0) for p in game.players},
+            "winner": winner if winner != "Draw" else "draw",
+            "turns": game.turn,
+            "steps": steps,
+            "completed": bool(game.game_over),
+        }
+    finally:
+        main.drop_game(game_id)
+        # this game's pending minigame deadlines are stale; other games' are not
+        main.minigame_timers.forget(game_id)
+
+
+def _play_batch(batch: List[Tuple[Tuple[str, str], int]]) -> List[Dict[str, Any]]:
+    return [play_game(seats, seed) for seats, seed in batch]
+
+
+# --- scheduling -------------------------------------------------------------
+
+def round_robin(strategies: List[str], games_per_pair: int) -> List[Tuple[str, str]]:
+    """Every pair plays ``games_per_pair`` games, alternating who moves first."""
+    matches: List[Tuple[str, str]] = []
+    for i, a in enumerate(strategies):
+        for b in strategies[i + 1:]:
+            for g in range(games_per_pair):
+                matches.append((a, b) if g % 2 == 0 else (b, a))
+    return matches
+
+
+def run_matches(matches: List[Tuple[str, str]], workers: Optional[int] = None, seed: int = 0,
+                batch_size: int = 25, isolated: bool = False) -> Iterator[Dict[str, Any]]:
+    """Play ``matches`` on a process pool and yield each result as soon as its batch finishes.
+
+    A single batch or worker is played in this process unless ``isolated``,
+    which always uses freshly spawned workers (for runs inside the server).
+    """
+    jobs = [(seats, seed * 1_000_003 + i) for i, seats in enumerate(matches)]
+    batches = [jobs[i:i + batch_size] for i in range(0, len(jobs), batch_size)]
+    workers = workers or os.cpu_count() or 1
+    if not isolated and (workers <= 1 or len(batches) <= 1):
+        for batch in batches:
+            yield from _play_batch(batch)
+        return
+    if not batches:
+        return
+    # spawn rather than fork: the server process has an event loop and threads running
+    context = multiprocessing.get_context("spawn") if isolated else None
+    with ProcessPoolExecutor(max_workers=min(workers, len(batches)), mp_context=context) as pool:
+        for fut in as_completed([pool.submit(_play_batch, b) for b in batches]):
+            yield from fut.result()
+
+
+class Standings:
+    def __init__(self, strategies: List[str]):
+        self.table = {s: {"games": 0, "wins": 0, "draws": 0, "losses": 0, "assets": 0} for s in strategies}
+        self.games = 0
+
+    def add(self, result: Dict[str, Any]):
+        self.games += 1
+        a, b = result["seats"]
+        totals = result["totals"]
+        for name, other in ((a, b), (b, a)):
+            row = self.table[name]
+            row["games"] += 1
+            row["assets"] += int(totals.get(name, 0))
+            if result["winner"] == "draw" or result["winner"] is None:
+                row["draws"] += 1
+            elif result["winner"] == name:
+                row["wins"] += 1
+            else:
+                row["losses"] += 1
+
+    def ranking(self) -> List[Dict[str, Any]]:
+        rows = [{"strategy": s, **r, "avg_assets": r["assets"] / r["games"] if r["games"] else 0.0}
+                for s, r in self.table.items()]
+        return sorted(rows, key=lambda r: (r["wins"], r["avg_assets"]), reverse=True)
+
+
+def run_round_robin(strategies: List[str], games_per_pair: int, workers: Optional[int] = None, seed: int = 0,
+                    on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+                    isolated: bool = False) -> Dict[str, Any]:
+    standings = Standings(strategies)
+    start = time.perf_counter()
+    for result in run_matches(round_robin(strategies, games_per_pair), workers, seed, isolated=isolated):
+        standings.add(result)
+        if on_result:
+            on_result(result)
+    elapsed = time.perf_counter() - start
+    return {"format": "round-robin", "games": standings.games, "seconds": elapsed,
+            "games_per_sec": standings.games / elapsed if elapsed > 0 else 0.0,
+            "standings": standings.ranking()}
+
+
+def run_bracket(strategies: List[str], games_per_match: int, workers: Optional[int] = None, seed: int = 0,
+                on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+                isolated: bool = False) -> Dict[str, Any]:
+    """Single elimination; a strategy without an opponent gets a bye."""
+    standings = Standings(strategies)
+    alive = list(strategies)
+    rounds: List[List[Dict[str, Any]]] = []
+    start = time.perf_counter()
+    while len(alive) > 1:
+        pairs = [(alive[i], alive[i + 1]) for i in range(0, len(alive) - 1, 2)]
+        byes = alive[len(pairs) * 2:]
+        round_stats = {p: Standings(list(p)) for p in pairs}
+        matches = [m for p in pairs for m in round_robin(list(p), games_per_match)]
+        for result in run_matches(matches, workers, seed + len(rounds), isolated=isolated):
+            standings.add(result)
+            round_stats[tuple(sorted(result["seats"], key=lambda s: alive.index(s)))].add(result)
+            if on_result:
+                on_result(result)
+        summary = []
+        winners = []
+        for p, st in round_stats.items():
+            top = st.ranking()[0]["strategy"]
+            winners.append(top)
+            summary.append({"match": list(p), "winner": top, "standings": st.ranking()})
+        rounds.append(summary)
+        alive = winners + byes
+    elapsed = time.perf_counter() - start
+    return {"format": "bracket", "champion": alive[0] if alive else None, "rounds": rounds,
+            "games": standings.games, "seconds": elapsed,
+            "games_per_sec": standings.games / elapsed if elapsed > 0 else 0.0,
+            "standings": standings.ranking()}
+
+
+# --- API --------------------------------------------------------------------
+
+class TournamentRun:
+    def __init__(self, fmt: str, strategies: List[str], games: int, workers: Optional[int], seed: int):
+        self.id = f"tour_{uuid.uuid4().hex[:10]}"
+        self.format = fmt
+        self.strategies = strategies
+        self.status = "running"
+        self.started = time.perf_counter()
+        self.completed = 0
+        self.recent: List[Dict[str, Any]] = []
+        self.summary: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        runner = run_bracket if fmt == "bracket" else run_round_robin
+        self._thread = threading.Thread(target=self._run, args=(runner, games, workers, seed), daemon=True)
+        self._thread.start()
+
+    def _on_result(self, result: Dict[str, Any]):
+        self.completed += 1
+        self.recent = (self.recent + [result])[-20:]
+
+    def _run(self, runner, games, workers, seed):
+        try:
+            # never in the server process: games reseed the global generators
+            self.summary = runner(self.strategies, games, workers, seed, on_result=self._on_result, isolated=True)
+            self.status = "done"
+        except Exception as exc:
+            self.error = str(exc)
+            self.status = "failed"
+
+    def to_dict(self) -> Dict[str, Any]:
+        elapsed = time.perf_counter() - self.started
+        return {
+            "tournament_id": self.id,
+            "format": self.format,
+            "strategies": self.strategies,
+            "status": self.status,
+            "games_completed": self.completed,
+            "games_per_sec": self.completed / elapsed if elapsed > 0 else 0.0,
+            "recent_results": self.recent,
+            "summary": self.summary,
+            "error": self.error,
+        }
+
+
+tournaments: Dict[str, TournamentRun] = {}
+# finished runs kept for polling; the oldest are forgotten first
+MAX_FINISHED = 32
+
+
+class TournamentBusy(RuntimeError):
+    """A tournament is already running; only one runs at a time."""
+
+
+def _parse_strategies(raw: str) -> List[str]:
+    names = [s.strip() for s in raw.split(",") if s.strip()]
+    unknown = [s for s in names if s not in STRATEGIES]
+    if unknown:
+        raise ValueError(f"Unknown strategies: {', '.join(unknown)}")
+    if len(names) < 2 or len(set(names)) != len(names):
+        raise ValueError("Need at least two distinct strategies")
+    return names
+
+
+def start(strategies: str, fmt: str, games: int, workers: Optional[int], seed: int) -> TournamentRun:
+    """Validate and launch a tournament in the background.
+
+    Raises ValueError on bad input and TournamentBusy while another run is
+    in progress. ``workers`` is capped at the CPU count.
+    """
+    if fmt not in ("round-robin", "bracket"):
+        raise ValueError("format must be round-robin or bracket")
+    names = _parse_strategies(strategies)
+    if not (1 <= games <= 10000):
+        raise ValueError("games must be between 1 and 10000")
+    cpus = os.cpu_count() or 1
+    if workers is not None and workers < 1:
+        raise ValueError("workers must be at least 1")
+    workers = min(workers or cpus, cpus)
+    if any(r.status == "running" for r in tournaments.values()):
+        raise TournamentBusy("A tournament is already running")
+    finished = [tid for tid, r in tournaments.items() if r.status != "running"]
+    for tid in finished[:max(0, len(finished) - MAX_FINISHED + 1)]:
+        del tournaments[tid]
+    run = TournamentRun(fmt, names, games, workers, seed)
+    tournaments[run.id] = run
+    return run
+
+
+# --- CLI --------------------------------------------------------------------
+
+def cli(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run a headless Sugoroku Farm tournament.")
+    parser.add_argument("--format", choices=("round-robin", "bracket"), default="round-robin")
+    parser.add_argument("--strategies", default=",".join(STRATEGIES))
+    parser.add_argument("--games", type=int, default=20, help="games per pairing")
+    parser.add_argument("--workers", type=int, default=None, help="process pool size (default: cpu count)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--quiet", action="store_true", help="only print the summary")
+    args = parser.parse_args(argv)
+    try:
+        names = _parse_strategies(args.strategies)
+    except ValueError as exc:
+        parser.error(str(exc))
+
+    def emit(result):
+        if not args.quiet:
+            print(json.dumps(result, ensure_ascii=False), flush=True)
+
+    runner = run_bracket if args.format == "bracket" else run_round_robin
+    summary = runner(names, args.games, args.workers, args.seed, on_result=emit)
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    print(f"{summary['games']} games in {summary['seconds']:.2f}s ({summary['games_per_sec']:.1f} games/sec)",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(cli())
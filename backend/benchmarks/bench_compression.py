@@ -0,0 +1,101 @@
+"""CPU cost vs. bytes saved for compressing realistic GameState payloads.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_compression
+
+brotli and zstandard rows appear only when those packages are installed.
+"""
+import gzip
+import os
+import random
+import time
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.testclient import TestClient
+
+try:
+    import brotli  # type: ignore
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard  # type: ignore
+except ImportError:
+    zstandard = None
+
+# measure the codecs, not 429s from the benchmark's own request rate
+os.environ.setdefault("SUGOROKU_ADMISSION", "0")
+
+import app.main as main  # noqa: E402
+
+
+def _payloads():
+    client = TestClient(main.app)
+    random.seed(7)
+    game_id = client.post("/game/create", params={"player_name": "Alice"}).json()["game_id"]
+    game = main.games[game_id]
+    for _ in range(30):
+        game.minigame = None
+        if game.awaiting_action:
+            client.post(f"/game/{game_id}/plant-crop", params={"crop_type": "corn"})
+            if game.awaiting_action:
+                client.post(f"/game/{game_id}/end-turn")
+        else:
+            client.post(f"/game/{game_id}/roll-dice")
+    yield "board20_midgame", client.get(f"/game/{game_id}").content
+
+    client.post(f"/game/{game_id}/next-stage")
+    yield "board40_fresh", client.get(f"/game/{game_id}").content
+
+    game = main.games[game_id]
+    game.players[0].position = 17
+    game.current_player = 0
+    game.awaiting_action = False
+    # land on the mine until the mining minigame (160-block field) is active
+    while not (game.minigame and game.minigame.get("type") == "mining"):
+        game.minigame = None
+        game.players[0].position = 17 - random.randint(1, 6)
+        game.current_player = 0
+        client.post(f"/game/{game_id}/roll-dice")
+    body = client.post(f"/game/{game_id}/minigame/mining/bot-dig").content
+    yield "mining_field", body
+
+
+def _codecs():
+    for level in (1, 5, 9):
+        yield f"gzip-{level}", lambda d, lv=level: gzip.compress(d, compresslevel=lv, mtime=0)
+    if brotli is not None:
+        for q in (1, 4, 8):
+            yield f"br-{q}", lambda d, q=q: brotli.compress(d, quality=q)
+    if zstandard is not None:
+        for level in (1, 3, 9):
+            yield f"zstd-{level}", zstandard.ZstdCompressor(level=level).compress
+
+
+def _bench(fn, data, repeat=200):
+    out = fn(data)
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn(data)
+    return (time.perf_counter() - t0) / repeat * 1e6, len(out)
+
+
+def main_():
+    payloads = list(_payloads())
+    game = next(iter(main.games.values()))
+    t0 = time.perf_counter()
+    for _ in range(200):
+        jsonable_encoder(game)
+    encode_us = (time.perf_counter() - t0) / 200 * 1e6
+    print(f"reference: jsonable_encoder(GameState) {encode_us:.0f} us")
+    print(f"{'payload':<18}{'codec':<10}{'raw B':>9}{'out B':>9}{'ratio':>8}{'us/op':>9}{'KB saved/ms':>13}")
+    for name, data in payloads:
+        for codec, fn in _codecs():
+            us, size = _bench(fn, data)
+            saved = (len(data) - size) / 1024
+            print(f"{name:<18}{codec:<10}{len(data):>9}{size:>9}{len(data) / size:>8.1f}{us:>9.0f}{saved / (us / 1000):>13.0f}")
+
+
+if __name__ == "__main__":
+    main_()
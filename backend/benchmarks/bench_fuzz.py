@@ -0,0 +1,72 @@
+"""Fuzzer throughput: random game actions applied and checked per second.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_fuzz [--seeds 200] [--actions 400] [--workers 0] [--min-rate 10000]
+
+Plays the same seeds as ``python -m app.fuzz`` without shrinking and prints
+actions/sec overall and per action type. The command exits with status 1
+when an invariant breaks or, with ``--min-rate`` (or
+``SUGOROKU_FUZZ_MIN_RATE``), when throughput drops below the floor.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+
+from app import fuzz, main
+
+
+def per_action(seeds: int, n_actions: int) -> dict:
+    """Mean microseconds per call of each action type, timed outside the invariant check."""
+    spent = defaultdict(float)
+    calls = defaultdict(int)
+    for seed in range(seeds):
+        random.seed(seed)
+        main.markets.seed(seed)
+        game_id = f"bench_fuzz_{seed}"
+        coins = main.rule_store.current.config.starting_coins
+        main.register_game(game_id, main.new_game_state([
+            main.Player(id="player1", name="Fuzz", position=0, coins=coins, crops_harvested=0, inventory={}),
+            main.Player(id="bot", name="Bot", position=0, coins=coins, crops_harvested=0, inventory={}),
+        ]))
+        try:
+            for action in fuzz.generate(seed, n_actions):
+                t0 = time.perf_counter()
+                fuzz._apply(game_id, action)
+                spent[action[0]] += time.perf_counter() - t0
+                calls[action[0]] += 1
+        finally:
+            main.drop_game(game_id)
+    main.minigame_timers.expire_due(now=float("inf"))
+    return {name: spent[name] / calls[name] * 1e6 for name in sorted(calls, key=spent.get, reverse=True)}
+
+
+def main_() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seeds", type=int, default=200)
+    parser.add_argument("--actions", type=int, default=400)
+    parser.add_argument("--workers", type=int, default=1, help="process pool size (0: cpu count)")
+    parser.add_argument("--min-rate", type=float, default=float(os.environ.get("SUGOROKU_FUZZ_MIN_RATE", 0)))
+    args = parser.parse_args()
+
+    report = fuzz.fuzz(range(args.seeds), args.actions, shrink_failures=False, workers=args.workers)
+    print(f"{report['actions']} actions over {report['seeds']} seeds in {report['seconds']}s: "
+          f"{report['actions_per_sec']} actions/sec")
+    print(f"{'action':<24}{'us/call':>10}")
+    for name, us in per_action(min(args.seeds, 50), args.actions).items():
+        print(f"{name:<24}{us:>10.1f}")
+
+    if report["failures"]:
+        print(f"{len(report['failures'])} invariant failures; run python -m app.fuzz to shrink them", file=sys.stderr)
+        return 1
+    if report["actions_per_sec"] < args.min_rate:
+        print(f"below floor: {report['actions_per_sec']} < {args.min_rate} actions/sec", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_())
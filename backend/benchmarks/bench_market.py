@@ -0,0 +1,52 @@
+"""Market update cost: one vectorized tick over N games vs. the old per-game dict rebuild.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_market
+"""
+import random
+import time
+
+from app.main import CropType, Player, new_game_state
+from app.market import MarketEngine
+
+
+def _scalar_tick(game):
+    # the per-roll update roll_dice used before the market engine
+    old = game.stock_price
+    newp = max(10, min(300, old + random.randint(-30, 30)))
+    game.last_stock_change = int(round(((newp - old) / old) * 100)) if old > 0 else 0
+    game.stock_price = newp
+    new_prices, new_changes = {}, {}
+    for k, oldp in game.crop_prices.items():
+        np_ = random.randint(30, 100)
+        new_changes[k] = int(round(((np_ - oldp) / oldp) * 100)) if oldp > 0 else 0
+        new_prices[k] = np_
+    game.crop_prices = new_prices
+    game.crop_changes = new_changes
+
+
+def main_():
+    print(f"{'games':>7}{'scalar ms':>11}{'tick ms':>10}{'step us/game':>14}")
+    for n in (100, 1000, 10000):
+        states = [new_game_state([Player(id="p", name="p", position=0, coins=100, crops_harvested=0, inventory={})])
+                  for _ in range(n)]
+        engine = MarketEngine([c.value for c in CropType], capacity=n, seed=1)
+        for i, s in enumerate(states):
+            engine.attach(str(i), s)
+        t0 = time.perf_counter()
+        for s in states:
+            _scalar_tick(s)
+        scalar = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        engine.tick()
+        tick = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        for i, s in enumerate(states):
+            engine.step(str(i), s)
+        step = time.perf_counter() - t0
+        print(f"{n:>7}{scalar * 1e3:>11.2f}{tick * 1e3:>10.2f}{step / n * 1e6:>14.1f}")
+
+
+if __name__ == "__main__":
+    main_()
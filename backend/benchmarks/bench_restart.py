@@ -0,0 +1,118 @@
+"""Warm restart: how long a server started on a snapshot takes to serve a restored game.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_restart [--games 20000] [--runs 3]
+
+Builds ``--games`` played games in-process and writes them to a snapshot,
+then measures:
+
+* ``restore_snapshot`` alone (header parse and index fill) and the first
+  read of one game (decompress and validate),
+* a fresh ``uvicorn app.main:app`` process started on that snapshot, from
+  spawn to the first successful ``GET /game/{id}`` of a restored game,
+  next to the same process started without a snapshot.
+"""
+import argparse
+import http.client
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("SUGOROKU_ARCHIVE_PATH", "")
+os.environ["SUGOROKU_SNAPSHOT_PATH"] = ""
+
+from app import main  # noqa: E402
+from app.tournament import drive  # noqa: E402
+
+from .bench_startup import BACKEND_DIR, TIMEOUT_SECONDS, _free_port  # noqa: E402
+
+
+def build_snapshot(path: str, n: int) -> str:
+    coins = main.rule_store.current.config.starting_coins
+    for i in range(n):
+        game_id = f"bench_{i}"
+        main.register_game(game_id, main.new_game_state([
+            main.Player(id="player1", name=f"p{i}", position=0, coins=coins, crops_harvested=0, inventory={}),
+            main.Player(id="bot", name="Bot", position=0, coins=coins, crops_harvested=0, inventory={}),
+        ]))
+        for _ in range(6):
+            drive(main.end_turn(game_id))
+    t0 = time.perf_counter()
+    main.save_snapshot(path)
+    print(f"wrote {n} games in {(time.perf_counter() - t0) * 1e3:.0f} ms, "
+          f"{os.path.getsize(path) / n:.0f} bytes/game")
+    for i in range(n):
+        main.drop_game(f"bench_{i}")
+    return f"bench_{n // 2}"
+
+
+def in_process(path: str, game_id: str):
+    t0 = time.perf_counter()
+    restored = main.restore_snapshot(path)
+    t1 = time.perf_counter()
+    main.games[game_id]
+    t2 = time.perf_counter()
+    print(f"restore_snapshot: {restored} games in {(t1 - t0) * 1e3:.1f} ms; first read {(t2 - t1) * 1e3:.2f} ms")
+
+
+def _get(port: int, path: str) -> int:
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    try:
+        conn.request("GET", path)
+        resp = conn.getresponse()
+        resp.read()
+        return resp.status
+    finally:
+        conn.close()
+
+
+def serve(snapshot: str, game_id: str) -> float:
+    """Seconds from spawning the server to a 200 for ``game_id`` (or for /healthz without a snapshot)."""
+    port = _free_port()
+    env = dict(os.environ, SUGOROKU_SNAPSHOT_PATH=snapshot, SUGOROKU_ARCHIVE_PATH="", SUGOROKU_WARMUP="1",
+               SUGOROKU_ADMISSION="0")
+    path = f"/game/{game_id}" if snapshot else "/healthz"
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    try:
+        while True:
+            if time.perf_counter() - t0 > TIMEOUT_SECONDS or proc.poll() is not None:
+                raise RuntimeError("server did not come up")
+            try:
+                if _get(port, path) == 200:
+                    return time.perf_counter() - t0
+            except OSError:
+                pass
+            time.sleep(0.002)
+    finally:
+        # SIGTERM runs the shutdown hook, which writes the snapshot back
+        proc.terminate()
+        proc.wait()
+
+
+def main_() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--games", type=int, default=20000)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "games.snapshot")
+        game_id = build_snapshot(path, args.games)
+        in_process(path, game_id)
+        with_snapshot = statistics.median(serve(path, game_id) for _ in range(args.runs))
+        empty = statistics.median(serve("", game_id) for _ in range(args.runs))
+    print(f"spawn to first restored game: {with_snapshot * 1e3:.0f} ms "
+          f"(empty start to /healthz: {empty * 1e3:.0f} ms)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_())
@@ -0,0 +1,97 @@
+"""Cold start: time from spawning a server process to the first successful POST /game/create.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_startup [--runs 5] [--budget-ms 1500]
+
+Each run starts a fresh ``uvicorn app.main:app`` process and polls until a
+game is created, with warm-up on and off. The command exits with status 1
+when the median with warm-up on (the default configuration) exceeds the
+budget, so CI can run it as a check. The budget can also be set with
+``SUGOROKU_STARTUP_BUDGET_MS``.
+"""
+import argparse
+import http.client
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BUDGET_MS = 1500
+TIMEOUT_SECONDS = 30
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _create(port: int) -> float:
+    """Latency of one create in seconds; raises OSError while the server is not up."""
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    try:
+        t0 = time.perf_counter()
+        conn.request("POST", "/game/create?player_name=bench")
+        resp = conn.getresponse()
+        resp.read()
+        if resp.status != 200:
+            raise OSError(f"create returned {resp.status}")
+        return time.perf_counter() - t0
+    finally:
+        conn.close()
+
+
+def measure(warmup: bool) -> tuple:
+    """(seconds to first successful create, latency of that create, latency of the next one)."""
+    port = _free_port()
+    env = dict(os.environ, SUGOROKU_WARMUP="1" if warmup else "0", SUGOROKU_ARCHIVE_PATH="", SUGOROKU_SNAPSHOT_PATH="",
+               SUGOROKU_ADMISSION="0")
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    try:
+        while True:
+            if time.perf_counter() - t0 > TIMEOUT_SECONDS or proc.poll() is not None:
+                raise RuntimeError("server did not come up")
+            try:
+                first = _create(port)
+                break
+            except OSError:
+                time.sleep(0.002)
+        ready = time.perf_counter() - t0
+        return ready, first, _create(port)
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main_() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float,
+                        default=float(os.environ.get("SUGOROKU_STARTUP_BUDGET_MS", DEFAULT_BUDGET_MS)))
+    args = parser.parse_args()
+
+    print(f"{'warm-up':<9}{'to first create ms':>20}{'first req ms':>14}{'next req ms':>13}")
+    medians = {}
+    for warmup in (True, False):
+        runs = [measure(warmup) for _ in range(args.runs)]
+        ready, first, nxt = (statistics.median(col) * 1e3 for col in zip(*runs))
+        medians[warmup] = ready
+        print(f"{'on' if warmup else 'off':<9}{ready:>20.0f}{first:>14.1f}{nxt:>13.1f}")
+
+    if medians[True] > args.budget_ms:
+        print(f"over budget: {medians[True]:.0f} ms > {args.budget_ms:.0f} ms", file=sys.stderr)
+        return 1
+    print(f"within budget: {medians[True]:.0f} ms <= {args.budget_ms:.0f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_())
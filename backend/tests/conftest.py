@@ -0,0 +1,6 @@
+import os
+
+# keep the suite hermetic: no archive file, no snapshot file, no rate limiting between tests
+os.environ.setdefault("SUGOROKU_ARCHIVE_PATH", "")
+os.environ.setdefault("SUGOROKU_SNAPSHOT_PATH", "")
+os.environ.setdefault("SUGOROKU_ADMISSION", "0")
@@ -0,0 +1,82 @@
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+import app.main as main
+from app.admission import AdmissionController, AdmissionSettings, classify
+
+client = TestClient(main.app)
+
+
+def test_routes_are_classified_by_priority():
+    assert classify("POST", "/game/g1/roll-dice") == "turn"
+    assert classify("POST", "/game/g1/minigame/mining/finish") == "turn"
+    assert classify("POST", "/game/g1/minigame/mining/dig") == "action"
+    assert classify("GET", "/game/g1") == "read"
+    assert classify("GET", "/game/g1/spectate/sse") == "spectator"
+    assert classify("GET", "/metrics") is None
+
+
+def test_token_bucket_refills_over_time():
+    now = [0.0]
+    ctl = AdmissionController(AdmissionSettings(client_rate=1, client_burst=2), clock=lambda: now[0])
+    assert ctl.admit("read", "c") is None
+    assert ctl.admit("read", "c") is None
+    status, retry_after = ctl.admit("read", "c")
+    assert status == 429 and retry_after == pytest.approx(1.0)
+    now[0] = 1.0
+    assert ctl.admit("read", "c") is None
+
+
+def test_low_priority_is_shed_first():
+    ctl = AdmissionController(AdmissionSettings(max_in_flight=4))
+    for _ in range(2):
+        assert ctl.admit("turn", "c") is None
+    assert ctl.admit("spectator", "c") == (503, 1.0)
+    assert ctl.admit("read", "c") is None
+    assert ctl.admit("read", "c") == (503, 1.0)
+    assert ctl.admit("turn", "c") is None
+    assert ctl.metrics()["shed"] == {"turn": 0, "action": 0, "read": 1, "spectator": 1}
+
+
+def test_middleware_rejects_with_retry_after(monkeypatch):
+    ctl = AdmissionController(AdmissionSettings(client_rate=0.001, client_burst=2))
+    monkeypatch.setattr(main, "admission", ctl)
+    game_id = client.post("/game/create", params={"player_name": "Alice"}).json()["game_id"]
+    assert client.get(f"/game/{game_id}").status_code == 200
+    res = client.get(f"/game/{game_id}")
+    assert res.status_code == 429
+    assert int(res.headers["retry-after"]) >= 1
+    assert client.get("/metrics").json()["admission"]["rate_limited"]["client"] == 1
+    assert ctl.in_flight == 0
+
+
+def test_shares_and_stream_cap_come_from_the_environment(monkeypatch):
+    monkeypatch.setenv("SUGOROKU_ADMISSION_SHARES", "read=0.5, spectator=0.2,bogus=1,action=x")
+    monkeypatch.setenv("SUGOROKU_MAX_STREAMS", "3")
+    settings = AdmissionSettings.from_env()
+    assert settings.shares == {"turn": 1.0, "action": 0.9, "read": 0.5, "spectator": 0.2}
+    assert settings.max_streams == 3
+
+
+def test_streams_hold_a_slot_until_they_close():
+    ctl = AdmissionController(AdmissionSettings(max_streams=2))
+    assert ctl.admit_stream("c") is None
+    assert ctl.admit_stream("c") is None
+    assert ctl.admit_stream("c") == (503, 1.0)
+    ctl.release_stream()
+    assert ctl.admit_stream("c") is None
+    assert ctl.metrics()["streams"] == 2
+
+
+def test_websocket_spectators_are_admitted_for_their_lifetime(monkeypatch):
+    ctl = AdmissionController(AdmissionSettings(max_streams=1))
+    monkeypatch.setattr(main, "admission", ctl)
+    game_id = client.post("/game/create", params={"player_name": "Alice"}).json()["game_id"]
+    with client.websocket_connect(f"/game/{game_id}/spectate") as ws:
+        ws.receive_bytes()
+        assert ctl.streams == 1
+        with pytest.raises(WebSocketDisconnect):
+            with client.websocket_connect(f"/game/{game_id}/spectate") as other:
+                other.receive_bytes()
+        assert ctl.shed["spectator"] == 1
+    assert ctl.streams == 0
@@ -0,0 +1,88 @@
+import pytest
+from fastapi.testclient import TestClient
+import app.main as main
+from app.archive import GameArchive
+
+client = TestClient(main.app)
+
+
+@pytest.fixture
+def archive(monkeypatch):
+    arc = GameArchive(":memory:")
+    monkeypatch.setattr(main, "_archive", arc)
+    yield arc
+    arc.close()
+
+
+def finish_game(coins):
+    game_id = client.post("/game/create", params={"player_name": "Alice"}).json()["game_id"]
+    game = main.games[game_id]
+    game.players[0].coins = coins
+    game.turn = 60
+    res = client.post(f"/game/{game_id}/end-turn")
+    assert res.json()["game_state"]["game_over"] is True
+    return game_id
+
+
+def test_finished_games_are_archived_once(archive):
+    game_id = finish_game(500)
+    # further actions on a finished game must not archive it again
+    client.post(f"/game/{game_id}/end-turn")
+    finish_game(10)
+
+    stats = client.get("/archive/stats").json()
+    assert stats["games"] == 2
+    assert stats["avg_stock_price_at_finish"] == 80
+    alice = client.get("/archive/stats", params={"player_name": "Alice"}).json()["players"][0]
+    assert alice["games"] == 2
+    assert alice["wins"] == 1
+    assert alice["avg_final_assets"] == 255
+    seats = {s["key"]: s for s in stats["seats"]}
+    assert seats["bot"]["win_rate"] == 0.5
+
+
+def test_the_win_goes_to_the_winning_seat_not_its_name(archive):
+    game_id = client.post("/game/create", params={"player_name": "Bot"}).json()["game_id"]
+    game = main.games[game_id]
+    game.players[1].coins = 500  # the server's bot wins; the human is also called "Bot"
+    game.turn = 60
+    client.post(f"/game/{game_id}/end-turn")
+    seats = {s["key"]: s for s in client.get("/archive/stats").json()["seats"]}
+    assert seats["bot"]["wins"] == 1
+    assert seats["player1"]["wins"] == 0
+    assert client.get("/archive/stats", params={"player_name": "Bot"}).json()["players"][0]["wins"] == 1
+
+
+def test_undo_or_branch_of_a_finished_game_is_not_archived_again(archive):
+    ranked = main.leaderboard.games
+    game_id = client.post("/game/create", params={"player_name": "Alice"}).json()["game_id"]
+    client.post(f"/game/{game_id}/roll-dice")
+    main.games[game_id].turn = 60
+    assert client.post(f"/game/{game_id}/end-turn").json()["game_state"]["game_over"] is True
+
+    branch_id = client.post(f"/game/{game_id}/branch", params={"turn": 1}).json()["game_id"]
+    client.post(f"/game/{game_id}/undo")
+    for gid in (game_id, branch_id):
+        main.games[gid].turn = 60
+        assert client.post(f"/game/{gid}/end-turn").json()["game_state"]["game_over"] is True
+    assert client.post(f"/game/{game_id}/branch").status_code == 200
+
+    assert client.get("/archive/stats").json()["games"] == 1
+    assert main.leaderboard.games == ranked + 1
+
+
+def test_failed_results_are_logged_and_counted(monkeypatch, caplog):
+    class BrokenArchive(GameArchive):
+        def _write(self, game_row, rows):
+            raise RuntimeError("database is locked")
+
+    arc = BrokenArchive(":memory:")
+    monkeypatch.setattr(main, "_archive", arc)
+    monkeypatch.setattr(main.leaderboard, "record", lambda *a, **k: 1 / 0)
+    before = dict(main.result_failures)
+    finish_game(500)
+    arc.flush()
+    assert main.result_failures == {"leaderboard": before["leaderboard"] + 1, "archive": before["archive"] + 1}
+    assert client.get("/metrics").json()["result_failures"] == main.result_failures
+    assert "database is locked" in caplog.text and "ZeroDivisionError" in caplog.text
+    arc.close()
@@ -0,0 +1,74 @@
+import dataclasses
+import random
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app, games, rule_store
+from app.battle_math import hybrid_table, minigame_odds, rpg_table
+
+client = TestClient(app)
+
+
+def simulate_rpg(enemy_hp, player_hp, atk, rng):
+    while enemy_hp > 0 and player_hp > 0:
+        enemy_hp -= rng.randint(3, 6)
+        if enemy_hp <= 0:
+            break
+        player_hp -= rng.randint(*atk)
+    return enemy_hp <= 0
+
+
+def test_rpg_table_matches_simulation():
+    rng = random.Random(1)
+    n = 40000
+    wins = sum(simulate_rpg(12, 10, (1, 4), rng) for _ in range(n))
+    assert rpg_table(30, 10, 1, 4).odds(12, 10) == pytest.approx(wins / n, abs=0.01)
+    assert rpg_table(30, 10, 1, 4).odds(3, 1) == 1.0
+    assert rpg_table(30, 10, 1, 4).odds(0, 5) == 1.0
+
+
+def test_hybrid_optimal_policy_dominates_fixed_policies():
+    best = hybrid_table(30, 10, 0.35)
+    for policy in ("attack", "heavy", "defend", "dodge"):
+        fixed = hybrid_table(30, 10, 0.35, policy)
+        assert all(best.win[e][h] >= fixed.win[e][h] - 1e-12 for e in range(31) for h in range(11))
+    # guarding or dodging forever never wins
+    assert hybrid_table(30, 10, 0.35, "defend").odds(30, 10) == 0.0
+
+
+def test_odds_outcomes_sum_to_one():
+    odds = minigame_odds({"type": "hybrid", "player_hp": 7, "enemy": {"hp": 9, "max_hp": 30, "dodge": 0.45}}, 10)
+    total_win = sum(odds["outcomes"]["win"].values())
+    assert total_win == pytest.approx(odds["win_probability"])
+    assert total_win + sum(odds["outcomes"]["lose"].values()) == pytest.approx(1.0)
+    assert odds["by_action"][odds["recommended_action"]] == pytest.approx(odds["win_probability"])
+
+
+def test_odds_endpoint():
+    game_id = client.post("/game/create", params={"player_name": "Alice"}).json()["game_id"]
+    assert client.get(f"/game/{game_id}/minigame/odds").status_code == 404
+    games[game_id].minigame = {
+        "type": "rpg", "player_id": "player1", "player_hp": 10,
+        "enemy": {"name": "スライム", "hp": 6, "max_hp": 30, "atk_min": 1, "atk_max": 3},
+    }
+    data = client.get(f"/game/{game_id}/minigame/odds").json()
+    assert data["win_probability"] == pytest.approx(rpg_table(30, 10, 1, 3).odds(6, 10))
+    games[game_id].minigame = {"type": "mining", "player_id": "player1", "field": []}
+    assert client.get(f"/game/{game_id}/minigame/odds").status_code == 400
+
+
+def test_odds_follow_the_rules_player_hp(monkeypatch):
+    tables = rule_store.current
+    battle = tables.config.battle.model_copy(update={"player_hp": 25})
+    monkeypatch.setattr(rule_store, "current",
+                        dataclasses.replace(tables, config=tables.config.model_copy(update={"battle": battle})))
+    game_id = client.post("/game/create", params={"player_name": "Alice"}).json()["game_id"]
+    games[game_id].minigame = {
+        "type": "rpg", "player_id": "player1", "player_hp": 12,
+        "enemy": {"name": "スライム", "hp": 6, "max_hp": 31, "atk_min": 1, "atk_max": 3},
+    }
+    rpg_table.cache_clear()
+    data = client.get(f"/game/{game_id}/minigame/odds").json()
+    # the table is sized by the reloaded rules, not by a built-in 10 HP
+    hits = rpg_table.cache_info().hits
+    assert data["win_probability"] == pytest.approx(rpg_table(31, 25, 1, 3).odds(6, 12))
+    assert rpg_table.cache_info().hits == hits + 1
@@ -0,0 +1,35 @@
+import pytest
+from pydantic import ValidationError
+from app.main import Board, Crop, CropStage, CropType, GameState, board_template, create_board
+
+
+def test_boards_share_the_template_until_written():
+    a, b = create_board(40), create_board(40)
+    assert a.template is b.template is board_template(40)
+    assert a.overlay == {} and a[5].is_market and a[25].is_market
+
+    with pytest.raises(ValidationError):
+        a[3].owner = "player1"
+    a.mut(3).owner = "player1"
+    assert a[3].owner == "player1"
+    assert b[3].owner is None
+    assert a.touched() == [a[3]]
+
+    a.mut(3).owner = None
+    a.compact()
+    assert a.overlay == {}
+
+
+def test_board_serializes_as_full_square_list_and_round_trips():
+    board = create_board(20)
+    board.mut(7).owner = "bot"
+    board.mut(7).crop = Crop(type=CropType.CORN, stage=CropStage.PLANTED, planted_turn=1, growth_time=4)
+    state = GameState(players=[], current_player=0, board=board, turn=1)
+    data = state.model_dump()
+    assert [sq["id"] for sq in data["board"]] == list(range(20))
+    assert data["board"][10]["is_farm"] is True
+
+    restored = GameState.model_validate_json(state.model_dump_json())
+    assert isinstance(restored.board, Board)
+    assert list(restored.board.overlay) == [7]
+    assert restored.board[7].owner == "bot"
@@ -0,0 +1,41 @@
+from fastapi.testclient import TestClient
+from app.main import app, compressed_responses
+from app.compression import choose_encoding
+
+client = TestClient(app)
+
+
+def test_choose_encoding_honours_q_values():
+    assert choose_encoding(None) is None
+    assert choose_encoding("identity") is None
+    assert choose_encoding("gzip, deflate") == "gzip"
+    assert choose_encoding("gzip;q=0") is None
+    assert choose_encoding("*") is not None
+
+
+def test_game_state_is_compressed_and_reused_until_it_changes():
+    game_id = client.post("/game/create", params={"player_name": "Alice"}).json()["game_id"]
+    headers = {"Accept-Encoding": "gzip"}
+
+    first = client.get(f"/game/{game_id}", headers=headers)
+    assert first.headers["content-encoding"] == "gzip"
+    assert first.json()["turn"] == 1
+    hits = compressed_responses.hits
+    second = client.get(f"/game/{game_id}", headers=headers)
+    assert compressed_responses.hits == hits + 1
+    assert second.content == first.content
+
+    client.post(f"/game/{game_id}/roll-dice")
+    third = client.get(f"/game/{game_id}", headers=headers)
+    assert compressed_responses.hits == hits + 1
+    assert third.json()["turn"] == 2
+
+    raw = client.get(f"/game/{game_id}", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in raw.headers
+    assert raw.json() == third.json()
+
+
+def test_small_responses_are_not_compressed():
+    res = client.get("/healthz", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in res.headers
+    assert res.json() == {"status": "ok"}
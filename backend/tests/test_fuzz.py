@@ -0,0 +1,79 @@
+from fastapi.testclient import TestClient
+
+from app import fuzz
+from app.main import _arm_minigame_timer, app, games
+
+client = TestClient(app)
+
+
+def planted(game):
+    if any(sq.crop for sq in game.board.touched()):
+        return "planted: a crop is on the board"
+    return None
+
+
+def test_seeded_runs_keep_every_invariant():
+    before = set(games)
+    report = fuzz.fuzz(range(20), 200, shrink_failures=False)
+    assert report["failures"] == []
+    assert report["actions"] == 20 * 200
+    assert report["actions_per_sec"] > 0
+    assert set(games) == before
+
+
+def test_a_run_leaves_other_games_minigames_pending():
+    game_id = client.post("/game/create", params={"player_name": "Alice"}).json()["game_id"]
+    game = games[game_id]
+    game.awaiting_action = True
+    game.minigame = {"type": "mining", "player_id": "player1", "score": 40, "bot_score": 10, "time_limit": 30,
+                     "field": []}
+    _arm_minigame_timer(game_id, game)
+    fuzz.run(3, fuzz.generate(3, 100))
+    assert game.minigame is not None and game.minigame["type"] == "mining"
+    assert game.current_player == 0
+
+
+def test_runs_are_reproducible():
+    actions = fuzz.generate(7, 150)
+    assert actions == fuzz.generate(7, 150)
+    seen = []
+
+    def record(game):
+        seen.append((game.turn, game.current_player, tuple(p.coins for p in game.players)))
+        return None
+
+    fuzz.run(7, actions, record)
+    first, seen[:] = list(seen), []
+    fuzz.run(7, actions, record)
+    assert seen == first
+
+
+def test_shrink_finds_a_one_minimal_reproduction():
+    seed = next(s for s in range(50) if fuzz.run(s, fuzz.generate(s, 200), planted)[0])
+    actions = fuzz.generate(seed, 200)
+    (index, failure), _ = fuzz.run(seed, actions, planted)
+    small = fuzz.shrink(seed, actions[:index + 1], failure, planted)
+    assert len(small) < index + 1
+    assert fuzz.run(seed, small, planted)[0] is not None
+    for i in range(len(small)):
+        assert fuzz.run(seed, small[:i] + small[i + 1:], planted)[0] is None
+
+
+def test_handler_crash_is_reported_as_a_failure():
+    result, applied = fuzz.run(0, [("roll_dice", ("unexpected",))])
+    assert applied == 1
+    assert result[1].startswith("crash: roll_dice")
+
+
+def test_turn_actions_wait_for_a_pending_battle():
+    # shrunk from a fuzz failure: planting during a battle passed the turn and orphaned it
+    game_id = client.post("/game/create", params={"player_name": "fuzz"}).json()["game_id"]
+    games[game_id].minigame = {"type": "rpg", "player_id": "player1"}
+    for path in ("roll-dice", "plant-crop?crop_type=corn", "harvest-crop"):
+        res = client.post(f"/game/{game_id}/{path}")
+        assert res.status_code == 400, path
+        assert res.json()["detail"] == "Finish the minigame first"
+    assert client.post(f"/game/{game_id}/minigame/hybrid/start").status_code == 400
+    assert client.post(f"/game/{game_id}/end-turn").status_code == 200
+    assert games[game_id].minigame is None
+    assert games[game_id].players[games[game_id].current_player].id == "bot"
@@ -0,0 +1,79 @@
+from fastapi.testclient import TestClient
+
+from app.game_index import GameIndex
+from app.main import app, drop_game, games
+
+client = TestClient(app)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_updates_move_games_between_keys():
+    clock = FakeClock()
+    index = GameIndex(clock)
+    index.update("a", "active", None, ["Alice", "bot"])
+    clock.now += 1
+    index.update("b", "minigame", "rpg", ["Bob", "bot"])
+    assert index.query(status="active") == (1, ["a"])
+    assert index.query(player="BOT") == (2, ["b", "a"])
+
+    clock.now += 10
+    index.update("a", "minigame", "mining", ["Alice", "bot"])
+    assert index.query(status="active") == (0, [])
+    assert index.query(status="minigame") == (2, ["a", "b"])
+    assert index.query(minigame="rpg", player="bot") == (1, ["b"])
+    assert index.counts() == {"minigame": 2}
+
+    index.remove("b")
+    assert index.query(player="bob") == (0, [])
+    assert len(index) == 1 and index.counts() == {"minigame": 1}
+
+
+def test_pagination_and_idle_games_in_activity_order():
+    clock = FakeClock()
+    index = GameIndex(clock)
+    for i in range(10):
+        clock.now += 1
+        index.update(f"g{i}", "active", None, ["p"])
+    assert index.query(limit=3) == (10, ["g9", "g8", "g7"])
+    assert index.query(limit=3, offset=8) == (10, ["g1", "g0"])
+    assert index.query(limit=2, oldest_first=True) == (10, ["g0", "g1"])
+
+    clock.now += 100
+    index.update("g0", "active", None, ["p"])
+    total, ids = index.query(idle_seconds=50, oldest_first=True, limit=3)
+    assert total == 9 and ids == ["g1", "g2", "g3"]
+
+
+def test_list_games_endpoint():
+    game_id = client.post("/game/create", params={"player_name": "Zed_index"}).json()["game_id"]
+    body = client.get("/games", params={"player": "zed_index"}).json()
+    assert body["total"] == 1
+    assert body["games"][0]["game_id"] == game_id
+    assert body["games"][0]["status"] == "active"
+
+    # past the last turn with a minigame still pending: never finalized
+    games[game_id].turn = 61
+    games[game_id].minigame = {"type": "invader", "attacker_id": "bot", "defender_id": "player1", "square_id": 3}
+    client.post(f"/game/{game_id}/end-turn")
+    assert game_id in [g["game_id"] for g in client.get("/games", params={"status": "overdue", "limit": 200}).json()["games"]]
+    assert client.get("/games", params={"status": "stuck"}).status_code == 400
+
+    drop_game(game_id)
+    assert client.get("/games", params={"player": "zed_index"}).json()["total"] == 0
+
+
+def test_listing_drops_games_the_index_outlived():
+    game_id = client.post("/game/create", params={"player_name": "Zed-stale"}).json()["game_id"]
+    games.pop(game_id)  # behind drop_game's back
+    res = client.get("/games", params={"player": "Zed-stale"})
+    assert res.status_code == 200
+    assert res.json()["games"] == [] and res.json()["total"] == 0
+    assert client.get("/games", params={"player": "Zed-stale"}).json()["total"] == 0
+    drop_game(game_id)
@@ -0,0 +1,134 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.game_store import GameStore
+from app.main import (Crop, CropStage, CropType, Player, _catch_up, app, games, new_game_state, rule_store,
+                      snapshot_state)
+
+client = TestClient(app)
+
+
+class Clock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_store(tick: float = 10):
+    calls = []
+    clock = Clock()
+    store = GameStore(lambda game_id, game, ticks: calls.append((game_id, ticks)), tick_seconds=tick, clock=clock)
+    return store, clock, calls
+
+
+def test_reads_hand_over_whole_elapsed_ticks_once():
+    store, clock, calls = make_store()
+    store["g"] = "game"
+    clock.now += 25
+    assert "g" in store and list(store) == ["g"] and list(store.values()) == ["game"]
+    assert calls == []  # membership and iteration never evaluate
+    assert store["g"] == "game"
+    assert calls == [("g", 2)]
+    clock.now += 5  # the half tick left over from the first read completes now
+    assert store.get("g") == "game"
+    assert calls == [("g", 2), ("g", 1)]
+    assert store.get("g") == "game" and store.get("missing", 7) == 7
+    assert len(calls) == 2
+
+
+def test_replacing_a_game_keeps_its_clock_and_removal_forgets_it():
+    store, clock, calls = make_store()
+    store["g"] = "a"
+    clock.now += 10
+    store["g"] = "b"
+    assert store["g"] == "b" and calls == [("g", 1)]
+    store.pop("g")
+    clock.now += 100
+    store["g"] = "c"
+    assert store["g"] == "c" and calls == [("g", 1)]
+
+
+def test_a_failed_load_leaves_the_game_deferred_for_a_retry():
+    store, _, _ = make_store(tick=0)
+    attempts = []
+
+    def load(game_id):
+        attempts.append(game_id)
+        if len(attempts) == 1:
+            raise ValueError("corrupt")
+        return "game"
+
+    store.defer([("g", 0.0)], load)
+    with pytest.raises(ValueError):
+        store["g"]
+    assert "g" in store and store.deferred == ("g",)
+    assert store.get("g") == "game"
+    assert store.deferred == () and attempts == ["g", "g"]
+
+
+def test_catch_up_is_off_at_zero_and_restarts_when_the_tick_changes():
+    store, clock, calls = make_store(tick=0)
+    store["g"] = "game"
+    clock.now += 1000
+    assert store["g"] == "game" and calls == []
+    store.set_tick(10)
+    clock.now += 10
+    assert store["g"] == "game" and calls == [("g", 1)]
+
+
+def _farm() -> object:
+    game = new_game_state([
+        Player(id="player1", name="A", position=0, coins=0, crops_harvested=0, inventory={}),
+        Player(id="bot", name="B", position=0, coins=0, crops_harvested=0, inventory={}),
+    ])
+    for i, growth in ((1, 2), (2, 4), (3, 9)):
+        sq = game.board.mut(i)
+        sq.crop = Crop(type=CropType.CORN, stage=CropStage.PLANTED, planted_turn=game.turn, growth_time=growth)
+        sq.owner = "player1"
+    for i, turns in ((4, 0), (6, 3), (7, 8)):
+        sq = game.board.mut(i)
+        sq.is_story, sq.story_label, sq.story_effect, sq.story_turns = True, "福", "gift", turns
+    game.board.mut(8).building_owner = "player1"
+    game.board.mut(9).building_owner = "player1"
+    game.board.mut(11).building_owner = "bot"
+    return game
+
+
+@pytest.mark.parametrize("ticks", [1, 2, 3, 5, 7])
+def test_closed_form_catch_up_matches_a_sweep_every_tick(ticks):
+    swept, lazy = _farm(), _farm()
+    for _ in range(ticks):
+        _catch_up("not_registered", swept, 1)
+    _catch_up("not_registered", lazy, ticks)
+    assert [sq.model_dump() for sq in lazy.board] == [sq.model_dump() for sq in swept.board]
+    assert [p.coins for p in lazy.players] == [p.coins for p in swept.players]
+    buildings = rule_store.current.config.buildings
+    assert lazy.players[0].coins == 2 * buildings.income * (ticks // buildings.income_every_turns)
+
+
+def test_catch_up_is_capped_and_skips_finished_games():
+    game = _farm()
+    _catch_up("not_registered", game, 10 ** 6)
+    assert game.board[3].crop.stage == CropStage.READY
+    assert game.players[0].coins == 2 * 50 * (240 // 3)
+    done = _farm()
+    done.game_over = True
+    before = snapshot_state(done)
+    _catch_up("not_registered", done, 5)
+    assert done.model_dump() == before.model_dump()
+
+
+def test_dormant_games_catch_up_when_read(monkeypatch):
+    game_id = client.post("/game/create", params={"player_name": "sleepy"}).json()["game_id"]
+    sq = games[game_id].board.mut(1)
+    sq.crop = Crop(type=CropType.CARROT, stage=CropStage.PLANTED, planted_turn=1, growth_time=2)
+    sq.owner = "player1"
+    clock = Clock(games._evaluated[game_id])
+    monkeypatch.setattr(games, "_clock", clock)
+    monkeypatch.setattr(games, "tick_seconds", 60)
+    clock.now += 59
+    assert client.get(f"/game/{game_id}").json()["board"][1]["crop"]["stage"] == "planted"
+    clock.now += 61
+    assert client.get(f"/game/{game_id}").json()["board"][1]["crop"]["stage"] == "ready"
@@ -0,0 +1,72 @@
+from fastapi.testclient import TestClient
+from app.main import app, games, snapshot_state, state_histories
+
+client = TestClient(app)
+
+
+def create_game():
+    return client.post("/game/create", params={"player_name": "Alice"}).json()["game_id"]
+
+
+def play_round(game_id):
+    client.post(f"/game/{game_id}/roll-dice")
+    client.post(f"/game/{game_id}/end-turn")
+    client.post(f"/game/{game_id}/roll-dice")
+
+
+def test_snapshots_share_unchanged_squares():
+    game_id = create_game()
+    game = games[game_id]
+    game.board.mut(3).owner = "player1"
+    game.board.mut(4).owner = "bot"
+    snap = snapshot_state(game)
+    assert snap.board.overlay[3] is game.board.overlay[3]
+
+    game.board.mut(3).owner = "bot"
+    assert snap.board[3].owner == "player1"
+    assert snap.board.overlay[4] is game.board.overlay[4]
+
+    game.players[0].coins = 999
+    assert snap.players[0].coins == 100
+
+
+def test_undo_rewinds_the_last_roll():
+    game_id = create_game()
+    play_round(game_id)
+    before = games[game_id].model_dump()
+    client.post(f"/game/{game_id}/end-turn")
+    client.post(f"/game/{game_id}/roll-dice")
+    assert games[game_id].turn == before["turn"] + 1
+
+    res = client.post(f"/game/{game_id}/undo")
+    assert res.status_code == 200
+    restored = games[game_id].model_dump()
+    # undo restores the state before the roll, which was after the end-turn
+    assert restored["turn"] == before["turn"]
+    assert restored["players"] == before["players"]
+    assert restored["board"] == before["board"]
+    assert client.get(f"/game/{game_id}/market/history").json()["turns"][-1] == before["turn"]
+
+    while client.post(f"/game/{game_id}/undo").status_code == 200:
+        pass
+    assert games[game_id].turn == 1
+
+
+def test_branch_from_an_earlier_turn_leaves_the_source_alone():
+    game_id = create_game()
+    for _ in range(3):
+        play_round(game_id)
+        client.post(f"/game/{game_id}/end-turn")
+    source_turn = games[game_id].turn
+    assert client.get(f"/game/{game_id}/history").json()["turns"] == list(range(1, source_turn))
+
+    res = client.post(f"/game/{game_id}/branch", params={"turn": 3})
+    assert res.status_code == 200
+    branch_id = res.json()["game_id"]
+    assert games[branch_id].turn == 3
+    assert state_histories[branch_id].turns() == [1, 2]
+    assert games[game_id].turn == source_turn
+
+    client.post(f"/game/{branch_id}/roll-dice")
+    assert games[game_id].turn == source_turn
+    assert client.post(f"/game/{game_id}/branch", params={"turn": 999}).status_code == 404
@@ -0,0 +1,175 @@
+import asyncio
+import random
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app.main as main
+from app.archive import GameArchive
+from app.leaderboard import Entry, Leaderboard, Ranking, stored_rankings, week_start
+from app.main import app, games
+
+client = TestClient(app)
+
+DAY = 86400.0
+# Monday 2026-10-19 12:00 UTC
+MONDAY = 1792411200.0
+
+
+class Clock:
+    def __init__(self, now: float):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_ranking_keeps_best_scores_sorted_with_bisect_ranks():
+    r = Ranking()
+    rng = random.Random(5)
+    best = {}
+    for i in range(2000):
+        key, score = f"p{rng.randrange(300)}", rng.randrange(10_000)
+        r.submit(key, Entry(key, score, float(i), "g"))
+        best[key] = max(best.get(key, -1), score)
+    assert len(r) == len(best)
+    expected = sorted(best, key=lambda k: (-best[k], r.entry(k).at))
+    assert [e.name for _, e in r.top(0, len(r))] == expected
+    for i, key in enumerate(expected):
+        assert r.rank(key) == i + 1
+
+
+def test_only_an_improvement_changes_the_version():
+    r = Ranking()
+    assert r.submit("a", Entry("A", 100, 1.0, "g1"))
+    assert not r.submit("a", Entry("A", 90, 2.0, "g2"))
+    assert not r.submit("a", Entry("A", 100, 3.0, "g3"))
+    assert r.version == 1
+    assert r.submit("b", Entry("B", 100, 4.0, "g4"))
+    assert (r.rank("a"), r.rank("b")) == (1, 2)  # the earlier of two equal scores ranks higher
+    assert r.rank("nobody") is None
+
+
+def test_windows_roll_over_by_day_and_week():
+    clock = Clock(MONDAY)
+    lb = Leaderboard(clock=clock)
+    lb.record("g1", [("Ann", 500), ("Bob", 300)])
+    assert lb.page("daily")["period"] == "2026-10-19"
+    assert lb.page("weekly")["period"] == "2026-W43"
+
+    clock.now += DAY
+    lb.record("g2", [("bob", 400)])
+    assert [(e["name"], e["score"]) for e in lb.page("daily")["entries"]] == [("bob", 400)]
+    assert [(e["name"], e["score"]) for e in lb.page("weekly")["entries"]] == [("Ann", 500), ("bob", 400)]
+
+    clock.now += 7 * DAY
+    assert lb.page("weekly")["total"] == 0
+    assert lb.page("all")["total"] == 2
+    assert lb.rank("all", "BOB") == {"rank": 2, "name": "bob", "score": 400, "game_id": "g2"}
+    # a result stamped inside a period that is already over only counts all-time
+    lb.record("late", [("Cid", 900)], at=MONDAY)
+    assert lb.page("daily")["total"] == 0
+    assert lb.rank("all", "cid")["rank"] == 1
+
+
+def test_week_starts_on_monday_utc():
+    assert week_start(MONDAY) == MONDAY - 12 * 3600
+    assert week_start(MONDAY + 6 * DAY) == MONDAY - 12 * 3600
+
+
+def test_pages_are_cached_until_the_ranking_changes():
+    lb = Leaderboard(clock=Clock(MONDAY))
+    lb.record("g1", [("Ann", 500)])
+    first = lb.page("all")
+    assert lb.page("all") is first
+    lb.record("g2", [("Ann", 100)])  # not a new best
+    assert lb.page("all") is first
+    lb.record("g3", [("Ann", 600)])
+    assert lb.page("all")["entries"][0]["score"] == 600
+    assert lb.metrics()["page_cache"]["hits"] == 2
+
+
+def test_finished_games_reach_the_leaderboard_endpoint():
+    game_id = client.post("/game/create", params={"player_name": "Lea_board"}).json()["game_id"]
+    games[game_id].turn = 61
+    games[game_id].players[0].coins = 10 ** 9
+    client.post(f"/game/{game_id}/end-turn")
+    assert games[game_id].game_over
+
+    body = client.get("/leaderboard", params={"player": "lea_board"}).json()
+    assert body["player"]["rank"] == 1
+    assert body["entries"][0] == {**body["entries"][0], "name": "Lea_board", "game_id": game_id}
+    assert all(e["name"] != "BOT" for e in body["entries"])
+    assert client.get("/leaderboard", params={"window": "daily"}).json()["entries"][0]["name"] == "Lea_board"
+    assert client.get("/leaderboard", params={"window": "monthly"}).status_code == 400
+
+
+def test_adopted_rankings_keep_results_ranked_while_warming():
+    lb = Leaderboard(clock=Clock(MONDAY))
+    lb.record("live", [("Ann", 700)])
+    cached = lb.page("all")
+    periods = lb.periods()
+    stored = [("all", "", "ann", 500, MONDAY - DAY, "g1"), ("all", "", "Bob", 600, MONDAY - DAY, "g2"),
+              ("daily", "2026-10-18", "Bob", 600, MONDAY - DAY, "g2")]
+    lb.adopt(stored_rankings(stored, periods))
+    page = lb.page("all")
+    assert page is not cached
+    assert [(e["name"], e["score"]) for e in page["entries"]] == [("Ann", 700), ("Bob", 600)]
+    assert [e["name"] for e in lb.page("daily")["entries"]] == ["Ann"]
+
+
+@pytest.fixture
+def archived(monkeypatch):
+    arc = GameArchive(":memory:")
+    monkeypatch.setattr(main, "ARCHIVE_PATH", ":memory:")
+    monkeypatch.setattr(main, "_archive", arc)
+    monkeypatch.setattr(main, "leaderboard", Leaderboard())
+    for coins in (300, 900, 600):
+        game_id = client.post("/game/create", params={"player_name": "Rebuilt"}).json()["game_id"]
+        games[game_id].turn = 61
+        games[game_id].players[0].coins = coins
+        client.post(f"/game/{game_id}/end-turn")
+    arc.flush()
+    yield arc
+    arc.close()
+
+
+def test_boards_are_read_back_from_the_archive(monkeypatch, archived):
+    before = {w: main.leaderboard.page(w)["entries"] for w in ("all", "daily", "weekly")}
+    monkeypatch.setattr(main, "leaderboard", Leaderboard())
+    assert asyncio.run(main.restore_leaderboard()) == 3
+    for window, entries in before.items():
+        assert main.leaderboard.page(window)["entries"] == entries
+    assert main.leaderboard.metrics()["restored_games"] == 3
+    assert client.get("/leaderboard").json()["warming"] is False
+
+
+def test_an_older_archive_is_backfilled_and_old_periods_pruned(monkeypatch, archived):
+    best = main.leaderboard.page("all")["entries"][0]["score"]
+    with archived._lock:
+        archived._db.execute("DELETE FROM leaderboard_best")
+        # the best game is from a past week: all-time only
+        archived._db.execute("UPDATE games SET finished_at = ? WHERE id = 2", (MONDAY - 30 * DAY,))
+    monkeypatch.setattr(main, "leaderboard", Leaderboard())
+    asyncio.run(main.restore_leaderboard())
+    assert main.leaderboard.page("all")["entries"][0]["score"] == best
+    assert main.leaderboard.page("weekly")["entries"][0]["score"] < best
+    with archived._lock:
+        periods = {r[0] for r in archived._db.execute("SELECT period FROM leaderboard_best WHERE board = 'weekly'")}
+    assert periods == {main.leaderboard.periods()["weekly"]}
+
+
+def test_startup_does_not_wait_for_the_boards(monkeypatch, archived):
+    release = threading.Event()
+    read = archived.leaderboard_rows
+    monkeypatch.setattr(archived, "leaderboard_rows", lambda periods: release.wait(5) and read(periods))
+    with TestClient(main.create_app(warmup=False)) as c:
+        assert c.get("/leaderboard").json()["warming"] is True
+        release.set()
+        for _ in range(100):
+            if not c.get("/leaderboard").json()["warming"]:
+                break
+            time.sleep(0.02)
+        assert c.get("/leaderboard").json()["entries"][0]["name"] == "Rebuilt"
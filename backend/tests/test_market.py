@@ -0,0 +1,76 @@
+from fastapi.testclient import TestClient
+
+from app.main import Player, app, games, new_game_state
+from app.market import MarketEngine
+
+client = TestClient(app)
+CROPS = ("carrot", "tomato", "corn", "wheat")
+
+
+def make_state():
+    return new_game_state([Player(id="player1", name="A", position=0, coins=100, crops_harvested=0, inventory={})])
+
+
+def test_tick_updates_every_game_in_place():
+    engine = MarketEngine(CROPS, capacity=2, seed=1)
+    states = [make_state() for _ in range(5)]
+    dicts = [(s.crop_prices, s.crop_changes) for s in states]
+    for i, s in enumerate(states):
+        engine.attach(f"g{i}", s)
+    old = [(s.stock_price, dict(s.crop_prices)) for s in states]
+
+    assert sorted(engine.tick()) == [f"g{i}" for i in range(5)]
+    for s, (stock, prices), (p, c) in zip(states, old, dicts):
+        assert s.crop_prices is p and s.crop_changes is c
+        assert 10 <= s.stock_price <= 300 and abs(s.stock_price - stock) <= 30
+        assert s.last_stock_change == int(round((s.stock_price - stock) / stock * 100))
+        for k in CROPS:
+            assert 30 <= s.crop_prices[k] <= 100
+            assert s.crop_changes[k] == int(round((s.crop_prices[k] - prices[k]) / prices[k] * 100))
+
+
+def test_rows_are_reused_and_states_reattached():
+    engine = MarketEngine(CROPS, capacity=1, seed=2)
+    a, b = make_state(), make_state()
+    engine.attach("a", a)
+    engine.attach("b", b)
+    row_b = engine.row("b")
+    engine.release("b")
+    engine.attach("c", make_state())
+    assert engine.row("c") == row_b and len(engine) == 2
+
+    # a replacement state (e.g. an undo) takes over the row with its own prices
+    restored = make_state()
+    restored.stock_price = 123
+    old, new = engine.step("a", restored)
+    assert old == 123 and restored.stock_price == new
+
+
+def test_shared_market_moves_only_on_ticks_and_shocks():
+    engine = MarketEngine(CROPS, shared=True, seed=3)
+    states = [make_state() for _ in range(3)]
+    for i, s in enumerate(states):
+        engine.attach(f"g{i}", s)
+    assert engine.step("g0", states[0]) is None
+    engine.tick()
+    quote = engine.shared_quote()
+    for s in states:
+        assert s.stock_price == quote["stock_price"] and s.crop_prices == quote["crop_prices"]
+
+    engine.shock(stock_pct=-50, crop_pct=10)
+    assert all(s.stock_price == max(10, round(quote["stock_price"] * 0.5)) for s in states)
+    assert engine.scale_crops("g1", 1.1) == ["g0", "g1", "g2"]
+
+
+def test_global_tick_and_shock_endpoints():
+    game_id = client.post("/game/create", params={"player_name": "Alice"}).json()["game_id"]
+    game = games[game_id]
+    before = len(client.get(f"/game/{game_id}/market/history").json()["turns"])
+    assert client.post("/market/tick").json()["games"] >= 1
+    assert len(client.get(f"/game/{game_id}/market/history").json()["turns"]) == before + 1
+
+    prices = dict(game.crop_prices)
+    client.post("/market/shock", params={"crop_pct": 100})
+    assert game.crop_prices == {k: min(300, v * 2) for k, v in prices.items()}
+    assert client.post("/market/shock", params={"stock_pct": -100}).status_code == 400
+    assert client.get("/market").json()["shared"] is False
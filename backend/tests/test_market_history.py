@@ -0,0 +1,32 @@
+from fastapi.testclient import TestClient
+from app.main import app
+from app.market_history import MarketHistory
+
+client = TestClient(app)
+
+
+def test_ring_buffer_keeps_latest_quotes():
+    hist = MarketHistory(["carrot"], capacity=4)
+    for turn in range(1, 8):
+        hist.record(turn, 10 * turn, {"carrot": turn})
+    data = hist.query()
+    assert data["turns"] == [4, 5, 6, 7]
+    assert data["stock_price"] == [40, 50, 60, 70]
+    assert data["crop_prices"]["carrot"] == [4, 5, 6, 7]
+    assert hist.query(since_turn=6)["turns"] == [6, 7]
+    assert hist.query(since_turn=100)["turns"] == []
+
+
+def test_history_endpoint_tracks_rolls():
+    game_id = client.post("/game/create", params={"player_name": "Alice"}).json()["game_id"]
+    last = None
+    for _ in range(3):
+        last = client.post(f"/game/{game_id}/roll-dice").json()["game_state"]
+        client.post(f"/game/{game_id}/end-turn")
+    res = client.get(f"/game/{game_id}/market/history")
+    assert res.status_code == 200
+    data = res.json()
+    assert data["turns"] == [1, 2, 3, 4]
+    assert data["stock_price"][-1] == last["stock_price"]
+    assert data["crop_prices"]["corn"][-1] == last["crop_prices"]["corn"]
+    assert client.get(f"/game/{game_id}/market/history", params={"since_turn": 3}).json()["turns"] == [3, 4]
@@ -0,0 +1,65 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import CropType, app, get_crop_growth_time, markets, rule_store
+from app.rules import DEFAULT_RULES_PATH, RulesError, load_rules
+
+client = TestClient(app)
+CROPS = [c.value for c in CropType]
+
+
+def default_rules():
+    with open(DEFAULT_RULES_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_default_rules_compile_to_lookup_tables():
+    tables = load_rules(DEFAULT_RULES_PATH, CROPS)
+    assert dict(tables.growth_time) == {"carrot": 2, "tomato": 3, "corn": 4, "wheat": 3}
+    assert len(tables.mining_field) == 119
+    assert [b[0] for b in tables.mining_field] == list(range(119))
+    assert tables.time_limits["mining"] == 30
+    assert 0 < tables.bot_battle_odds < 1
+    with pytest.raises(TypeError):
+        tables.growth_time["carrot"] = 9
+
+
+@pytest.mark.parametrize("patch", [
+    lambda r: r["crops"].pop("corn"),
+    lambda r: r.__setitem__("harvest_qty", [5, 1]),
+    lambda r: r["story"]["effects"].__setitem__("flood", {"label": "x", "color": "y"}),
+    lambda r: r["battle"].__setitem__("rpg_enemies", []),
+    lambda r: r.__setitem__("unknown", 1),
+])
+def test_invalid_rules_are_rejected(tmp_path, patch):
+    rules = default_rules()
+    patch(rules)
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps(rules), encoding="utf-8")
+    with pytest.raises(RulesError):
+        load_rules(str(path), CROPS)
+
+
+def test_reload_swaps_rules_and_keeps_them_on_error(tmp_path):
+    original = rule_store.path
+    rules = default_rules()
+    rules["crops"]["carrot"]["growth_time"] = 7
+    rules["market"]["price_cap"] = 150
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps(rules), encoding="utf-8")
+    try:
+        rule_store.reload(str(path))
+        assert get_crop_growth_time(CropType.CARROT) == 7
+        assert markets.rules.price_cap == 150
+
+        path.write_text("{", encoding="utf-8")
+        res = client.post("/rules/reload")
+        assert res.status_code == 400
+        assert get_crop_growth_time(CropType.CARROT) == 7
+        assert client.get("/rules").json()["rules"]["crops"]["carrot"]["growth_time"] == 7
+    finally:
+        rule_store.reload(original)
+    assert get_crop_growth_time(CropType.CARROT) == 2
+    assert markets.rules.price_cap == 300
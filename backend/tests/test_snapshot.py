@@ -0,0 +1,123 @@
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app.main as main
+from app.main import CropType, app, drop_game, games, restore_snapshot, save_snapshot
+from app.snapshot import Snapshot, SnapshotError, encode_blob, open_snapshot, write_snapshot
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def fresh_snapshot_state(monkeypatch):
+    monkeypatch.setattr(main, "_snapshot", None)
+    monkeypatch.setattr(main, "snapshot_error", None)
+    yield
+    for game_id in games.deferred:
+        drop_game(game_id)
+
+
+def test_snapshot_file_round_trip(tmp_path):
+    path = str(tmp_path / "games.snapshot")
+    assert open_snapshot(path) is None
+    assert write_snapshot(path, [("a", encode_blob(b"alpha"), ["n", 1]), ("b", encode_blob(b"b" * 1000), {})]) == 2
+    snap = Snapshot(path)
+    assert list(snap) == ["a", "b"] and len(snap) == 2 and "a" in snap
+    assert snap.read("a") == b"alpha" and snap.read("b") == b"b" * 1000
+    assert snap.meta("a") == ["n", 1]
+    snap.close()
+
+
+@pytest.mark.parametrize("damage", [lambda b: b[:-5], lambda b: b"NOTASNAP" + b[8:], lambda b: b[:10]])
+def test_broken_files_are_rejected(tmp_path, damage):
+    path = tmp_path / "games.snapshot"
+    write_snapshot(str(path), [("a", encode_blob(b"alpha" * 50), {})])
+    path.write_bytes(damage(path.read_bytes()))
+    with pytest.raises(SnapshotError):
+        Snapshot(str(path))
+
+
+def _play(name: str) -> str:
+    game_id = client.post("/game/create", params={"player_name": name}).json()["game_id"]
+    client.post(f"/game/{game_id}/roll-dice")
+    return game_id
+
+
+def test_warm_restart_loads_games_lazily_with_their_state(tmp_path):
+    path = str(tmp_path / "games.snapshot")
+    plain, battling, finished = _play("snap_a"), _play("snap_b"), _play("snap_c")
+    games[battling].minigame = {"type": "rpg", "player_id": "player1", "timer_id": "stale"}
+    games[finished].turn = 61
+    client.post(f"/game/{finished}/end-turn")
+    assert games[finished].game_over
+    before = {g: client.get(f"/game/{g}").json() for g in (plain, battling, finished)}
+    before[battling]["minigame"].pop("timer_id")
+    before[battling]["minigame"].pop("expires_at", None)
+    turns = getattr(games[plain].players[0], "_turns")
+    assert save_snapshot(path) >= 3
+
+    # the new process: nothing in memory yet
+    for g in (plain, battling, finished):
+        drop_game(g)
+    assert restore_snapshot(path) >= 3
+    assert {plain, battling, finished} <= set(games.deferred)
+    assert plain in games and not dict.__contains__(games, plain)
+    listed = client.get("/games", params={"player": "snap_b"}).json()["games"]
+    assert [(g["game_id"], g["status"]) for g in listed] == [(battling, "minigame")]
+    assert client.get("/games", params={"player": "snap_c"}).json()["games"][0]["status"] == "finished"
+
+    after = client.get(f"/game/{battling}").json()
+    assert after["minigame"].pop("timer_id") != "stale"  # re-armed
+    after["minigame"].pop("expires_at")
+    assert after == before[battling]
+    assert client.get(f"/game/{plain}").json() == before[plain]
+    assert getattr(games[plain].players[0], "_turns") == turns
+    assert client.post(f"/game/{plain}/plant-crop", params={"crop_type": CropType.CARROT.value}).status_code in (200, 400)
+    assert getattr(games[finished], "_recorded") is True  # not archived a second time
+
+
+def test_unread_games_are_carried_into_the_next_snapshot(tmp_path):
+    first, second = str(tmp_path / "one.snapshot"), str(tmp_path / "two.snapshot")
+    game_id = _play("snap_carry")
+    state = client.get(f"/game/{game_id}").json()
+    save_snapshot(first)
+    drop_game(game_id)
+    restore_snapshot(first)
+    assert game_id in games.deferred
+    save_snapshot(second)  # copied without being decoded
+    drop_game(game_id)
+    assert game_id not in games
+    main._snapshot = None
+    restore_snapshot(second)
+    assert client.get(f"/game/{game_id}").json() == state
+
+
+def test_a_broken_snapshot_starts_the_server_empty(tmp_path):
+    path = tmp_path / "games.snapshot"
+    path.write_bytes(b"garbage")
+    assert restore_snapshot(str(path)) == 0
+    assert "truncated" in client.get("/metrics").json()["snapshot"]["error"]
+
+
+def test_a_game_that_fails_to_load_is_kept_and_unlisted(tmp_path):
+    first, second = str(tmp_path / "one.snapshot"), str(tmp_path / "two.snapshot")
+    now = time.time()
+    blob = encode_blob(b'{"turns":{},"idle_ticks":0,"recorded":false}\n{"not":"a game"}')
+    write_snapshot(first, [("snap_bad", blob, ["active", None, ["snap_bad"], now, now])])
+    assert restore_snapshot(first) == 1
+    # listing loads the page, finds the broken game and stops listing it
+    listing = client.get("/games", params={"player": "snap_bad"})
+    assert listing.status_code == 200 and listing.json()["total"] == 0
+
+    lenient = TestClient(app, raise_server_exceptions=False)
+    for _ in range(2):  # every read retries the load; none loses the game
+        assert lenient.get("/game/snap_bad").status_code == 500
+        assert "snap_bad" in games.deferred
+    assert client.get("/metrics").json()["snapshot"]["failed"] == ["snap_bad"]
+
+    save_snapshot(second)
+    kept = Snapshot(second)
+    assert kept.blob("snap_bad") == blob
+    kept.close()
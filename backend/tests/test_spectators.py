@@ -0,0 +1,62 @@
+import asyncio
+import json
+import time
+from fastapi.testclient import TestClient
+import app.main as main
+from app.main import app
+from app.spectators import SpectatorHub
+
+
+def test_state_is_encoded_once_per_version_for_all_subscribers():
+    calls = []
+
+    def encode(game_id):
+        calls.append(game_id)
+        return b'{"turn":1}'
+
+    async def scenario():
+        hub = SpectatorHub(encode)
+        subs = [hub.subscribe("g") for _ in range(1000)]
+        first = [await s.next_frame() for s in subs]
+        hub.publish("g")
+        hub.publish("g")
+        second = [await s.next_frame() for s in subs]
+        return hub, subs, first, second
+
+    hub, subs, first, second = asyncio.run(scenario())
+    assert len(calls) == 2
+    assert all(f is first[0] for f in first)
+    assert all(f is second[0] for f in second)
+    # slow subscribers skip straight to the latest version
+    assert json.loads(second[0])["version"] == 2
+    assert all(s.skipped == 1 for s in subs)
+    for s in subs:
+        s.close()
+    assert hub.subscriber_count() == 0
+
+
+def test_websocket_spectator_receives_updates():
+    with TestClient(app) as client:
+        game_id = client.post("/game/create", params={"player_name": "Alice"}).json()["game_id"]
+        with client.websocket_connect(f"/game/{game_id}/spectate") as ws:
+            initial = json.loads(ws.receive_bytes())
+            assert initial["game_state"]["turn"] == 1
+            client.post(f"/game/{game_id}/roll-dice")
+            update = json.loads(ws.receive_bytes())
+            assert update["version"] > initial["version"]
+            assert update["game_state"]["turn"] == 2
+
+
+def test_websocket_watcher_leaving_an_idle_game_is_unsubscribed(monkeypatch):
+    monkeypatch.setattr(main, "SPECTATOR_KEEPALIVE_SECONDS", 0.05)
+    with TestClient(app) as client:
+        game_id = client.post("/game/create", params={"player_name": "Alice"}).json()["game_id"]
+        with client.websocket_connect(f"/game/{game_id}/spectate") as ws:
+            ws.receive_bytes()
+            assert ws.receive_text() == "keep-alive"
+            assert main.spectators.subscriber_count(game_id) == 1
+        for _ in range(200):
+            if main.spectators.subscriber_count(game_id) == 0:
+                break
+            time.sleep(0.01)
+        assert main.spectators.subscriber_count(game_id) == 0
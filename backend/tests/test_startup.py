@@ -0,0 +1,40 @@
+import os
+import subprocess
+import sys
+
+from fastapi.testclient import TestClient
+
+import app.main as main
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_create_app_serves_the_shared_game_state():
+    a, b = main.create_app(warmup=False), main.create_app(warmup=False)
+    assert a is not b
+    game_id = TestClient(a).post("/game/create", params={"player_name": "Alice"}).json()["game_id"]
+    assert TestClient(b).get(f"/game/{game_id}").status_code == 200
+    paths = {r.path for r in a.routes}
+    assert {"/game/create", "/game/{game_id}/spectate", "/metrics"} <= paths
+
+
+def test_warm_up_runs_at_startup_only_when_enabled():
+    cold = main.create_app(warmup=False)
+    with TestClient(cold):
+        assert cold.openapi_schema is None
+    warm = main.create_app(warmup=True)
+    with TestClient(warm) as client:
+        assert warm.openapi_schema is not None
+        assert client.post("/game/create", params={"player_name": "Alice"}).status_code == 200
+
+
+def test_module_app_is_built_once():
+    assert main.app is main.app
+
+
+def test_optional_subsystems_are_not_imported_with_the_app():
+    code = ("import sys, app.main; "
+            "print(' '.join(m for m in ('numpy', 'brotli', 'zstandard', 'sqlite3', 'app.battle_math') "
+            "if m in sys.modules))")
+    out = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, capture_output=True, text=True, check=True)
+    assert out.stdout.split() == []
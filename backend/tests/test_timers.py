@@ -0,0 +1,61 @@
+from fastapi.testclient import TestClient
+from app.main import app, games, minigame_timers, _arm_minigame_timer
+from app.timers import TimerScheduler
+
+client = TestClient(app)
+
+
+def create_game():
+    response = client.post("/game/create", params={"player_name": "Alice"})
+    return response.json()["game_id"]
+
+
+def test_scheduler_fires_in_deadline_order():
+    now = [0.0]
+    fired = []
+    sched = TimerScheduler(lambda gid, token: fired.append((gid, token)), clock=lambda: now[0])
+    for i in range(20000):
+        sched.schedule(f"g{i}", "t", (i * 7919) % 1000)
+    now[0] = 499
+    assert sched.expire_due() == 10000
+    assert len(sched) == 10000
+    assert all(int(gid[1:]) * 7919 % 1000 <= 499 for gid, _ in fired)
+
+
+def test_forget_drops_only_that_games_deadlines():
+    fired = []
+    sched = TimerScheduler(lambda gid, token: fired.append(gid), clock=lambda: 0.0)
+    for i in range(10):
+        sched.schedule(f"g{i % 2}", str(i), i)
+    assert sched.forget("g0") == 5
+    assert sched.expire_due(now=100) == 5
+    assert set(fired) == {"g1"}
+
+
+def test_expired_mining_is_scored_and_turn_passes():
+    game_id = create_game()
+    game = games[game_id]
+    game.awaiting_action = True
+    game.minigame = {"type": "mining", "player_id": "player1", "score": 40, "bot_score": 10, "time_limit": 30, "field": []}
+    _arm_minigame_timer(game_id, game)
+
+    minigame_timers.expire_due(now=float("inf"))
+    assert game.minigame is None
+    assert game.current_player == 1
+    assert game.awaiting_action is False
+
+
+def test_expired_invader_goes_to_defender_and_stale_tokens_are_ignored():
+    game_id = create_game()
+    game = games[game_id]
+    game.board.mut(3).owner = "bot"
+    game.minigame = {"square_id": 3, "attacker_id": "player1", "defender_id": "bot", "status": "countdown"}
+    _arm_minigame_timer(game_id, game)
+    stale = game.minigame["timer_id"]
+    _arm_minigame_timer(game_id, game)
+    assert game.minigame["timer_id"] != stale
+
+    minigame_timers.expire_due(now=float("inf"))
+    assert game.minigame is None
+    assert game.board[3].owner == "bot"
+    assert game.players[1].coins == 150
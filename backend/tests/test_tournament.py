@@ -0,0 +1,72 @@
+import random
+import time
+from types import SimpleNamespace
+from fastapi.testclient import TestClient
+from app.main import app, games, minigame_timers
+from app import tournament
+
+client = TestClient(app)
+
+
+def test_play_game_runs_to_the_60_turn_settlement():
+    before = set(games)
+    result = tournament.play_game(("farmer", "trader"), seed=3)
+    assert result["completed"] is True
+    assert result["turns"] >= 60
+    assert set(result["totals"]) == {"farmer", "trader"}
+    assert result["winner"] in ("farmer", "trader", "draw")
+    assert set(games) == before
+
+
+def test_round_robin_pairs_every_strategy():
+    summary = tournament.run_round_robin(["passive", "farmer", "builder"], games_per_pair=2, workers=1)
+    assert summary["games"] == 6
+    assert all(row["games"] == 4 for row in summary["standings"])
+    assert summary["games_per_sec"] > 0
+
+
+def test_a_game_only_forgets_its_own_timers():
+    other = client.post("/game/create", params={"player_name": "Alice"}).json()["game_id"]
+    pending = len(minigame_timers)
+    minigame_timers.schedule(other, "still-live", 60)
+    tournament.play_game(("farmer", "builder"), seed=5)
+    assert len(minigame_timers) == pending + 1
+
+
+def test_tournament_api_reports_progress():
+    state = random.getstate()
+    res = client.post("/tournament", params={"strategies": "farmer,trader", "games": 2, "workers": 1})
+    assert res.status_code == 200
+    tid = res.json()["tournament_id"]
+    for _ in range(200):
+        data = client.get(f"/tournament/{tid}").json()
+        if data["status"] != "running":
+            break
+        time.sleep(0.05)
+    assert data["status"] == "done"
+    assert data["games_completed"] == 2
+    # the games ran in worker processes, not on the server's generators
+    assert random.getstate() == state
+    assert client.post("/tournament", params={"strategies": "farmer,nope"}).status_code == 400
+
+
+def test_tournament_api_limits_workers_and_concurrent_runs(monkeypatch):
+    running = SimpleNamespace(status="running")
+    finished = {f"old{i}": SimpleNamespace(status="done") for i in range(tournament.MAX_FINISHED + 5)}
+    monkeypatch.setattr(tournament, "tournaments", {**finished})
+    params = {"strategies": "farmer,trader", "games": 1}
+    assert client.post("/tournament", params={**params, "workers": 0}).status_code == 400
+
+    tournament.tournaments["busy"] = running
+    assert client.post("/tournament", params=params).status_code == 409
+
+    del tournament.tournaments["busy"]
+    monkeypatch.setattr(tournament.os, "cpu_count", lambda: 2)
+    started = []
+    monkeypatch.setattr(tournament, "TournamentRun",
+                        lambda fmt, names, games, workers, seed: started.append((games, workers)) or
+                        SimpleNamespace(id="new", status="running", to_dict=lambda: {"tournament_id": "new"}))
+    assert client.post("/tournament", params={**params, "games": 7, "workers": 500}).status_code == 200
+    assert started == [(7, 2)]
+    assert len(tournament.tournaments) == tournament.MAX_FINISHED
+    assert "old0" not in tournament.tournaments and "new" in tournament.tournaments